@@ -0,0 +1,77 @@
+import argparse
+import sys
+from pathlib import Path
+
+from .runner import (
+    BASELINE,
+    load_baseline,
+    measure_in_subprocess,
+    regressions,
+    save_baseline,
+)
+from .streams import SCENARIOS
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bluesky Web Plots ingest and serialization benchmarks"
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        help=f"Scenarios to run, all of them by default. One of {', '.join(SCENARIOS)}.",
+    )
+    parser.add_argument(
+        "--tick-every",
+        type=int,
+        default=1000,
+        help="Events ingested between each simulated browser update.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BASELINE,
+        help="Baseline to compare against.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Save the results as the new baseline instead of comparing.",
+    )
+    parser.add_argument(
+        "--tolerance-scale",
+        type=float,
+        default=1.0,
+        help="Multiplies the allowed change of every metric, e.g 2 on a noisy box.",
+    )
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"Unknown scenarios {', '.join(sorted(unknown))}")
+
+    results = {}
+    for scenario in args.scenarios or SCENARIOS:
+        results[scenario] = measure_in_subprocess(scenario, args.tick_every)
+        metrics = results[scenario]
+        print(
+            f"{scenario:<20} {metrics['events_per_second']:>10} events/s "
+            f"p50 {metrics['latency_p50_us']:>8}us p99 {metrics['latency_p99_us']:>8}us "
+            f"rss {metrics['peak_rss_mb']:>5}MB "
+            f"{metrics['bytes_per_tick']:>9} B/tick "
+            f"{metrics['serialize_ms_per_tick']:>7}ms/tick"
+        )
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    found = regressions(results, load_baseline(args.baseline), args.tolerance_scale)
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    if found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
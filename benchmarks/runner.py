@@ -0,0 +1,167 @@
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import socket
+import time
+from pathlib import Path
+
+import numpy as np
+from dash import no_update
+from plotly.io.json import to_json_plotly
+
+from bluesky_web_plots.logger import logger
+from bluesky_web_plots.web_plots.callback import WebPlotCallback
+
+from .streams import SCENARIOS
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+# Relative change allowed before a metric counts as a regression. Timings are noisy
+# between runs of the same code, sizes are not.
+TOLERANCES = {
+    "events_per_second": 0.5,
+    "latency_p50_us": 1.0,
+    "latency_p99_us": 1.0,
+    "peak_rss_mb": 0.25,
+    "bytes_per_tick": 0.1,
+    "serialize_ms_per_tick": 1.0,
+}
+HIGHER_IS_BETTER = {"events_per_second"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _count_events(name: str, document: dict) -> int:
+    if name == "event":
+        return 1
+    if name == "event_page":
+        return len(document["seq_num"])
+    return 0
+
+
+def _tick(callback: WebPlotCallback, cursors: dict) -> tuple[int, float]:
+    """Bring a browser at `cursors` up to date, as `update_plots` would, returning the
+    bytes sent and the seconds it took."""
+    server = callback.server
+    start = time.perf_counter()
+    names = server.plot_names()
+    figures, extensions, updated = server.render_updates(names, cursors)
+    payload = (
+        to_json_plotly(
+            [
+                [None if figure is no_update else figure for figure in figures],
+                [
+                    None if extension is no_update else extension
+                    for extension in extensions
+                ],
+            ]
+        )
+        or ""
+    )
+    elapsed = time.perf_counter() - start
+    cursors.clear()
+    cursors.update(updated)
+    return len(payload), elapsed
+
+
+def measure(scenario: str, tick_every: int = 1000) -> dict:
+    """Feed a scenario's stream through a `WebPlotCallback`, ticking a simulated
+    browser every `tick_every` events.
+
+    Should be run in a fresh process so that peak RSS belongs to this scenario.
+    """
+    logger.setLevel(logging.ERROR)
+    callback = WebPlotCallback(plot_host="127.0.0.1", plot_port=_free_port())
+
+    latencies, tick_bytes, tick_seconds = [], [], []
+    cursors: dict = {}
+    events = since_tick = 0
+    for name, document in SCENARIOS[scenario]():
+        start = time.perf_counter()
+        callback(name, document)
+        latencies.append(time.perf_counter() - start)
+        count = _count_events(name, document)
+        events += count
+        since_tick += count
+        if since_tick >= tick_every:
+            since_tick = 0
+            sent, seconds = _tick(callback, cursors)
+            tick_bytes.append(sent)
+            tick_seconds.append(seconds)
+    sent, seconds = _tick(callback, cursors)
+    tick_bytes.append(sent)
+    tick_seconds.append(seconds)
+
+    latencies_us = np.array(latencies) * 1e6
+    return {
+        "documents": len(latencies),
+        "events": events,
+        "events_per_second": round(events / sum(latencies)),
+        "latency_p50_us": round(float(np.percentile(latencies_us, 50)), 1),
+        "latency_p99_us": round(float(np.percentile(latencies_us, 99)), 1),
+        "latency_max_us": round(float(latencies_us.max()), 1),
+        # ru_maxrss is in kilobytes on Linux.
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+        "ticks": len(tick_bytes),
+        "bytes_per_tick": round(float(np.mean(tick_bytes))),
+        "serialize_ms_per_tick": round(float(np.mean(tick_seconds)) * 1e3, 2),
+    }
+
+
+def _measure_into(scenario: str, tick_every: int, results):
+    # Keep the server's start up banner out of the report.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results.put(measure(scenario, tick_every))
+
+
+def measure_in_subprocess(scenario: str, tick_every: int = 1000) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(
+        target=_measure_into, args=(scenario, tick_every, results), daemon=True
+    )
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def regressions(
+    results: dict[str, dict], baseline: dict[str, dict], scale: float = 1.0
+) -> list[str]:
+    """Descriptions of every metric worse than the baseline by more than its
+    tolerance (multiplied by `scale`)."""
+    found = []
+    for scenario, metrics in results.items():
+        for metric, tolerance in TOLERANCES.items():
+            expected = baseline.get(scenario, {}).get(metric)
+            if not expected:
+                continue
+            change = (metrics[metric] - expected) / expected
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance * scale:
+                found.append(
+                    f"{scenario} {metric}: {metrics[metric]} vs baseline {expected} "
+                    f"({change:+.0%} worse)"
+                )
+    return found
+
+
+def load_baseline(path: Path = BASELINE) -> dict[str, dict]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(results: dict[str, dict], path: Path = BASELINE):
+    baseline = load_baseline(path)
+    baseline.update(results)
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
@@ -0,0 +1,160 @@
+"""Synthetic document streams, shaped like what a run engine emits for common plans."""
+
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+from event_model import pack_event_page
+
+from bluesky_web_plots.structures import Array, SampleMap, unpack_structures
+from bluesky_web_plots.structures.array import View
+from bluesky_web_plots.structures.sample_map import ColorScale
+
+Stream = Iterator[tuple[str, Any]]
+"""Documents as the plain dicts a run engine publishes."""
+
+
+def _run_start(scan_id: int, **metadata) -> dict:
+    return {
+        "uid": f"start-{scan_id}",
+        "time": time.time(),
+        "scan_id": scan_id,
+        **metadata,
+    }
+
+
+def _descriptor(scan_id: int, data_keys: dict) -> dict:
+    return {
+        "uid": f"descriptor-{scan_id}",
+        "run_start": f"start-{scan_id}",
+        "name": "primary",
+        "time": time.time(),
+        "data_keys": data_keys,
+        "object_keys": {name: [name] for name in data_keys},
+    }
+
+
+def _events(scan_id: int, rows: Iterator[dict]) -> Iterator[dict]:
+    for seq_num, data in enumerate(rows, start=1):
+        now = time.time()
+        yield {
+            "uid": f"event-{scan_id}-{seq_num}",
+            "descriptor": f"descriptor-{scan_id}",
+            "time": now,
+            "seq_num": seq_num,
+            "data": data,
+            "timestamps": dict.fromkeys(data, now),
+            "filled": {},
+        }
+
+
+def _emit(events: Iterator[dict], page_size: int) -> Stream:
+    """Events one at a time, or packed into event pages of `page_size`."""
+    if page_size <= 1:
+        for event in events:
+            yield "event", event
+        return
+    page = []
+    for event in events:
+        page.append(event)
+        if len(page) == page_size:
+            yield "event_page", dict(pack_event_page(*page))
+            page = []
+    if page:
+        yield "event_page", dict(pack_event_page(*page))
+
+
+def _run(
+    scan_id: int,
+    data_keys: dict,
+    rows: Iterator[dict],
+    page_size: int,
+    **metadata,
+) -> Stream:
+    yield "start", _run_start(scan_id, **metadata)
+    yield "descriptor", _descriptor(scan_id, data_keys)
+    yield from _emit(_events(scan_id, rows), page_size)
+    yield "stop", {"uid": f"stop-{scan_id}", "run_start": f"start-{scan_id}"}
+
+
+def _number(name: str) -> dict:
+    return {"dtype": "number", "shape": [], "source": f"sim://{name}"}
+
+
+def scalar(num: int, fields: int = 1, page_size: int = 1, runs: int = 1) -> Stream:
+    """A `count` of `fields` hinted scalar detectors."""
+    names = [f"det{index}" for index in range(fields)]
+    generator = np.random.default_rng(0)
+    for scan_id in range(1, runs + 1):
+        values = generator.normal(size=(num, fields)).tolist()
+        yield from _run(
+            scan_id,
+            {name: _number(name) for name in names},
+            (dict(zip(names, row, strict=True)) for row in values),
+            page_size,
+        )
+
+
+def array(num: int, width: int, view: View, page_size: int = 1) -> Stream:
+    """A `count` of a 1D detector, e.g a spectrometer."""
+    generator = np.random.default_rng(0)
+    structure = Array(names=("spectrum",), view=view)
+    yield from _run(
+        1,
+        {
+            "spectrum": {
+                "dtype": "array",
+                "shape": [width],
+                "source": "sim://spectrum",
+            }
+        },
+        ({"spectrum": generator.normal(size=width)} for _ in range(num)),
+        page_size,
+        hints=unpack_structures(structure),
+    )
+
+
+def sample_map(x_num: int, y_num: int, page_size: int = 1) -> Stream:
+    """A `grid_scan` of two motors, mapped by a detector's intensity."""
+    generator = np.random.default_rng(0)
+    structure = SampleMap(
+        names=("x", "y", "intensity"),
+        intensity_data_key="intensity",
+        color_scale=ColorScale.VIRIDIS,
+    )
+    hints = {
+        **unpack_structures(structure),
+        "dimensions": [(["x"], "primary"), (["y"], "primary")],
+    }
+    xs, ys = np.meshgrid(np.linspace(-1, 1, x_num), np.linspace(-1, 1, y_num))
+    yield from _run(
+        1,
+        {name: _number(name) for name in ("x", "y", "intensity")},
+        (
+            {"x": x, "y": y, "intensity": intensity}
+            for x, y, intensity in zip(
+                xs.ravel().tolist(),
+                ys.ravel().tolist(),
+                generator.normal(size=x_num * y_num).tolist(),
+                strict=True,
+            )
+        ),
+        page_size,
+        hints=hints,
+        motors=["x", "y"],
+        shape=[x_num, y_num],
+        extents=[[-1, 1], [-1, 1]],
+    )
+
+
+SCENARIOS = {
+    "scalar_events": lambda: scalar(20_000),
+    "scalar_pages": lambda: scalar(200_000, page_size=1000),
+    "scalar_many_fields": lambda: scalar(2_000, fields=50),
+    "scalar_many_runs": lambda: scalar(2_000, runs=20),
+    "array_slice": lambda: array(2_000, 2048, View.SLICE),
+    "array_surface": lambda: array(2_000, 512, View.SURFACE),
+    "sample_map": lambda: sample_map(100, 100),
+}
+"""Synthetic streams by name, built fresh each call."""
@@ -0,0 +1,13 @@
+from .runner import measure, regressions
+
+
+def test_benchmark_measures_scenario_and_flags_regressions():
+    metrics = measure("scalar_many_runs", tick_every=5_000)
+    assert metrics["events"] == 40_000
+    assert metrics["ticks"] == 9
+    assert metrics["bytes_per_tick"] > 0
+
+    slower = {**metrics, "events_per_second": metrics["events_per_second"] // 4}
+    found = regressions({"scalar_many_runs": slower}, {"scalar_many_runs": metrics})
+    assert len(found) == 1 and "events_per_second" in found[0]
+    assert not regressions({"scalar_many_runs": metrics}, {"scalar_many_runs": slower})
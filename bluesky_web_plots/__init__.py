@@ -1,6 +1,40 @@
+from importlib import import_module
+from typing import TYPE_CHECKING
+
 from ._version import version
 
 __version__ = version
 
-from .web_plots import PlotServer as PlotServer
-from .web_plots import WebPlotCallback as WebPlotCallback
+# The callbacks pull in dash, flask and plotly, which take seconds to import. They're
+# only imported once used so that e.g `unpack_structures` can be used in a profile.
+_LAZY = {
+    "MultiSourceWebPlotService": ".web_plots",
+    "PlotServer": ".web_plots",
+    "ShardedWebPlotCallback": ".web_plots",
+    "SubprocessWebPlotCallback": ".web_plots",
+    "WebPlotCallback": ".web_plots",
+}
+
+__all__ = [
+    "MultiSourceWebPlotService",
+    "PlotServer",
+    "ShardedWebPlotCallback",
+    "SubprocessWebPlotCallback",
+    "WebPlotCallback",
+    "__version__",
+]
+
+if TYPE_CHECKING:
+    from .web_plots import MultiSourceWebPlotService as MultiSourceWebPlotService
+    from .web_plots import PlotServer as PlotServer
+    from .web_plots import ShardedWebPlotCallback as ShardedWebPlotCallback
+    from .web_plots import SubprocessWebPlotCallback as SubprocessWebPlotCallback
+    from .web_plots import WebPlotCallback as WebPlotCallback
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,13 +1,147 @@
 import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
 
-from bluesky_web_plots.web_plots.callback import WebPlotCallback
+from bluesky_web_plots.retention import RetentionPolicy
+
+
+def _report_import_times(module: str, top: int):
+    """Import `module` in a fresh interpreter and print where the time went."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines are "import time: self [us] | cumulative | imported package".
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        modules.append((int(own), int(cumulative), name.strip()))
+
+    by_package = defaultdict(int)
+    for own, _, name in modules:
+        by_package[name.split(".")[0]] += own
+    total = sum(by_package.values())
+    print(f"Importing {module} took {total / 1e6:.3f}s\n")
+    print(f"{'package':<40} {'self [s]':>10}")
+    for package, own in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<40} {own / 1e6:>10.3f}")
+    print(f"\n{'module':<60} {'cumulative [s]':>15}")
+    for _, cumulative, name in sorted(modules, key=lambda item: -item[1])[:top]:
+        print(f"{name:<60} {cumulative / 1e6:>15.3f}")
+
+
+def _replay(argv: list[str]):
+    """`bluesky-web-plots replay <file>`, plot runs from a file of saved documents."""
+    from bluesky_web_plots.replay import FORMATS, read_documents, replay
+
+    parser = argparse.ArgumentParser(
+        prog="bluesky-web-plots replay",
+        description="Plot runs from a file of saved documents.",
+    )
+    parser.add_argument(
+        "file",
+        type=str,
+        help="JSONL or msgpack documents (e.g from suitcase), or a journal.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default=None,
+        help="Format of the file, by its extension by default.",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=1000,
+        help="Most events packed into each page handed to the figures.",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=None,
+        help=(
+            "Replay as recorded (1), or this many times faster, rather than as fast "
+            "as possible."
+        ),
+    )
+    parser.add_argument(
+        "--publish",
+        type=str,
+        default=None,
+        metavar="ZMQ_URI",
+        help=(
+            "Publish the documents to a ZMQ proxy instead of plotting them, e.g to "
+            "load a live service. Example 0.0.0.0:5577"
+        ),
+    )
+    parser.add_argument("--plot-host", type=str, default="0.0.0.0")
+    parser.add_argument("--plot-port", type=int, default=12354)
+    parser.add_argument("--columns", type=int, default=2)
+    parser.add_argument("--fast-serialization", action="store_true")
+    parser.add_argument(
+        "--exit",
+        action="store_true",
+        help="Exit once replayed rather than serving the plots.",
+    )
+    args = parser.parse_args(argv)
+
+    documents = read_documents(args.file, args.format)
+    if args.publish is not None:
+        from bluesky.callbacks.zmq import Publisher
+
+        publisher = Publisher(args.publish)
+        stats = replay(documents, publisher, args.page_size, args.speed)
+        publisher.close()
+    else:
+        from bluesky_web_plots.web_plots.callback import WebPlotCallback
+        from bluesky_web_plots.web_plots.server import PlotServer
+
+        server = PlotServer(
+            host=args.plot_host,
+            port=args.plot_port,
+            columns=args.columns,
+            fast_serialization=bool(args.fast_serialization),
+        )
+        if not args.exit:
+            server.run()
+        callback = WebPlotCallback(
+            server=server, fast_serialization=bool(args.fast_serialization)
+        )
+        stats = replay(documents, callback, args.page_size, args.speed)
+    print(
+        f"Replayed {stats['events']} events in {stats['documents']} documents in "
+        f"{stats['seconds']:.2f}s ({stats['events'] / max(stats['seconds'], 1e-9):.0f} "
+        "events/s)"
+    )
+    if args.publish is not None or args.exit:
+        return
+    print(f"Plots at http://{args.plot_host}:{args.plot_port}, Ctrl + C to Exit")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Exiting...")
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Bluesky Web Plots")
+    if sys.argv[1:2] == ["replay"]:
+        _replay(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Bluesky Web Plots",
+        epilog="Use 'replay <file>' to plot runs from a file of saved documents.",
+    )
     parser.add_argument(
         "zmq_uri",
         type=str,
+        nargs="?",
         help="ZMQ host to connect to for documents. Example 0.0.0.0:5578",
     )
     parser.add_argument(
@@ -43,9 +177,170 @@ def main():
             "--ignore-streams baseline secondary"
         ),
     )
+    parser.add_argument(
+        "--fast-serialization",
+        action="store_true",
+        help="Send figure data to the browser as base64 typed arrays.",
+    )
+    parser.add_argument(
+        "--keep-runs",
+        type=int,
+        default=None,
+        help="Most past runs kept in each plot, the oldest are evicted first.",
+    )
+    parser.add_argument(
+        "--max-figure-bytes",
+        type=int,
+        default=None,
+        help="Most bytes of run data kept in each plot.",
+    )
+    parser.add_argument(
+        "--max-total-bytes",
+        type=int,
+        default=None,
+        help="Most bytes of run data kept over all plots.",
+    )
+    parser.add_argument(
+        "--spill-directory",
+        type=str,
+        default=None,
+        help=(
+            "Directory evicted runs are written to, so they can be recalled with "
+            "POST /recall/<plot>?trace=<run>. Needs a limit to evict runs by."
+        ),
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        default=None,
+        help=(
+            "File to journal received documents to, plots are restored from it "
+            "when the service restarts."
+        ),
+    )
+    parser.add_argument(
+        "--journal-runs",
+        type=int,
+        default=10,
+        help="Most runs kept in the journal, --keep-runs if it's given.",
+    )
+    parser.add_argument(
+        "--source",
+        type=str,
+        action="append",
+        default=[],
+        metavar="NAME=ZMQ_URI",
+        help=(
+            "Plot another ZMQ source on its own tab, can be given many times. "
+            "Example: --source i22=0.0.0.0:5578 --source p38=0.0.0.0:5588"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help=(
+            "Shard the plots over this many worker processes, for runs with many "
+            "plotted fields. Sharded plots are sent whole as they change, can't be "
+            "exported and aren't re-decimated when zoomed."
+        ),
+    )
+    parser.add_argument(
+        "--viewers",
+        type=int,
+        default=0,
+        help=(
+            "Serve the web interface from this many processes, so many people can "
+            "watch without slowing down the plots."
+        ),
+    )
+    parser.add_argument(
+        "--import-times",
+        type=int,
+        nargs="?",
+        const=15,
+        default=None,
+        metavar="TOP",
+        help="Report the slowest imports of the service and exit.",
+    )
     args = parser.parse_args()
 
+    if args.import_times is not None:
+        _report_import_times("bluesky_web_plots.web_plots.callback", args.import_times)
+        return
+    if args.zmq_uri is None and not args.source:
+        parser.error("the following arguments are required: zmq_uri")
+    for source in args.source:
+        name, _, address = source.partition("=")
+        if not name or not address:
+            parser.error(f"argument --source: expected NAME=ZMQ_URI, got {source!r}")
+    if args.source and args.workers:
+        parser.error("argument --workers: not allowed with argument --source")
+    limited = any(
+        limit is not None
+        for limit in (args.keep_runs, args.max_figure_bytes, args.max_total_bytes)
+    )
+    if args.spill_directory is not None and not limited:
+        parser.error(
+            "argument --spill-directory: requires one of --keep-runs, "
+            "--max-figure-bytes or --max-total-bytes to evict runs"
+        )
+    # Only a single `WebPlotCallback` journals, serves viewers or opens a window.
+    mode = "--source" if args.source else "--workers" if args.workers else None
+    for flag, used in (
+        ("--journal", args.journal is not None),
+        ("--viewers", args.viewers > 0),
+        ("--local-window-mode", args.local_window_mode),
+    ):
+        if mode is not None and used:
+            parser.error(f"argument {flag}: not allowed with argument {mode}")
+
+    from bluesky_web_plots.web_plots.callback import WebPlotCallback
+
+    retention = None
+    if limited:
+        retention = RetentionPolicy(
+            max_runs=args.keep_runs,
+            max_bytes=args.max_figure_bytes,
+            max_total_bytes=args.max_total_bytes,
+            spill_directory=args.spill_directory,
+        )
+
     print(args.ignore_streams)
+    if args.source:
+        from bluesky_web_plots.web_plots.multi_source import MultiSourceWebPlotService
+
+        sources = dict(source.split("=", 1) for source in args.source)
+        if args.zmq_uri is not None:
+            sources.setdefault("default", args.zmq_uri)
+        MultiSourceWebPlotService(
+            sources,
+            plot_host=args.plot_host,
+            plot_port=args.plot_port,
+            columns=args.columns,
+            ignore_streams=args.ignore_streams,
+            fast_serialization=bool(args.fast_serialization),
+            retention=retention,
+        ).run()
+        return
+
+    if args.workers > 0:
+        from bluesky_web_plots.web_plots.sharded_callback import (
+            ShardedWebPlotCallback,
+        )
+
+        ShardedWebPlotCallback(
+            zmq_uri=args.zmq_uri,
+            plot_host=args.plot_host,
+            plot_port=args.plot_port,
+            columns=args.columns,
+            ignore_streams=args.ignore_streams,
+            fast_serialization=bool(args.fast_serialization),
+            retention=retention,
+            workers=args.workers,
+        ).run()
+        return
+
     WebPlotCallback(
         zmq_uri=args.zmq_uri,
         plot_host=args.plot_host,
@@ -53,6 +348,11 @@ def main():
         columns=args.columns,
         local_window_mode=bool(args.local_window_mode),
         ignore_streams=args.ignore_streams,
+        fast_serialization=bool(args.fast_serialization),
+        retention=retention,
+        journal=args.journal,
+        journal_runs=args.journal_runs,
+        viewers=args.viewers,
     ).run()
 
 
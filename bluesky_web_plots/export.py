@@ -0,0 +1,149 @@
+"""Streams the columns behind a plot's traces as `.npz` or Arrow IPC, in chunks."""
+
+import io
+import zipfile
+from collections.abc import Iterator
+
+import numpy as np
+
+Traces = dict[str, dict[str, np.ndarray]]
+"""Columns of each trace by trace name, as returned by `BaseFigureCallback.columns`."""
+
+CHUNK_BYTES = 1 << 20
+CHUNK_ROWS = 1 << 16
+
+
+class _Sink(io.RawIOBase):
+    """A write-only, unseekable file which holds what's written until it's drained."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(self._chunks[-1])
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self._chunks = self._chunks, []
+        yield from chunks
+
+
+def npz_chunks(traces: Traces, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """An uncompressed `.npz` of every column, named "<trace>/<column>".
+
+    Columns are written straight from their buffers a chunk at a time, so memory
+    doesn't grow with the size of the plot.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for trace, columns in traces.items():
+            for name, column in columns.items():
+                column = np.ascontiguousarray(column)
+                with archive.open(
+                    f"{trace}/{name}.npy", "w", force_zip64=True
+                ) as entry:
+                    np.lib.format.write_array_header_1_0(
+                        entry, np.lib.format.header_data_from_array_1_0(column)
+                    )
+                    data = column.data.cast("B")
+                    for start in range(0, len(data), chunk_bytes):
+                        entry.write(data[start : start + chunk_bytes])
+                        yield from sink.drain()
+        yield from sink.drain()
+    yield from sink.drain()
+
+
+def _arrow_column(pa, column: np.ndarray):
+    if column.ndim == 2:
+        # e.g the frames of a surface, one fixed size list per row.
+        return pa.FixedSizeListArray.from_arrays(
+            pa.array(np.ascontiguousarray(column).ravel()), column.shape[1]
+        )
+    return pa.array(column)
+
+
+def arrow_chunks(traces: Traces, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """An Arrow IPC stream of every trace, with a "trace" column naming the trace
+    each row belongs to. Numeric columns are handed to Arrow without copying, unless
+    they're promoted to the type of the same column of another trace (e.g integers
+    alongside floats).
+
+    Raises ImportError without pyarrow, and ValueError before streaming starts if the
+    columns of a trace aren't all the same length (e.g a sample map's grid), or if
+    the traces don't share one schema.
+    """
+    import pyarrow as pa  # pyright: ignore
+
+    rows = {}
+    for trace, columns in traces.items():
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"The columns of {trace} aren't all the same length.")
+        rows[trace] = lengths.pop() if lengths else 0
+    return _arrow_stream(pa, traces, rows, _arrow_dtypes(traces), chunk_rows)
+
+
+def _arrow_dtypes(traces: Traces) -> dict[str, np.dtype]:
+    """The type of each column shared by every trace, so that every batch of the
+    stream has the same schema."""
+    names: list[str] | None = None
+    dtypes: dict[str, np.dtype] = {}
+    widths: dict[str, int | None] = {}
+    for trace, columns in traces.items():
+        if names is None:
+            names = list(columns)
+        elif list(columns) != names:
+            raise ValueError(
+                f"{trace} has columns {', '.join(columns)} rather than "
+                f"{', '.join(names)}, export it on its own."
+            )
+        for name, column in columns.items():
+            width = column.shape[1] if column.ndim == 2 else None
+            if widths.setdefault(name, width) != width:
+                raise ValueError(
+                    f"{trace} has {width} values per row of {name} rather than "
+                    f"{widths[name]}, export it on its own."
+                )
+            try:
+                dtypes[name] = np.result_type(
+                    dtypes.get(name, column.dtype), column.dtype
+                )
+            except TypeError:
+                raise ValueError(
+                    f"{name} of {trace} is {column.dtype}, which can't be exported "
+                    f"alongside {dtypes[name]}, export it on its own."
+                ) from None
+    return dtypes
+
+
+def _arrow_stream(
+    pa,
+    traces: Traces,
+    rows: dict[str, int],
+    dtypes: dict[str, np.dtype],
+    chunk_rows: int,
+) -> Iterator[bytes]:
+    sink = _Sink()
+    writer = None
+    for trace, columns in traces.items():
+        table = {
+            "trace": pa.DictionaryArray.from_arrays(
+                pa.array(np.zeros(rows[trace], dtype=np.int32)), pa.array([trace])
+            ),
+            **{
+                name: _arrow_column(pa, column.astype(dtypes[name], copy=False))
+                for name, column in columns.items()
+            },
+        }
+        batch = pa.RecordBatch.from_pydict(table)
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        for start in range(0, rows[trace], chunk_rows):
+            writer.write_batch(batch.slice(start, chunk_rows))
+            yield from sink.drain()
+    if writer is not None:
+        writer.close()
+    yield from sink.drain()
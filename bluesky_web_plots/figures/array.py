@@ -1,11 +1,38 @@
-from datetime import datetime
-
+import numpy as np
 from event_model.documents import Event, EventDescriptor, EventPage, RunStart
 from plotly import graph_objs as go
 
-from bluesky_web_plots.structures.array import Array, View
+from bluesky_web_plots.structures.array import Array, Downsample, View
+from bluesky_web_plots.utils import to_local_datetime64
+
+from ..logger import logger
+from .base_figure import AxisRanges, BaseFigureCallback
+from .columns import FrameRing, ImagePyramid
+
+DEFAULT_MAX_HISTORY = 256
+DEFAULT_IMAGE_SIZE = 512
+# Images are cropped to whole tiles around the zoomed region, so small pans don't
+# leave the edges of the plot empty.
+IMAGE_TILE = 64
+
+
+def _as_image(frame) -> np.ndarray:
+    """A frame as a 2D image, the last of any leading dimensions (e.g a stack of one)."""
+    frame = np.asarray(frame)
+    if frame.ndim < 2:
+        return frame.reshape(1, -1)
+    return frame.reshape(-1, *frame.shape[-2:])[-1]
 
-from .base_figure import BaseFigureCallback
+
+def _pixels(axis_range: list | None, size: int) -> tuple[int, int]:
+    """The pixels from first to last in a zoomed axis range, the whole axis if None."""
+    if axis_range is None:
+        return 0, size
+    low, high = sorted(axis_range)
+    return (
+        int(np.clip(np.floor(low + 0.5), 0, size)),
+        int(np.clip(np.ceil(high + 0.5), 0, size)),
+    )
 
 
 class ArrayFigureCallback(BaseFigureCallback[Array]):
@@ -16,6 +43,18 @@ class ArrayFigureCallback(BaseFigureCallback[Array]):
         self.figure.update_layout({"uirevision": "constant"})
         self._scan_id = 0
 
+        # A ring of recent frames per SURFACE trace in `figure.data`, a pyramid of the
+        # latest frame per IMAGE trace, None for SLICE traces. Rings are allocated on
+        # the first frame, once the width is known.
+        self._rings: list[FrameRing | ImagePyramid | None] = []
+        self._emitted_versions: list[int] = []
+        self._emitted_view: AxisRanges | None = None
+        # The latest frame of the newest SLICE trace not emitted yet, earlier ones
+        # are dropped since only the latest is shown.
+        self._latest: np.ndarray | None = None
+        if "max_fps" in structure:
+            self.max_fps = structure["max_fps"]
+
     def run_start(self, document: RunStart):
         self._scan_id = document.get("scan_id", document["uid"][4:])
 
@@ -24,25 +63,219 @@ class ArrayFigureCallback(BaseFigureCallback[Array]):
             return
         data_key = document["data_keys"].get(self.structure["names"][0], {})
         shape = data_key.get("shape")
-        if shape and self.structure["view"] == View.SLICE:
-            self.figure.add_trace(go.Scatter(x=[], y=[], name=f"plan {self._scan_id}"))
+        self._apply_latest()
+        if (shape and len(shape) > 1) or self.structure["view"] == View.IMAGE:
+            self._add_image(f"plan {self._scan_id}")
+        elif shape and self.structure["view"] == View.SLICE:
+            self.figure.add_trace(
+                self._scatter(x=[], y=[], name=f"plan {self._scan_id}")
+            )
+            self._emitted_versions.append(0)
+            self._rings.append(None)
         else:
             self.figure.add_trace(
                 go.Surface(x=[], y=[], z=[], name=f"plan {self._scan_id}")
             )
+            self._emitted_versions.append(0)
+            self._rings.append(
+                FrameRing(
+                    self.structure.get("max_history", DEFAULT_MAX_HISTORY),
+                    (shape[0] or 0) if shape else 0,
+                )
+            )
+        self.generation += 1
+
+    def _add_image(self, name: str):
+        """Add a heatmap trace for the images of a run, hiding those of earlier runs."""
+        for trace in self.figure.data:
+            if isinstance(trace, go.Heatmap):
+                trace.update(visible="legendonly", showscale=False)
+        # Rows go down the screen, with square pixels.
+        self.figure.update_layout(yaxis={"autorange": "reversed", "scaleanchor": "x"})
+        self.figure.add_trace(go.Heatmap(z=[], name=name, showlegend=True))
+        self._emitted_versions.append(0)
+        self._rings.append(
+            ImagePyramid(self.structure.get("downsample", Downsample.MEAN))
+        )
+
+    def _push(self, frames: np.ndarray, times: np.ndarray):
+        ring = self._rings[-1]
+        assert isinstance(ring, FrameRing)
+        if frames.ndim == 1:
+            # Scalars, each frame is a single channel.
+            frames = frames[:, np.newaxis]
+        if ring.width != frames.shape[1]:
+            if len(ring):
+                logger.warning(
+                    f"{self.structure['names'][0]} changed from {ring.width} to "
+                    f"{frames.shape[1]} channels, restarting its history."
+                )
+            ring = FrameRing(ring.capacity, frames.shape[1])
+            self._rings[-1] = ring
+        ring.push(frames, times)
 
     def event(self, document: Event):
-        if self.structure["names"][0] not in document["data"].keys():
-            return
-        trace = self.figure.data[-1]
         received = document["data"][self.structure["names"][0]]
-        if self.structure["view"] == View.SLICE:
-            trace.x = tuple(range(len(received)))  # type: ignore
-            trace.y = tuple(received)  # type: ignore
+        if self._rings[-1] is None:
+            self._set_latest(received)
+        elif isinstance(self._rings[-1], ImagePyramid):
+            self._rings[-1].push(_as_image(received))
         else:
-            trace.x += (datetime.fromtimestamp(document["time"]),)  # type: ignore
-            for i, n in enumerate(received):
-                trace.y += (i,)  # type: ignore
-                trace.z += (n,)  # type: ignore
+            self._push(np.asarray(received)[np.newaxis], np.array([document["time"]]))
+        self.generation += 1
 
-    def event_page(self, document: EventPage): ...
+    def event_page(self, document: EventPage):
+        received = document["data"][self.structure["names"][0]]
+        if not len(received):
+            return
+        if self._rings[-1] is None:
+            # Only the latest frame of the page is shown.
+            self._set_latest(received[-1])
+        elif isinstance(self._rings[-1], ImagePyramid):
+            self._rings[-1].push(_as_image(received[-1]))
+        else:
+            self._push(np.asarray(received), np.asarray(document["time"]))
+        self.generation += 1
+
+    def _set_latest(self, frame):
+        self._latest = np.asarray(frame)
+
+    def _apply_latest(self):
+        """Hand the latest SLICE frame to its trace."""
+        if self._latest is None:
+            return
+        frame, self._latest = self._latest, None
+        trace = self.figure.data[-1]
+        if trace.x is None or len(trace.x) != len(frame):  # type: ignore
+            trace.x = np.arange(len(frame))  # type: ignore
+        trace.y = frame  # type: ignore
+
+    def sync_traces(self):
+        if self._webgl:
+            return
+        points = super().trace_points()
+        if self._latest is not None:
+            points[-1] = len(self._latest)
+        self._check_webgl(
+            sum(
+                points
+                for ring, points in zip(self._rings, points, strict=False)
+                if ring is None
+            ),
+            self.structure.get("webgl_points", self.webgl_points),
+        )
+
+    def emit(self, view: AxisRanges | None = None) -> go.Figure:
+        self._apply_latest()
+        for index, ring in enumerate(self._rings):
+            if isinstance(ring, ImagePyramid):
+                if ring.version and (
+                    ring.version != self._emitted_versions[index]
+                    or view != self._emitted_view
+                ):
+                    self._emit_image(self.figure.data[index], ring, view)  # type: ignore
+                    self._emitted_versions[index] = ring.version
+                continue
+            if ring is None or ring.version == self._emitted_versions[index]:
+                continue
+            version = ring.version
+            times, frames = ring.ordered()
+            trace = self.figure.data[index]
+            trace.x = np.arange(ring.width)  # type: ignore
+            trace.y = to_local_datetime64(times)  # type: ignore
+            trace.z = frames  # type: ignore
+            self._emitted_versions[index] = version
+        self._emitted_view = view
+        return self.figure
+
+    def _emit_image(
+        self, trace: go.Heatmap, pyramid: ImagePyramid, view: AxisRanges | None
+    ):
+        """Hand the trace the coarsest level of the pyramid which still fits the zoomed
+        region into `image_size`, cropped to the tiles covering the region. Only a
+        small zoomed region is sent at full resolution."""
+        rows, columns = pyramid.shape
+        first_row, last_row = _pixels((view or {}).get("y"), rows)
+        first_column, last_column = _pixels((view or {}).get("x"), columns)
+        size = self.structure.get("image_size", DEFAULT_IMAGE_SIZE)
+        span = max(last_row - first_row, last_column - first_column, 1)
+        level = min(max(int(np.ceil(np.log2(span / size))), 0), pyramid.levels - 1)
+        image = pyramid.level(level)
+        factor = 2**level
+        tile = IMAGE_TILE
+        top = first_row // factor // tile * tile
+        bottom = -(-last_row // factor // tile) * tile
+        left = first_column // factor // tile * tile
+        right = -(-last_column // factor // tile) * tile
+        # Each pixel of the level covers `factor` pixels of the frame, centred on them.
+        trace.update(
+            z=image[top:bottom, left:right],
+            x0=left * factor + (factor - 1) / 2,
+            dx=factor,
+            y0=top * factor + (factor - 1) / 2,
+            dy=factor,
+        )
+
+    def trace_points(self) -> list[int]:
+        self._apply_latest()
+        return [
+            ring.shape[0] * ring.shape[1]
+            if isinstance(ring, ImagePyramid)
+            else len(ring) * ring.width
+            if ring
+            else points
+            for ring, points in zip(self._rings, super().trace_points(), strict=False)
+        ]
+
+    def trace_nbytes(self) -> list[int]:
+        self._apply_latest()
+        return [
+            # SLICE traces only hold their latest frame, as x and y.
+            ring.nbytes
+            if ring is not None
+            else 16 * len(trace.y if trace.y is not None else ())  # type: ignore
+            for ring, trace in zip(self._rings, self.figure.data, strict=False)
+        ]
+
+    def _trace_columns(self, index: int) -> dict[str, np.ndarray]:
+        self._apply_latest()
+        ring = self._rings[index]
+        if ring is None:
+            trace = self.figure.data[index]
+            return {"x": np.asarray(trace.x), "y": np.asarray(trace.y)}  # type: ignore
+        if isinstance(ring, ImagePyramid):
+            return {"image": ring.level(0) if ring.version else np.zeros((0, 0))}
+        times, frames = ring.ordered()
+        return {"times": times, "frames": frames}
+
+    def _drop_trace(self, index: int):
+        del self._emitted_versions[index]
+        del self._rings[index]
+
+    def restore_trace(self, name: str, columns: dict[str, np.ndarray]):
+        if "image" in columns:
+            ring = ImagePyramid(self.structure.get("downsample", Downsample.MEAN))
+            if columns["image"].size:
+                ring.push(columns["image"])
+            # Hidden like the images of every run but the newest.
+            index = self._insert_trace(
+                go.Heatmap(
+                    z=[],
+                    name=name,
+                    showlegend=True,
+                    visible="legendonly",
+                    showscale=False,
+                )
+            )
+        elif "frames" in columns:
+            frames = columns["frames"]
+            ring = FrameRing(len(frames), frames.shape[1])
+            ring.push(frames, columns["times"])
+            index = self._insert_trace(go.Surface(x=[], y=[], z=[], name=name))
+        else:
+            ring = None
+            index = self._insert_trace(
+                self._scatter(x=columns["x"], y=columns["y"], name=name)
+            )
+        self._emitted_versions.insert(index, 0)
+        self._rings.insert(index, ring)
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Generic, TypeVar
 
+import numpy as np
 from event_model.documents import Event, EventDescriptor, EventPage, RunStart
 from plotly import graph_objs as go
 
@@ -8,11 +9,30 @@ from bluesky_web_plots.structures.base_structure import Base
 
 T = TypeVar("T", bound=(Base | None))
 
+AxisRanges = dict[str, list]
+"""Zoomed ranges of a plot by axis ("x", "y"), as reported by the browser."""
+
 
 class BaseFigureCallback(ABC, Generic[T]):
     structure: T
     figure: go.Figure
 
+    generation: int = 0
+    """Bumped whenever browsers need the whole figure again (e.g a new trace)."""
+
+    last_event_time: float | None = None
+    """`time` of the newest event handed to the figure, to measure lag by."""
+
+    webgl_points: int | None = 10_000
+    """Points drawn past which scatter traces are drawn with WebGL rather than SVG,
+    which gets unusably slow in the browser. `None` to always use SVG."""
+
+    max_fps: float | None = 10.0
+    """Most times a second browsers are sent the whole figure as it changes, changes in
+    between are dropped in favour of the latest. `None` for no cap."""
+
+    _webgl: bool = False
+
     def __init__(self, structure: T):
         self.structure = structure
 
@@ -26,8 +46,140 @@ class BaseFigureCallback(ABC, Generic[T]):
 
     @abstractmethod
     def event(self, document: Event):
-        pass
+        """Only called with events holding every one of the figure's names."""
 
     @abstractmethod
     def event_page(self, document: EventPage):
-        pass
+        """Only called with event pages holding every one of the figure's names."""
+
+    def emit(self, view: AxisRanges | None = None) -> go.Figure:
+        """Hand any buffered data to `figure` and return it.
+
+        Called by the server whenever the figure is about to be sent to the browser,
+        `view` is the region the browser is zoomed into, if any.
+        """
+        return self.figure
+
+    def emit_dict(self, view: AxisRanges | None = None) -> dict:
+        """`emit` as a plain dict, ready to be serialized for the browser."""
+        self.sync_traces()
+        return self.emit(view).to_dict()
+
+    def sync_traces(self):
+        """Rebuild `figure.data` for what ingest has added, e.g switching to WebGL,
+        bumping `generation` if it does.
+
+        Called by the server with its lock held before the figure's generation is
+        compared or it's emitted, ingest only ever adds data.
+        """
+
+    def cursor(self) -> list[int]:
+        """Per-trace lengths held by a browser which received the last `emit`."""
+        return []
+
+    def extend_data(
+        self, cursor: list[int]
+    ) -> tuple[dict[str, list], list[int], list[int]] | None:
+        """Points added since `cursor`, as `dcc.Graph.extendData` (data, trace indices),
+        and the cursor after they're applied.
+
+        `None` if there's nothing to extend, figures which can't be extended bump their
+        `generation` instead.
+        """
+        return None
+
+    def needs_refresh(self, cursor: list[int], view: AxisRanges | None) -> bool:
+        """Whether a browser at `cursor` must be sent the whole figure again, because
+        what it holds can't be brought up to date with `extend_data`."""
+        return False
+
+    def _scatter(self, **properties) -> go.Scatter | go.Scattergl:
+        """A new scatter trace, drawn with WebGL if the figure has switched to it."""
+        if self._webgl:
+            return go.Scattergl(marker={"size": 4}, **properties)
+        return go.Scatter(**properties)
+
+    def _check_webgl(self, points: int, limit: int | None):
+        """Switch every scatter trace to WebGL once the figure draws more than `limit`
+        points. The zoom is kept by the layout's `uirevision`."""
+        if self._webgl or limit is None or points <= limit:
+            return
+        self._webgl = True
+        traces = []
+        for trace in self.figure.data:
+            if isinstance(trace, go.Scatter):
+                properties = trace.to_plotly_json()
+                properties.pop("type", None)
+                trace = go.Scattergl(properties).update(marker_size=4)
+            traces.append(trace)
+        self.figure.data = ()
+        self.figure.add_traces(traces)
+        self.generation += 1
+
+    def trace_points(self) -> list[int]:
+        """Points held for each trace, including those not emitted yet."""
+        return [
+            len(trace.y) if trace.y is not None else 0  # type: ignore
+            for trace in self.figure.data
+        ]
+
+    def trace_nbytes(self) -> list[int]:
+        """Memory held for each trace's data, oldest first.
+
+        Empty for figures whose traces can't be evicted.
+        """
+        return []
+
+    def columns(self) -> dict[str, dict[str, np.ndarray]]:
+        """The data behind each trace by trace name, as views of the figure's buffers
+        where possible. Empty for figures which don't hold their data as columns.
+
+        The caller must stop the figure from being emitted meanwhile.
+        """
+        traces = {}
+        for index, trace in enumerate(self.figure.data):
+            try:
+                columns = self._trace_columns(index)
+            except NotImplementedError:
+                return {}
+            name = str(trace.name)  # type: ignore
+            traces[name if name not in traces else f"{name} ({index})"] = columns
+        return traces
+
+    def _trace_columns(self, index: int) -> dict[str, np.ndarray]:
+        """The data of a trace, in a form `restore_trace` can rebuild it from."""
+        raise NotImplementedError
+
+    def _drop_trace(self, index: int):
+        """Forget any data held for a trace, `figure.data` is handled by the caller."""
+        raise NotImplementedError
+
+    def evict_trace(self, index: int) -> tuple[str, dict[str, np.ndarray]]:
+        """Remove a trace, returning its name and data so it can be spilled to disk.
+
+        The caller must stop the figure from being emitted meanwhile.
+        """
+        name = self.figure.data[index].name  # type: ignore
+        columns = self._trace_columns(index)
+        self._drop_trace(index)
+        data = self.figure.data
+        self.figure.data = data[:index] + data[index + 1 :]  # type: ignore
+        self.generation += 1
+        return name, columns
+
+    def restore_trace(self, name: str, columns: dict[str, np.ndarray]):
+        """Bring back a trace removed by `evict_trace`.
+
+        The caller must stop the figure from being emitted meanwhile.
+        """
+        raise NotImplementedError(f"{type(self).__name__} can't restore traces.")
+
+    def _insert_trace(self, trace) -> int:
+        """Add a restored trace just before the newest trace, which may still be
+        receiving data, returning its index."""
+        index = max(len(self.figure.data) - 1, 0)  # type: ignore
+        self.figure.add_trace(trace)
+        data = self.figure.data
+        self.figure.data = data[:index] + data[-1:] + data[index:-1]  # type: ignore
+        self.generation += 1
+        return index
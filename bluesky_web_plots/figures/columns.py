@@ -0,0 +1,161 @@
+import numpy as np
+from numpy.typing import DTypeLike
+
+from .decimate import block_reduce
+
+
+class ColumnBuffer:
+    """Growable NumPy-backed columns that share a single length.
+
+    Rows are appended into preallocated storage which doubles in capacity when full,
+    so appending is amortized O(1) regardless of how many rows are already held.
+
+    Columns are written before the length is bumped, so a reader on another thread
+    which takes `len()` once and then reads columns up to it always sees complete rows.
+    """
+
+    def __init__(self, dtypes: dict[str, DTypeLike], capacity: int = 1024):
+        self._length = 0
+        self._capacity = max(capacity, 1)
+        self._columns: dict[str, np.ndarray] = {
+            name: np.empty(self._capacity, dtype=dtype)
+            for name, dtype in dtypes.items()
+        }
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return tuple(self._columns)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns.values())
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, np.ndarray]) -> "ColumnBuffer":
+        buffer = cls(
+            {name: column.dtype for name, column in columns.items()},
+            capacity=max((len(column) for column in columns.values()), default=1),
+        )
+        buffer.extend(**columns)
+        return buffer
+
+    def _reserve(self, length: int):
+        if length <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < length:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[: self._length] = column[: self._length]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def append(self, **values):
+        """Append a single row, a value must be given for every column."""
+        self._reserve(self._length + 1)
+        for name, column in self._columns.items():
+            column[self._length] = values[name]
+        self._length += 1
+
+    def extend(self, **columns):
+        """Append many rows at once, a sequence must be given for every column."""
+        arrays = {name: np.asarray(columns[name]) for name in self._columns}
+        count = len(next(iter(arrays.values()), ()))
+        self._reserve(self._length + count)
+        for name, column in self._columns.items():
+            column[self._length : self._length + count] = arrays[name]
+        self._length += count
+
+    def column(self, name: str, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """A view (not a copy) of the filled part of a column."""
+        stop = self._length if stop is None else min(stop, self._length)
+        return self._columns[name][start:stop]
+
+
+class FrameRing:
+    """A fixed number of equal length frames (e.g spectra), the oldest overwritten first.
+
+    Memory is bounded by `capacity * width`, and pushing a frame is one row copy.
+    """
+
+    def __init__(self, capacity: int, width: int, dtype: DTypeLike = np.float64):
+        self.capacity = max(capacity, 1)
+        self.width = width
+        self._frames = np.full((self.capacity, width), np.nan, dtype=dtype)
+        self._times = np.zeros(self.capacity, dtype=np.float64)
+        self._count = 0  # Total frames ever pushed.
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def version(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return self._frames.nbytes + self._times.nbytes
+
+    def push(self, frames: np.ndarray, times: np.ndarray):
+        """Push any number of frames, as a (frames, width) array and their times."""
+        frames = frames[-self.capacity :]
+        times = times[-self.capacity :]
+        positions = (self._count + np.arange(len(frames))) % self.capacity
+        self._frames[positions] = frames
+        self._times[positions] = times
+        self._count += len(frames)
+
+    def ordered(self) -> tuple[np.ndarray, np.ndarray]:
+        """Copies of the held times and frames, oldest first."""
+        count = self._count
+        if count <= self.capacity:
+            return self._times[:count].copy(), self._frames[:count].copy()
+        order = (count + np.arange(self.capacity)) % self.capacity
+        return self._times[order], self._frames[order]
+
+
+class ImagePyramid:
+    """The latest frame of an image, and copies of it downsampled by 2, 4, 8... which
+    are only made once they're asked for.
+
+    Pushing a frame drops the previous one along with its downsampled levels.
+    """
+
+    def __init__(self, how: str = "MEAN"):
+        self._how = how
+        self._levels: list[np.ndarray] = []
+        self._count = 0  # Total frames ever pushed.
+
+    @property
+    def version(self) -> int:
+        return self._count
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """Rows and columns of the full resolution frame."""
+        return self._levels[0].shape if self._levels else (0, 0)  # type: ignore
+
+    @property
+    def levels(self) -> int:
+        """Number of levels, down to a single pixel."""
+        size = max(self.shape)
+        return int(np.ceil(np.log2(size))) + 1 if size else 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self._levels)
+
+    def push(self, frame: np.ndarray):
+        self._levels = [frame]
+        self._count += 1
+
+    def level(self, level: int) -> np.ndarray:
+        """The frame downsampled by `2 ** level`, each level made from the one above."""
+        level = min(level, self.levels - 1)
+        while len(self._levels) <= level:
+            self._levels.append(block_reduce(self._levels[-1], 2, self._how))
+        return self._levels[level]
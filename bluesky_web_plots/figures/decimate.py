@@ -0,0 +1,85 @@
+import numpy as np
+
+
+def min_max(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the minimum and maximum of `y` in each of `n_out // 2` buckets.
+
+    Keeps the envelope of the data (spikes survive), fully vectorized.
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    buckets = max(n_out // 2, 1)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    rows = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    with np.errstate(invalid="ignore"):
+        low = np.argmin(np.where(np.isnan(rows), np.inf, rows), axis=1) + offsets
+        high = np.argmax(np.where(np.isnan(rows), -np.inf, rows), axis=1) + offsets
+    indices = np.concatenate(([0, n - 1], low, high))
+    return np.unique(np.minimum(indices, n - 1))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices chosen by Largest-Triangle-Three-Buckets.
+
+    Keeps the visual shape of the line better than `min_max`, at the cost of one
+    (vectorized) step per output point.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        next_start = stop
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_stop = max(next_stop, next_start + 1)
+        mean_x = np.mean(x[next_start:next_stop])
+        mean_y = np.mean(y[next_start:next_stop])
+        areas = np.abs(
+            (x[previous] - mean_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (mean_y - y[previous])
+        )
+        if np.all(np.isnan(areas)):
+            previous = start
+        else:
+            previous = start + int(np.nanargmax(areas))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def block_reduce(image: np.ndarray, factor: int, how: str = "MEAN") -> np.ndarray:
+    """`image` downsampled by `factor` along both axes, each pixel the mean (as float32)
+    or the max ("MAX") of a `factor` by `factor` block, fully vectorized.
+
+    The last row and column are repeated to pad the image to whole blocks.
+    """
+    rows, columns = image.shape
+    padding = (-rows % factor, -columns % factor)
+    if any(padding):
+        image = np.pad(image, ((0, padding[0]), (0, padding[1])), mode="edge")
+    # One strided view per position in a block, combined elementwise, which is much
+    # faster than reducing over the axes of a (rows, factor, columns, factor) view.
+    offsets = [
+        image[row::factor, column::factor]
+        for row in range(factor)
+        for column in range(factor)
+    ]
+    if how == "MAX":
+        reduced = offsets[0].copy()
+        for offset in offsets[1:]:
+            np.maximum(reduced, offset, out=reduced)
+        return reduced
+    reduced = offsets[0].astype(np.float32)
+    for offset in offsets[1:]:
+        np.add(reduced, offset, out=reduced)
+    reduced *= 1 / factor**2
+    return reduced
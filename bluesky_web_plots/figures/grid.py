@@ -0,0 +1,289 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .columns import ColumnBuffer
+
+
+class Grid(ABC):
+    """Accumulates scattered (x, y, z) points into a z matrix for a heatmap."""
+
+    version: int = 0
+    """Bumped whenever a point is added."""
+
+    @abstractmethod
+    def add(self, x: np.ndarray, y: np.ndarray, z: np.ndarray):
+        """Add any number of points, as equal length arrays."""
+
+    @abstractmethod
+    def axes(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """x coordinates of the columns, y coordinates of the rows and the z matrix."""
+
+    @abstractmethod
+    def ranges(self) -> tuple[list[float], list[float]] | None:
+        """x and y ranges covering every point added so far."""
+
+    @property
+    @abstractmethod
+    def points(self) -> int:
+        """Points held, kept as they're added so it's cheap to report."""
+
+    @property
+    @abstractmethod
+    def nbytes(self) -> int:
+        pass
+
+
+class DenseGrid(Grid):
+    """A grid preallocated from the scan's shape and extents, e.g from a `grid_scan`.
+
+    Points are binned into the nearest cell in O(1), cells never visited stay NaN.
+    """
+
+    def __init__(
+        self,
+        x_num: int,
+        x_extent: tuple[float, float],
+        y_num: int,
+        y_extent: tuple[float, float],
+    ):
+        self._x = np.linspace(*x_extent, x_num)
+        self._y = np.linspace(*y_extent, y_num)
+        self._z = np.full((y_num, x_num), np.nan)
+        # Running bounds of the filled cells, as (first, last) indices.
+        self._columns: tuple[int, int] | None = None
+        self._rows: tuple[int, int] | None = None
+        self._filled = 0
+
+    @staticmethod
+    def _cells(values: np.ndarray, coordinates: np.ndarray) -> np.ndarray:
+        if len(coordinates) < 2 or coordinates[0] == coordinates[-1]:
+            return np.zeros(len(values), dtype=np.int64)
+        fractions = (values - coordinates[0]) / (coordinates[-1] - coordinates[0])
+        cells = np.rint(fractions * (len(coordinates) - 1))
+        return np.clip(np.nan_to_num(cells), 0, len(coordinates) - 1).astype(np.int64)
+
+    @staticmethod
+    def _grow(bounds: tuple[int, int] | None, cells: np.ndarray) -> tuple[int, int]:
+        low, high = int(cells.min()), int(cells.max())
+        if bounds is None:
+            return low, high
+        return min(bounds[0], low), max(bounds[1], high)
+
+    def add(self, x: np.ndarray, y: np.ndarray, z: np.ndarray):
+        if not len(z):
+            return
+        columns = self._cells(np.asarray(x, dtype=np.float64), self._x)
+        rows = self._cells(np.asarray(y, dtype=np.float64), self._y)
+        cells = np.unique(rows * len(self._x) + columns)
+        filled = np.count_nonzero(~np.isnan(self._z.ravel()[cells]))
+        self._z[rows, columns] = z
+        self._filled += int(
+            np.count_nonzero(~np.isnan(self._z.ravel()[cells])) - filled
+        )
+        self._columns = self._grow(self._columns, columns)
+        self._rows = self._grow(self._rows, rows)
+        self.version += 1
+
+    def axes(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self._x, self._y, self._z
+
+    @property
+    def nbytes(self) -> int:
+        return self._x.nbytes + self._y.nbytes + self._z.nbytes
+
+    @property
+    def points(self) -> int:
+        return self._filled
+
+    @staticmethod
+    def _range(coordinates: np.ndarray, bounds: tuple[int, int]) -> list[float]:
+        # Pad by half a cell so the outermost cells are fully visible.
+        half = abs(coordinates[-1] - coordinates[0]) / max(len(coordinates) - 1, 1) / 2
+        low, high = sorted((coordinates[bounds[0]], coordinates[bounds[1]]))
+        return [float(low - half), float(high + half)]
+
+    def ranges(self) -> tuple[list[float], list[float]] | None:
+        if self._columns is None or self._rows is None:
+            return None
+        return self._range(self._x, self._columns), self._range(self._y, self._rows)
+
+
+def _extent(values: np.ndarray) -> tuple[float, float]:
+    # Python's min and max beat NumPy's on the few points of an event.
+    if len(values) < 32:
+        listed = values.tolist()
+        return min(listed), max(listed)
+    return float(values.min()), float(values.max())
+
+
+class _AxisBins:
+    """The bins along one axis of a `BinningGrid`, updated as coordinates arrive.
+
+    Coordinates are clustered wherever the gap to the next one is wider than readback
+    noise, taken as `1 / (2 * max_bins)` of the span so far. Each cluster's extent,
+    sum and count are kept, so new coordinates are only clustered together with the
+    existing clusters rather than with every coordinate seen. Once more than
+    `max_bins` clusters are found the axis is binned evenly over its span instead.
+    """
+
+    def __init__(self, max_bins: int):
+        self._max_bins = max_bins
+        self._low, self._high = np.inf, -np.inf
+        self._lows = self._highs = self._sums = self._counts = np.empty(0)
+        self._even = False
+
+    def __len__(self) -> int:
+        return self._max_bins if self._even else len(self._lows)
+
+    def add(self, values: np.ndarray) -> np.ndarray | None:
+        """Take in new coordinates, returning the bin each bin before is now, or None
+        if the coordinates taken in before have to be binned again."""
+        low = min(self._low, float(values.min()))
+        high = max(self._high, float(values.max()))
+        widened = (low, high) != (self._low, self._high)
+        self._low, self._high = low, high
+        if self._even:
+            return None if widened else np.arange(self._max_bins)
+
+        clusters = len(self._lows)
+        ordered = np.sort(values)
+        lows = np.concatenate([self._lows, ordered])
+        order = np.argsort(lows, kind="stable")
+        lows = lows[order]
+        highs = np.concatenate([self._highs, ordered])[order]
+        # Existing clusters start a new one unless the gap to those below closed.
+        starts = np.empty(len(lows), dtype=bool)
+        starts[0] = True
+        reach = np.maximum.accumulate(highs)
+        starts[1:] = lows[1:] - reach[:-1] > (high - low) / (2 * self._max_bins)
+        labels = np.cumsum(starts) - 1
+        if labels[-1] >= self._max_bins:
+            self._even = True
+            self._lows = self._highs = self._sums = self._counts = np.empty(0)
+            return None
+
+        first = np.flatnonzero(starts)
+        sums = np.concatenate([self._sums, ordered])[order]
+        counts = np.concatenate([self._counts, np.ones(len(ordered))])[order]
+        self._lows = lows[first]
+        self._highs = np.maximum.reduceat(highs, first)
+        self._sums = np.add.reduceat(sums, first)
+        self._counts = np.add.reduceat(counts, first)
+        # Clusters only move along as new ones are found between them, unless some
+        # merged as the span widened.
+        moved = labels[order < clusters]
+        return None if np.any(np.diff(moved) == 0) else moved
+
+    def bins(self, values: np.ndarray) -> np.ndarray:
+        """The bin of each of `values`, which must have been taken in."""
+        if self._even:
+            span = self._high - self._low
+            bins = (values - self._low) / span * self._max_bins
+            return np.minimum(bins.astype(np.int64), self._max_bins - 1)
+        return np.maximum(np.searchsorted(self._lows, values, side="right") - 1, 0)
+
+    def centres(self) -> np.ndarray:
+        if self._even:
+            span = self._high - self._low
+            return self._low + (np.arange(self._max_bins) + 0.5) * span / self._max_bins
+        return self._sums / self._counts
+
+
+class BinningGrid(Grid):
+    """A grid for scans whose shape isn't known up front, binned from the points
+    received so far.
+
+    Points are kept as columns, so memory grows with the number of points rather than
+    the number of distinct coordinates. Each axis is binned by `_AxisBins` into at
+    most `max_bins` bins. Only points added since the last `axes` are binned, unless
+    the bins of earlier points have changed, e.g when a new row of a raster scan
+    starts, which happens far less often than points arrive.
+
+    If the points fill less than `min_fill` of the grid's cells (e.g a spiral scan),
+    `axes` returns them as scattered points with 1D x, y and z.
+    """
+
+    def __init__(self, max_bins: int = 512, min_fill: float = 0.25):
+        self._max_bins = max_bins
+        self._min_fill = min_fill
+        self._points = ColumnBuffer({"x": np.float64, "y": np.float64, "z": np.float64})
+        self._ranges: tuple[list[float], list[float]] | None = None
+        # Binned by `axes` (on the server's thread) rather than `add`.
+        self._x_bins = _AxisBins(max_bins)
+        self._y_bins = _AxisBins(max_bins)
+        self._binned = 0
+        self._z = np.empty((0, 0))
+        self._visited = np.empty((0, 0), dtype=bool)
+        self._filled = 0
+        self._axes: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+        self._axes_version = 0
+
+    def add(self, x: np.ndarray, y: np.ndarray, z: np.ndarray):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        placed = ~(np.isnan(x) | np.isnan(y))
+        if not placed.any():
+            return
+        x, y = x[placed], y[placed]
+        self._points.extend(x=x, y=y, z=np.asarray(z, dtype=np.float64)[placed])
+        x_low, x_high = _extent(x)
+        y_low, y_high = _extent(y)
+        if self._ranges is not None:
+            (x_min, x_max), (y_min, y_max) = self._ranges
+            x_low, x_high = min(x_low, x_min), max(x_high, x_max)
+            y_low, y_high = min(y_low, y_min), max(y_high, y_max)
+        self._ranges = [x_low, x_high], [y_low, y_high]
+        self.version += 1
+
+    def axes(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        version, length = self.version, len(self._points)
+        if self._axes is not None and self._axes_version == version:
+            return self._axes
+        x = self._points.column("x", stop=length)
+        y = self._points.column("y", stop=length)
+        z = self._points.column("z", stop=length)
+        if not length:
+            return x, y, z
+        start = self._binned
+        if start < length:
+            moved_columns = self._x_bins.add(x[start:])
+            moved_rows = self._y_bins.add(y[start:])
+            shape = (len(self._y_bins), len(self._x_bins))
+            if moved_columns is None or moved_rows is None:
+                start = 0
+                self._z = np.full(shape, np.nan)
+                self._visited = np.zeros(shape, dtype=bool)
+                self._filled = 0
+            elif shape != self._z.shape:
+                # New bins between the old ones, e.g a raster scan's next row.
+                cells = np.ix_(moved_rows, moved_columns)
+                previous, self._z = self._z, np.full(shape, np.nan)
+                self._z[cells] = previous
+                previous, self._visited = self._visited, np.zeros(shape, dtype=bool)
+                self._visited[cells] = previous
+            columns = self._x_bins.bins(x[start:])
+            rows = self._y_bins.bins(y[start:])
+            cells = rows * shape[1] + columns
+            visited = self._visited.ravel()
+            self._filled += len(np.unique(cells[~visited[cells]]))
+            visited[cells] = True
+            self._z[rows, columns] = z[start:]
+            self._binned = length
+        if self._filled < self._min_fill * self._z.size:
+            axes = (x, y, z)
+        else:
+            axes = (self._x_bins.centres(), self._y_bins.centres(), self._z.copy())
+        self._axes, self._axes_version = axes, version
+        return axes
+
+    @property
+    def nbytes(self) -> int:
+        return self._points.nbytes + self._z.nbytes + self._visited.nbytes
+
+    @property
+    def points(self) -> int:
+        return len(self._points)
+
+    def ranges(self) -> tuple[list[float], list[float]] | None:
+        return self._ranges
@@ -0,0 +1,89 @@
+from importlib import import_module
+from typing import TYPE_CHECKING, cast
+
+from event_model.documents import DataKey
+
+from bluesky_web_plots.structures.array import Array, View
+from bluesky_web_plots.structures.base_structure import Base
+from bluesky_web_plots.structures.sample_map import SampleMap
+from bluesky_web_plots.structures.scalar import PlotAgainst, Scalar
+
+if TYPE_CHECKING:
+    from .base_figure import BaseFigureCallback
+
+
+class FigureRegistry:
+    """Which figure plots which structure or data key dtype.
+
+    Figures can be registered by import path, they're only imported once a run needs
+    them. Structures and dtypes registered later take precedence.
+    """
+
+    def __init__(self):
+        self._structures: list[tuple[type[Base], type | str]] = []
+        self._dtypes: dict[str, tuple[type | str, Base]] = {}
+
+    def register_structure(
+        self, structure: type[Base], figure: "type[BaseFigureCallback] | str"
+    ):
+        """Plot structures given in the run start hints (e.g `SampleMap`) with
+        `figure`, made as soon as the run starts. `figure` is either the class or
+        its import path as "module:Class"."""
+        self._structures.insert(0, (structure, figure))
+
+    def register_dtype(
+        self, dtype: str, figure: "type[BaseFigureCallback] | str", default: Base
+    ):
+        """Plot hinted data keys of `dtype` with `figure`, made on the first descriptor
+        with the data key. `default` is the structure used if the run start gave none
+        for the data key, its `names` are filled in."""
+        self._dtypes[dtype] = (figure, default)
+
+    @staticmethod
+    def _resolve(figure: type | str) -> "type[BaseFigureCallback]":
+        if isinstance(figure, str):
+            module, _, name = figure.partition(":")
+            return getattr(import_module(module), name)
+        return figure
+
+    def for_structure(self, structure: Base) -> "type[BaseFigureCallback] | None":
+        """The figure for a structure which isn't plotted by data key dtype."""
+        keys = structure.keys()
+        for structure_type, figure in self._structures:
+            if (
+                structure_type.__required_keys__
+                <= keys
+                <= structure_type.__annotations__.keys()
+            ):
+                return self._resolve(figure)
+        return None
+
+    def for_data_key(
+        self, name: str, data_key: DataKey, structure: Base | None = None
+    ) -> "BaseFigureCallback | None":
+        """A new figure for a hinted data key, `None` if its dtype isn't plotted."""
+        if data_key["dtype"] not in self._dtypes:
+            return None
+        figure, default = self._dtypes[data_key["dtype"]]
+        return self._resolve(figure)(
+            structure or cast(Base, {**default, "names": (name,)})
+        )
+
+
+FIGURES = FigureRegistry()
+"""The figures used by `WebPlotCallback`, register your own on it."""
+
+FIGURES.register_structure(
+    SampleMap, "bluesky_web_plots.figures.sample_map:SampleMapFigureCallback"
+)
+for _dtype in ("number", "integer"):
+    FIGURES.register_dtype(
+        _dtype,
+        "bluesky_web_plots.figures.scalar:ScalarFigureCallback",
+        Scalar(names=(), plot_against=PlotAgainst.SEQ_NUM),
+    )
+FIGURES.register_dtype(
+    "array",
+    "bluesky_web_plots.figures.array:ArrayFigureCallback",
+    Array(names=(), view=View.SLICE),
+)
@@ -1,3 +1,4 @@
+import numpy as np
 from event_model.documents import Event, EventDescriptor, EventPage, RunStart
 from plotly import graph_objs as go
 from plotly.subplots import make_subplots
@@ -5,7 +6,8 @@ from plotly.subplots import make_subplots
 from bluesky_web_plots.structures.sample_map import SampleMap
 
 from ..logger import logger
-from .base_figure import BaseFigureCallback
+from .base_figure import AxisRanges, BaseFigureCallback
+from .grid import BinningGrid, DenseGrid, Grid
 
 
 class SampleMapFigureCallback(BaseFigureCallback[SampleMap]):
@@ -15,25 +17,60 @@ class SampleMapFigureCallback(BaseFigureCallback[SampleMap]):
         self.structure = structure
         self._z_data_key = structure["intensity_data_key"]
         x_y_data_keys = tuple(
-            set(structure["names"])
-            - {
-                self._z_data_key,
-            }
-        )  # type: ignore
+            name for name in structure["names"] if name != self._z_data_key
+        )
         if len(x_y_data_keys) != 2:
             logger.warning(
                 "Received a request for a sample map with more than two x, y dimensions: "
                 f"{x_y_data_keys}. Only the first two will be used."
             )
-        self._x_data_key, self._y_data_key, *_ = list(x_y_data_keys)
+        self._x_data_key, self._y_data_key, *_ = x_y_data_keys
         self.figure = make_subplots(x_title=self._x_data_key, y_title=self._y_data_key)
         self.figure.update_layout({"uirevision": "constant"})
 
+        # One grid per trace in `figure.data`, and the grid version last emitted.
+        self._grids: list[Grid] = []
+        self._emitted_versions: list[int] = []
+
     def _get_axis_template(self, name: str, min: float, max: float) -> dict:
         return dict(
             range=[min, max],
         )
 
+    def _axis(self, document: RunStart, data_key: str) -> int | None:
+        """Which of the plan's dimensions `data_key` is scanned along."""
+        dimensions = document.get("hints", {}).get("dimensions", [])
+        for index, (fields, _) in enumerate(dimensions):
+            if data_key in fields:
+                return index
+        for index, motor in enumerate(document.get("motors", ())):
+            if data_key == motor or data_key.startswith(f"{motor}-"):
+                return index
+        return None
+
+    def _new_grid(self, document: RunStart) -> Grid:
+        """A preallocated grid if the plan tells us its shape (e.g `grid_scan`),
+        otherwise one which grows as points come in."""
+        shape = document.get("shape")
+        extents = document.get("extents")
+        x_axis = self._axis(document, self._x_data_key)
+        y_axis = self._axis(document, self._y_data_key)
+        if (
+            shape
+            and extents
+            and len(shape) == len(extents) == 2
+            and x_axis is not None
+            and y_axis is not None
+            and x_axis != y_axis
+        ):
+            return DenseGrid(
+                shape[x_axis],
+                tuple(extents[x_axis]),
+                shape[y_axis],
+                tuple(extents[y_axis]),
+            )
+        return BinningGrid()
+
     def run_start(self, document: RunStart):
         self._scan_id = document.get("scan_id", document["uid"][4:])
         self.figure.add_trace(
@@ -45,6 +82,9 @@ class SampleMapFigureCallback(BaseFigureCallback[SampleMap]):
                 name=f"plan {self._scan_id}",
             )
         )
+        self._emitted_versions.append(0)
+        self._grids.append(self._new_grid(document))
+        self.generation += 1
 
     def descriptor(self, document: EventDescriptor):
         if (
@@ -53,66 +93,68 @@ class SampleMapFigureCallback(BaseFigureCallback[SampleMap]):
         ):
             return
 
-        # We don't add the trace here since empty data would mean that the trace wouldn't
-        # be accessible.
-
     def event(self, document: Event):
-        if not set(self.structure["names"]) <= document["data"].keys():
-            return
+        data = document["data"]
+        self._grids[-1].add(
+            np.array([data[self._x_data_key]]),
+            np.array([data[self._y_data_key]]),
+            np.array([data[self._z_data_key]]),
+        )
+        self.generation += 1
 
-        new_x = document["data"][self._x_data_key]
-        new_y = document["data"][self._y_data_key]
-        new_z = document["data"][self._z_data_key]
-
-        if self.figure.data:
-            x = self.figure.data[-1].x + (new_x,)  # type: ignore
-            y = self.figure.data[-1].y + (new_y,)  # type: ignore
-            z = self.figure.data[-1].z + (new_z,)  # type: ignore
-            self.figure.update_layout(
-                xaxis=self._get_axis_template(self._x_data_key, min(x), max(x)),
-                yaxis=self._get_axis_template(self._y_data_key, min(y), max(y)),
-            )
-            self.figure.data[-1].x = x  # type: ignore
-            self.figure.data[-1].y = y  # type: ignore
-            self.figure.data[-1].z = z  # type: ignore
-        else:
-            self.figure.add_trace(
-                go.Heatmap(
-                    x=[
-                        new_x,
-                    ],
-                    y=[
-                        new_y,
-                    ],
-                    z=[
-                        new_z,
-                    ],
-                    colorscale=self.structure["color_scale"],
-                    name=f"plan {self._scan_id}",
+    def event_page(self, document: EventPage):
+        data = document["data"]
+        self._grids[-1].add(
+            np.asarray(data[self._x_data_key]),
+            np.asarray(data[self._y_data_key]),
+            np.asarray(data[self._z_data_key]),
+        )
+        self.generation += 1
+
+    def emit(self, view: AxisRanges | None = None) -> go.Figure:
+        for index, grid in enumerate(self._grids):
+            version = grid.version
+            if version == self._emitted_versions[index]:
+                continue
+            x, y, z = grid.axes()
+            trace = self.figure.data[index]
+            trace.x = x  # type: ignore
+            trace.y = y  # type: ignore
+            trace.z = z  # type: ignore
+            self._emitted_versions[index] = version
+            ranges = grid.ranges()
+            if ranges and index == len(self._grids) - 1:
+                self.figure.update_layout(
+                    xaxis=self._get_axis_template(self._x_data_key, *ranges[0]),
+                    yaxis=self._get_axis_template(self._y_data_key, *ranges[1]),
                 )
-            )
-            self.figure.update_layout(
-                xaxis=self._get_axis_template(
-                    self._x_data_key, min(new_x, 0), max(new_x, 0)
-                ),
-                yaxis=self._get_axis_template(
-                    self._y_data_key, min(new_y, 0), max(new_y, 0)
-                ),
-            )
+        return self.figure
 
-        # trace = self.figure.data[-1]
-        # trace.x += (x,)  # type: ignore
-        # trace.y += (y,)  # type: ignore
-        # trace.z += (z,)  # type: ignore
+    def trace_points(self) -> list[int]:
+        return [grid.points for grid in self._grids]
 
-    def event_page(self, document: EventPage):
-        if not set(self.structure["names"]) <= document["data"].keys():
-            return
+    def trace_nbytes(self) -> list[int]:
+        return [grid.nbytes for grid in self._grids]
 
-        x = document["data"][self._x_data_key]
-        y = document["data"][self._y_data_key]
-        z = document["data"][self._z_data_key]
-        trace = self.figure.data[-1]
-        trace.x += tuple(x)  # type: ignore
-        trace.y += tuple(y)  # type: ignore
-        trace.z += tuple(z)  # type: ignore
+    def _trace_columns(self, index: int) -> dict[str, np.ndarray]:
+        x, y, z = self._grids[index].axes()
+        return {"x": x, "y": y, "z": z}
+
+    def _drop_trace(self, index: int):
+        del self._emitted_versions[index]
+        del self._grids[index]
+
+    def restore_trace(self, name: str, columns: dict[str, np.ndarray]):
+        grid = BinningGrid()
+        x, y, z = columns["x"], columns["y"], columns["z"]
+        if z.ndim == 2:
+            x, y = np.meshgrid(x, y)
+        filled = ~np.isnan(z)
+        grid.add(x[filled], y[filled], z[filled])
+        index = self._insert_trace(
+            go.Heatmap(
+                x=[], y=[], z=[], colorscale=self.structure["color_scale"], name=name
+            )
+        )
+        self._emitted_versions.insert(index, 0)
+        self._grids.insert(index, grid)
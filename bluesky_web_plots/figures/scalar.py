@@ -1,22 +1,35 @@
 from datetime import datetime
 
+import numpy as np
 from event_model.documents import Event, EventDescriptor, EventPage, RunStart
 from plotly import graph_objs as go
 from plotly.subplots import make_subplots
 
-from bluesky_web_plots.structures.scalar import PlotAgainst, Scalar
+from bluesky_web_plots.structures.scalar import Decimation, PlotAgainst, Scalar
+from bluesky_web_plots.utils import to_local_datetime64
 
-from .base_figure import BaseFigureCallback
+from .base_figure import AxisRanges, BaseFigureCallback
+from .columns import ColumnBuffer
+from .decimate import lttb, min_max
+
+_COLUMNS = {"time": np.float64, "seq_num": np.int64, "y": np.float64}
 
 
 class ScalarFigureCallback(BaseFigureCallback[Scalar]):
     structure: Scalar
 
-    def __init__(self, structure: Scalar):
+    def __init__(self, structure: Scalar, max_points: int = 2000):
         self.structure = structure
+        self.max_points = max_points
+        """Traces longer than this are decimated before being sent to the browser."""
         self.figure = make_subplots(shared_xaxes=True)
         self.figure.update_layout({"uirevision": "constant"})
 
+        # One buffer per trace in `figure.data`, only copied into the trace on `emit`.
+        self._runs: list[ColumnBuffer] = []
+        # The length and x range each trace was last emitted with.
+        self._emitted: list[tuple[int, list | None]] = []
+
     def run_start(self, document: RunStart):
         self._scan_id = document.get("scan_id", document["uid"][4:])
 
@@ -35,31 +48,139 @@ class ScalarFigureCallback(BaseFigureCallback[Scalar]):
         )
 
         self.figure.add_trace(
-            go.Scatter(x=[], y=[], mode="lines+markers", name=f"plan {self._scan_id}")
+            self._scatter(
+                x=[], y=[], mode="lines+markers", name=f"plan {self._scan_id}"
+            )
         )
+        self._emitted.append((0, None))
+        self._runs.append(ColumnBuffer(_COLUMNS))
+        self.generation += 1
 
     def event(self, document: Event):
-        if self.structure["names"][0] not in document["data"].keys():
-            return
+        self._runs[-1].append(
+            time=document["time"],
+            seq_num=document["seq_num"],
+            y=document["data"][self.structure["names"][0]],
+        )
+
+    def event_page(self, document: EventPage):
+        self._runs[-1].extend(
+            time=document["time"],
+            seq_num=document["seq_num"],
+            y=document["data"][self.structure["names"][0]],
+        )
+
+    def sync_traces(self):
+        if not self._webgl:
+            # Traces longer than `max_points` are decimated to about `max_points`.
+            self._check_webgl(
+                sum(min(len(run), self.max_points) for run in self._runs),
+                self.structure.get("webgl_points", self.webgl_points),
+            )
+
+    def _x(self, run: ColumnBuffer, start: int = 0, stop: int | None = None):
         if self.structure["plot_against"] == PlotAgainst.TIME:
-            x = datetime.fromtimestamp(document["time"])
-        else:
-            x = document["seq_num"]
+            return to_local_datetime64(run.column("time", start, stop))
+        return run.column("seq_num", start, stop)
 
-        y = document["data"][self.structure["names"][0]]
-        trace = self.figure.data[-1]
-        trace.x += (x,)  # type: ignore
-        trace.y += (y,)  # type: ignore
+    def _x_column(self) -> str:
+        return (
+            "time" if self.structure["plot_against"] == PlotAgainst.TIME else "seq_num"
+        )
 
-    def event_page(self, document: EventPage):
-        if self.structure["names"][0] not in document["data"].keys():
-            return
+    def _window(self, run: ColumnBuffer, x_range: list | None, length: int):
+        """Rows of `run` to send for `x_range`, one extra on each side so the line
+        continues off the edges of the plot."""
+        if not x_range:
+            return 0, length
         if self.structure["plot_against"] == PlotAgainst.TIME:
-            x = [datetime.fromtimestamp(time) for time in document["time"]]
+            # The browser reports naive local times, as produced by `_x`.
+            low, high = (
+                datetime.fromisoformat(str(bound)).timestamp() for bound in x_range
+            )
         else:
-            x = document["seq_num"]
+            low, high = (float(bound) for bound in x_range)
+        column = run.column(self._x_column(), stop=length)
+        start = int(np.searchsorted(column, low, side="left")) - 1
+        stop = int(np.searchsorted(column, high, side="right")) + 1
+        return max(start, 0), min(stop, length)
+
+    def _decimate(self, run: ColumnBuffer, start: int, stop: int) -> np.ndarray:
+        y = run.column("y", start, stop)
+        if self.structure.get("decimation") == Decimation.LTTB:
+            return lttb(run.column(self._x_column(), start, stop), y, self.max_points)
+        return min_max(y, self.max_points)
+
+    def emit(self, view: AxisRanges | None = None) -> go.Figure:
+        x_range = (view or {}).get("x")
+        for index, run in enumerate(self._runs):
+            length = len(run)
+            if self._emitted[index] == (length, x_range):
+                continue
+            start, stop = self._window(run, x_range, length)
+            x = self._x(run, start, stop)
+            y = run.column("y", start, stop)
+            if stop - start > self.max_points:
+                keep = self._decimate(run, start, stop)
+                x, y = x[keep], y[keep]
+            trace = self.figure.data[index]
+            trace.x = x  # type: ignore
+            trace.y = y  # type: ignore
+            self._emitted[index] = (length, x_range)
+        return self.figure
+
+    def cursor(self) -> list[int]:
+        return [length for length, _ in self._emitted]
+
+    def needs_refresh(self, cursor: list[int], view: AxisRanges | None) -> bool:
+        # Only traces holding every point up to the end of their run can be extended,
+        # and only until they'd need decimating.
+        x_range = (view or {}).get("x")
+        for index, run in enumerate(self._runs[: len(cursor)]):
+            length = len(run)
+            if length == cursor[index]:
+                continue
+            start, stop = self._window(run, x_range, cursor[index])
+            if stop < cursor[index] or length - start > self.max_points:
+                return True
+        return False
 
-        y = document["data"][self.structure["names"][0]]
-        trace = self.figure.data[-1]
-        trace.x += tuple(x)  # type: ignore
-        trace.y += tuple(y)  # type: ignore
+    def extend_data(
+        self, cursor: list[int]
+    ) -> tuple[dict[str, list], list[int], list[int]] | None:
+        if len(cursor) != len(self._runs):
+            return None
+        xs, ys, indices = [], [], []
+        lengths = list(cursor)
+        for index, run in enumerate(self._runs):
+            length = len(run)
+            if length <= cursor[index]:
+                continue
+            xs.append(self._x(run, cursor[index], length))
+            ys.append(run.column("y", cursor[index], length))
+            indices.append(index)
+            lengths[index] = length
+        if not indices:
+            return None
+        return {"x": xs, "y": ys}, indices, lengths
+
+    def trace_points(self) -> list[int]:
+        return [len(run) for run in self._runs]
+
+    def trace_nbytes(self) -> list[int]:
+        return [run.nbytes for run in self._runs]
+
+    def _trace_columns(self, index: int) -> dict[str, np.ndarray]:
+        run = self._runs[index]
+        return {name: run.column(name) for name in run.names}
+
+    def _drop_trace(self, index: int):
+        del self._emitted[index]
+        del self._runs[index]
+
+    def restore_trace(self, name: str, columns: dict[str, np.ndarray]):
+        index = self._insert_trace(
+            self._scatter(x=[], y=[], mode="lines+markers", name=name)
+        )
+        self._emitted.insert(index, (0, None))
+        self._runs.insert(index, ColumnBuffer.from_columns(columns))
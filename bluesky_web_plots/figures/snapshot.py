@@ -0,0 +1,43 @@
+from event_model.documents import Event, EventDescriptor, EventPage, RunStart
+from plotly import graph_objs as go
+
+from .base_figure import AxisRanges, BaseFigureCallback
+
+
+class SnapshotFigureCallback(BaseFigureCallback[None]):
+    """A figure computed in another process, holding the dict it last sent.
+
+    Browsers are sent the whole snapshot whenever it's replaced.
+    """
+
+    def __init__(self, snapshot: dict):
+        self.structure = None
+        self.figure = go.Figure()
+        self.snapshot = snapshot
+
+    def update(self, snapshot: dict, generation: int | None = None):
+        """Replace the snapshot. `generation` is given when several processes hold
+        the same figure, so browsers moving between them don't refetch it."""
+        self.snapshot = snapshot
+        self.generation = self.generation + 1 if generation is None else generation
+
+    def run_start(self, document: RunStart):
+        pass
+
+    def descriptor(self, document: EventDescriptor):
+        pass
+
+    def event(self, document: Event):
+        pass
+
+    def event_page(self, document: EventPage):
+        pass
+
+    def emit(self, view: AxisRanges | None = None) -> go.Figure:
+        return go.Figure(self.snapshot)
+
+    def emit_dict(self, view: AxisRanges | None = None) -> dict:
+        return self.snapshot
+
+    def trace_points(self) -> list[int]:
+        return []
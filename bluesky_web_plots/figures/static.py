@@ -0,0 +1,24 @@
+from event_model.documents import Event, EventDescriptor, EventPage, RunStart
+from plotly import graph_objs as go
+
+from .base_figure import BaseFigureCallback
+
+
+class StaticFigureCallback(BaseFigureCallback[None]):
+    """A non-interactive figure given whole, e.g a `SERIALISED_PLOT` from run_start."""
+
+    def __init__(self, figure: go.Figure):
+        self.structure = None
+        self.figure = figure
+
+    def run_start(self, document: RunStart):
+        pass
+
+    def descriptor(self, document: EventDescriptor):
+        pass
+
+    def event(self, document: Event):
+        pass
+
+    def event_page(self, document: EventPage):
+        pass
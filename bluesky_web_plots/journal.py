@@ -0,0 +1,205 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+from typing import cast
+
+import numpy as np
+from event_model import pack_event_page
+from event_model.documents import Document, Event
+
+try:
+    import orjson  # pyright: ignore
+
+    def loads(data: bytes):
+        """Decode the JSON of a journal record or a replayed line."""
+        return orjson.loads(data)
+
+except ImportError:
+
+    def loads(data: bytes):
+        """Decode the JSON of a journal record or a replayed line."""
+        return json.loads(data)
+
+
+# Each record is its length and CRC32 followed by a JSON list of `[name, document]`,
+# one record per batch written.
+_HEADER = struct.Struct("<II")
+
+
+def _default(value):
+    if isinstance(value, np.ndarray | np.generic):
+        return value.tolist()
+    raise TypeError(f"Can't journal {type(value).__name__}")
+
+
+def _paged(documents: list[tuple[str, Document]]) -> Iterator[tuple[str, Document]]:
+    """Pack runs of events from the same descriptor into event pages."""
+    events: list[Event] = []
+    for name, document in documents:
+        if name == "event" and (
+            not events
+            or events[-1]["descriptor"] == cast(Event, document)["descriptor"]
+        ):
+            events.append(cast(Event, document))
+            continue
+        if events:
+            yield "event_page", pack_event_page(*events)
+            events = []
+        if name == "event":
+            events.append(cast(Event, document))
+        else:
+            yield name, document
+    if events:
+        yield "event_page", pack_event_page(*events)
+
+
+class DocumentJournal:
+    """An append only file of the documents of recent runs, to rebuild the figures
+    from when the service restarts.
+
+    Documents are buffered and written in batches, with the events of a batch packed
+    into event pages, so restoring parses a few large records and figures take their
+    data a column at a time. A record torn by a crash fails its checksum, it and
+    anything after it are dropped when the journal is next read.
+
+    Each run start rotates the file to a numbered segment next to it, e.g
+    "journal.3", and only the segments of the last `max_runs` runs are kept.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        batch_size: int = 512,
+        flush_interval: float = 1.0,
+        max_runs: int | None = None,
+    ):
+        """
+        Args:
+            path (str | Path):
+                The journal file, created if it doesn't exist.
+            batch_size (int):
+                Most documents buffered before they're written.
+            flush_interval (float):
+                Most seconds a document is buffered before it's written.
+            max_runs (int | None):
+                Most runs kept in the journal, every run if not provided.
+        """
+        self.path = Path(path)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_runs = max_runs
+        self._pending: list[tuple[str, Document]] = []
+        self._last_flush = time.monotonic()
+        # Guards the pending documents and the files, flushes also happen on a timer.
+        self._lock = threading.Lock()
+        self._flusher: threading.Thread | None = None
+        self._closed = threading.Event()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch()
+
+    def segments(self) -> list[Path]:
+        """The rotated segments, oldest first, followed by the file being written."""
+        rotated = [
+            path
+            for path in self.path.parent.glob(f"{glob.escape(self.path.name)}.*")
+            if path.suffix[1:].isdigit()
+        ]
+        return sorted(rotated, key=lambda path: int(path.suffix[1:])) + [self.path]
+
+    @staticmethod
+    def _records(path: Path) -> Iterator[tuple[int, bytes]]:
+        """The end offset and payload of every intact record."""
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                offset = 0
+                while offset + _HEADER.size <= len(mapped):
+                    length, checksum = _HEADER.unpack_from(mapped, offset)
+                    start = offset + _HEADER.size
+                    payload = mapped[start : start + length]
+                    if len(payload) < length or zlib.crc32(payload) != checksum:
+                        return
+                    offset = start + length
+                    yield offset, payload
+
+    def documents(self, truncate: bool = True) -> Iterator[tuple[str, Document]]:
+        """Every document in the journal in the order it was received, with events
+        packed into event pages.
+
+        Also truncates a torn tail, so appends carry on from the last intact record,
+        unless `truncate` is False (e.g the journal is still being written).
+        """
+        for path in self.segments():
+            end = 0
+            for end, payload in self._records(path):
+                yield from loads(payload)
+            if truncate and path == self.path and end != path.stat().st_size:
+                os.truncate(path, end)
+
+    def _rotate(self):
+        """Start a new segment for a new run, dropping those of the oldest runs. Must
+        be called with `_lock` held."""
+        if self.path.stat().st_size:
+            segments = self.segments()
+            index = int(segments[-2].suffix[1:]) + 1 if len(segments) > 1 else 1
+            self.path.rename(self.path.with_name(f"{self.path.name}.{index}"))
+            self.path.touch()
+        if self._max_runs is not None:
+            # The new run goes in the file being written.
+            rotated = self.segments()[:-1]
+            for path in rotated[: max(len(rotated) - (self._max_runs - 1), 0)]:
+                path.unlink()
+
+    def append(self, name: str, document: Document):
+        if self._flusher is None:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, daemon=True
+            )
+            self._flusher.start()
+        with self._lock:
+            if name == "start":
+                self._flush()
+                self._rotate()
+            self._pending.append((name, document))
+            if (
+                len(self._pending) >= self._batch_size
+                or name in ("start", "stop")
+                or time.monotonic() - self._last_flush >= self._flush_interval
+            ):
+                self._flush()
+
+    def _flush_periodically(self):
+        # Documents buffered when they stop arriving are written within an interval.
+        while not self._closed.wait(self._flush_interval):
+            with self._lock:
+                if time.monotonic() - self._last_flush >= self._flush_interval:
+                    self._flush()
+
+    def flush(self):
+        """Write buffered documents to disk."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        payload = json.dumps(list(_paged(self._pending)), default=_default).encode()
+        with open(self.path, "ab") as file:
+            file.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            file.flush()
+            os.fsync(file.fileno())
+        self._pending.clear()
+
+    def close(self):
+        """Write buffered documents and stop flushing on a timer."""
+        self._closed.set()
+        self.flush()
@@ -0,0 +1,295 @@
+"""Counters, gauges and histograms exposed in the Prometheus text format on `/metrics`."""
+
+import math
+import threading
+from bisect import bisect_left
+from collections.abc import Iterator
+from typing import TypeVar
+
+Labels = tuple[tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BYTES_BUCKETS = tuple(float(2**power) for power in range(8, 28, 2))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        pairs = ",".join(f'{key}="{_escape(str(item))}"' for key, item in labels)
+        name = f"{name}{{{pairs}}}"
+    if math.isinf(value):
+        return f"{name} {'+Inf' if value > 0 else '-Inf'}"
+    return f"{name} {value:g}" if isinstance(value, float) else f"{name} {value}"
+
+
+class Metric:
+    kind: str
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def exposition(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _ThreadedMetric(Metric):
+    """Recorded by each thread into values of its own, combined when scraped, so that
+    recording takes no lock."""
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, dict]] = []
+        # Values of threads which have finished, e.g werkzeug answers each request on
+        # a thread of its own.
+        self._retired: dict = {}
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._retire()
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    def _retire(self):
+        """Must be called with `_lock` held."""
+        shards = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                shards.append((thread, values))
+            else:
+                self._combine(self._retired, values)
+        self._shards = shards
+
+    def _combined(self) -> dict:
+        """Values of every thread. Must be called with `_lock` held."""
+        self._retire()
+        combined = {}
+        self._combine(combined, self._retired)
+        for _, values in self._shards:
+            # Copying a dict holds the GIL throughout, so the thread recording into it
+            # can't change it mid copy.
+            self._combine(combined, dict(values))
+        return combined
+
+    def _combine(self, into: dict, values: dict):
+        raise NotImplementedError
+
+
+class Counter(_ThreadedMetric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str):
+        self._inc(tuple(sorted(labels.items())), amount)
+
+    def labels(self, **labels: str) -> "BoundCounter":
+        """The counter with its labels resolved once, for counting on hot paths."""
+        return BoundCounter(self, tuple(sorted(labels.items())))
+
+    def _inc(self, key: Labels, amount: float):
+        values = self._shard()
+        values[key] = values.get(key, 0) + amount
+
+    def _combine(self, into: dict, values: dict):
+        for labels, value in values.items():
+            into[labels] = into.get(labels, 0) + value
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._combined().items():
+            yield _format(self.name, labels, value)
+
+
+class BoundCounter:
+    def __init__(self, counter: Counter, key: Labels):
+        self._counter = counter
+        self._key = key
+
+    def inc(self, amount: float = 1):
+        self._counter._inc(self._key, amount)
+
+
+class Gauge(Metric):
+    """A value which can go up and down, usually set just before being scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: dict[Labels, float] = {}
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield _format(self.name, labels, value)
+
+
+class Histogram(_ThreadedMetric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help)
+        self._buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str):
+        self._observe(tuple(sorted(labels.items())) if labels else (), value)
+
+    def labels(self, **labels: str) -> "BoundHistogram":
+        """The histogram with its labels resolved once, for timing on hot paths."""
+        return BoundHistogram(self, tuple(sorted(labels.items())))
+
+    def _observe(self, key: Labels, value: float):
+        values = self._shard()
+        # The count in each bucket (not cumulative), the sum, the count.
+        recorded = values.get(key)
+        if recorded is None:
+            recorded = values[key] = [[0] * (len(self._buckets) + 1), 0.0, 0]
+        recorded[0][bisect_left(self._buckets, value)] += 1
+        recorded[1] += value
+        recorded[2] += 1
+
+    def _combine(self, into: dict, values: dict):
+        for labels, (counts, total, count) in values.items():
+            if labels in into:
+                previous, previous_total, previous_count = into[labels]
+                counts = [a + b for a, b in zip(previous, counts, strict=True)]
+                total, count = total + previous_total, count + previous_count
+            into[labels] = [list(counts), total, count]
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, total, count) in self._combined().items():
+            cumulative = 0
+            for bound, bucket in zip((*self._buckets, math.inf), counts, strict=True):
+                cumulative += bucket
+                yield _format(
+                    f"{self.name}_bucket",
+                    (*labels, ("le", "+Inf" if math.isinf(bound) else f"{bound:g}")),
+                    cumulative,
+                )
+            yield _format(f"{self.name}_sum", labels, total)
+            yield _format(f"{self.name}_count", labels, count)
+
+
+class BoundHistogram:
+    def __init__(self, histogram: Histogram, key: Labels):
+        self._histogram = histogram
+        self._key = key
+
+    def observe(self, value: float):
+        self._histogram._observe(self._key, value)
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def exposition(self) -> str:
+        return "\n".join(metric.exposition() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+DOCUMENTS = REGISTRY.register(
+    Counter("bluesky_web_plots_documents_total", "Documents received, by type.")
+)
+PENDING_UPDATES = REGISTRY.register(
+    Gauge(
+        "bluesky_web_plots_pending_updates",
+        "Figures published but not yet picked up by the server.",
+    )
+)
+DELETED_PLOTS = REGISTRY.register(
+    Gauge(
+        "bluesky_web_plots_deleted_plot_queue",
+        "Plots deleted in the browser not yet forgotten by the callback.",
+    )
+)
+FIGURE_EVENT_SECONDS = REGISTRY.register(
+    Histogram(
+        "bluesky_web_plots_figure_event_seconds",
+        "Time a figure spends handling an event or event page.",
+    )
+)
+TRACE_POINTS = REGISTRY.register(
+    Gauge("bluesky_web_plots_trace_points", "Points held by each trace of a plot.")
+)
+RENDER_SECONDS = REGISTRY.register(
+    Histogram(
+        "bluesky_web_plots_render_seconds",
+        "Time spent emitting figures and extensions for a browser update.",
+    )
+)
+RESPONSE_SECONDS = REGISTRY.register(
+    Histogram(
+        "bluesky_web_plots_response_seconds",
+        "Time to answer a Dash callback request, including serialization.",
+    )
+)
+RESPONSE_BYTES = REGISTRY.register(
+    Histogram(
+        "bluesky_web_plots_response_bytes",
+        "Size of the serialized Dash callback responses.",
+        buckets=BYTES_BUCKETS,
+    )
+)
+PUSH_CONNECTIONS = REGISTRY.register(
+    Gauge(
+        "bluesky_web_plots_push_connections",
+        "Browsers connected to the server sent events stream.",
+    )
+)
+LAG_SECONDS = REGISTRY.register(
+    Histogram(
+        "bluesky_web_plots_lag_seconds",
+        "Time from an event being created to its data being sent to a browser.",
+    )
+)
@@ -0,0 +1,134 @@
+"""Plot runs from a file of saved documents, as fast as they parse or paced as recorded."""
+
+import time
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Any, cast
+
+from event_model import pack_event_page
+from event_model.documents import Document, Event
+
+from bluesky_web_plots.journal import DocumentJournal, loads
+from bluesky_web_plots.logger import logger
+
+FORMATS = ("jsonl", "msgpack", "journal")
+_EXTENSIONS = {".jsonl": "jsonl", ".json": "jsonl", ".msgpack": "msgpack"}
+
+
+def file_format(path: str | Path) -> str:
+    """The format of a document file, by its extension, e.g "run.jsonl"."""
+    return _EXTENSIONS.get(Path(path).suffix, "journal")
+
+
+def read_documents(
+    path: str | Path, format: str | None = None
+) -> Iterator[tuple[str, Document]]:
+    """Stream `(name, document)` from a file, without reading it all at once.
+
+    Formats are "jsonl" with a `[name, document]` list per line (as written by
+    suitcase-jsonl), "msgpack" with a stream of `[name, document]` (as written by
+    suitcase-msgpack), or a "journal" written by `DocumentJournal`.
+    """
+    format = format or file_format(path)
+    if format == "journal":
+        if not Path(path).exists():
+            raise FileNotFoundError(path)
+        # Read only, the journal may still be written by a running service.
+        yield from DocumentJournal(path).documents(truncate=False)
+    elif format == "jsonl":
+        with open(path, "rb") as file:
+            for line in file:
+                if line.strip():
+                    name, document = loads(line)
+                    yield name, document
+    elif format == "msgpack":
+        try:
+            import msgpack  # pyright: ignore
+        except ImportError as exception:
+            logger.warning(
+                f"\033[93mReplaying msgpack requires the 'replay' optional dependencies. {exception} "
+                "Install with: pip install .[replay].\033[0m"
+            )
+            raise
+        with open(path, "rb") as file:
+            for name, document in msgpack.Unpacker(file, raw=False):
+                yield name, document
+    else:
+        raise ValueError(f"Unknown format {format}, expected one of {FORMATS}.")
+
+
+def _document_time(name: str, document: Document) -> float | None:
+    if name == "event_page":
+        return max(document["time"], default=None)  # type: ignore
+    return document.get("time")  # type: ignore
+
+
+def _pages(
+    documents: Iterable[tuple[str, Document]],
+    page_size: int,
+    speed: float | None = None,
+) -> Iterator[tuple[str, Document]]:
+    """Pack runs of up to `page_size` events from the same descriptor into pages.
+
+    With a `speed`, each document is held back until it's due and a page only holds
+    events which are already due, so a slow callback catches up in larger pages
+    rather than falling further behind.
+    """
+    events: list[Event] = []
+    start: tuple[float, float] | None = None
+    for name, document in documents:
+        document_time = _document_time(name, document) if speed else None
+        if speed and document_time is not None:
+            if start is None:
+                start = (time.monotonic(), document_time)
+            delay = start[0] + (document_time - start[1]) / speed - time.monotonic()
+            if delay > 0:
+                if events:
+                    yield "event_page", pack_event_page(*events)
+                    events = []
+                time.sleep(delay)
+        if name == "event":
+            event = cast(Event, document)
+            if events and events[-1]["descriptor"] != event["descriptor"]:
+                yield "event_page", pack_event_page(*events)
+                events = []
+            events.append(event)
+            if len(events) >= page_size:
+                yield "event_page", pack_event_page(*events)
+                events = []
+            continue
+        if events:
+            yield "event_page", pack_event_page(*events)
+            events = []
+        yield name, document
+    if events:
+        yield "event_page", pack_event_page(*events)
+
+
+def replay(
+    documents: Iterable[tuple[str, Document]],
+    # Any, as e.g bluesky's zmq `Publisher` takes plain dicts.
+    callback: Callable[[str, Any], object],
+    page_size: int = 1000,
+    speed: float | None = None,
+) -> dict:
+    """Hand `documents` to `callback` with events packed into pages, returning how
+    many documents and events were replayed and how long it took.
+
+    Args:
+        page_size (int):
+            Most events packed into a page.
+        speed (float | None):
+            Replay in real time (1.0), or that many times faster, rather than as
+            fast as possible. Pages then only hold events which are already due.
+    """
+    counts = {"documents": 0, "events": 0}
+    start = time.perf_counter()
+    for name, document in _pages(documents, page_size, speed):
+        callback(name, document)
+        counts["documents"] += 1
+        if name == "event_page":
+            counts["events"] += len(document["seq_num"])  # type: ignore
+        elif name == "event":
+            counts["events"] += 1
+    return {**counts, "seconds": time.perf_counter() - start}
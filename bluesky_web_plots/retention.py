@@ -0,0 +1,133 @@
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from bluesky_web_plots.figures.base_figure import BaseFigureCallback
+from bluesky_web_plots.logger import logger
+
+Eviction = tuple[tuple[str, ...], str, dict[str, np.ndarray]]
+"""Plot names, trace name and trace data of an evicted trace."""
+
+
+class SpillStore:
+    """Evicted traces kept on disk as compressed `.npz` files, a directory per plot."""
+
+    def __init__(self, directory: str | Path):
+        self._directory = Path(directory)
+
+    def _plot_directory(self, names: tuple[str, ...]) -> Path:
+        return self._directory / quote(", ".join(names), safe="")
+
+    def save(self, names: tuple[str, ...], trace_name: str, columns: dict):
+        directory = self._plot_directory(names)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{time.time_ns()}-{quote(trace_name, safe='')}.npz"
+        np.savez_compressed(path, **columns)
+
+    def _paths(self, names: tuple[str, ...]) -> list[Path]:
+        directory = self._plot_directory(names)
+        if not directory.exists():
+            return []
+        return sorted(directory.glob("*.npz"), key=lambda path: path.name)
+
+    def spilled(self, names: tuple[str, ...]) -> list[str]:
+        """Names of the traces spilled for a plot, oldest first."""
+        return [unquote(path.stem.split("-", 1)[1]) for path in self._paths(names)]
+
+    def load(self, names: tuple[str, ...], trace_name: str) -> dict[str, np.ndarray]:
+        """Take the most recently spilled trace called `trace_name` off disk."""
+        for path in reversed(self._paths(names)):
+            if unquote(path.stem.split("-", 1)[1]) == trace_name:
+                with np.load(path) as stored:
+                    columns = {name: stored[name] for name in stored.files}
+                path.unlink()
+                return columns
+        raise KeyError(f"No spilled trace {trace_name!r} for {names}.")
+
+
+class RetentionPolicy:
+    def __init__(
+        self,
+        max_runs: int | None = None,
+        max_bytes: int | None = None,
+        max_total_bytes: int | None = None,
+        spill_directory: str | Path | None = None,
+    ):
+        """Limits on how much past run data long lived figures hold on to.
+
+        The newest trace of a figure (the run in progress) is never evicted.
+
+        Args:
+            max_runs (int | None):
+                Most traces ("plan {scan_id}") kept in each figure.
+            max_bytes (int | None):
+                Most bytes of trace data kept in each figure.
+            max_total_bytes (int | None):
+                Most bytes of trace data kept over all figures, the least recently
+                updated figures give up their oldest traces first.
+            spill_directory (str | Path | None):
+                Where evicted traces are written to so that they can be recalled,
+                if not provided they are dropped.
+        """
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.store = SpillStore(spill_directory) if spill_directory else None
+        # Least recently updated figures first.
+        self._recently_updated: OrderedDict[tuple[str, ...], None] = OrderedDict()
+
+    def touch(self, names: tuple[str, ...]):
+        """Mark a figure as just updated."""
+        self._recently_updated[names] = None
+        self._recently_updated.move_to_end(names)
+
+    def _over_figure_limits(self, nbytes: list[int]) -> bool:
+        return len(nbytes) > 1 and (
+            (self.max_runs is not None and len(nbytes) > self.max_runs)
+            or (self.max_bytes is not None and sum(nbytes) > self.max_bytes)
+        )
+
+    def enforce(
+        self, figures: Mapping[tuple[str, ...], BaseFigureCallback]
+    ) -> list[Eviction]:
+        """Evict traces until every limit is met, returning what was evicted.
+
+        Figures must not be emitted meanwhile, pass the result to `spill` afterwards.
+        """
+        evictions = []
+        for names, figure in figures.items():
+            while self._over_figure_limits(figure.trace_nbytes()):
+                evictions.append((names, *figure.evict_trace(0)))
+
+        if self.max_total_bytes is not None:
+            total = sum(sum(figure.trace_nbytes()) for figure in figures.values())
+            never_updated = [
+                names for names in figures if names not in self._recently_updated
+            ]
+            for names in never_updated + list(self._recently_updated):
+                figure = figures.get(names)
+                while (
+                    figure is not None
+                    and total > self.max_total_bytes
+                    and len(nbytes := figure.trace_nbytes()) > 1
+                ):
+                    total -= nbytes[0]
+                    evictions.append((names, *figure.evict_trace(0)))
+                if total <= self.max_total_bytes:
+                    break
+
+        for names in list(self._recently_updated):
+            if names not in figures:
+                del self._recently_updated[names]
+        return evictions
+
+    def spill(self, evictions: list[Eviction]):
+        """Write evicted traces to the spill directory, if there is one."""
+        for names, trace_name, columns in evictions:
+            logger.info(f"Evicted {trace_name} from {', '.join(names)}")
+            if self.store is not None:
+                self.store.save(names, trace_name, columns)
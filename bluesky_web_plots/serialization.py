@@ -0,0 +1,84 @@
+import base64
+from typing import cast
+
+import numpy as np
+from plotly import graph_objs as go
+from plotly.io.json import to_json_plotly
+
+# Trace attributes holding data columns, only these are sent as typed arrays.
+_DATA_ARRAY_KEYS = ("x", "y", "z", "customdata")
+
+# Below this many values the base64 overhead isn't worth it.
+_MIN_TYPED_ARRAY_SIZE = 16
+
+# Integer dtypes plotly.js can decode, smallest first.
+_INTEGER_DTYPES = ("i1", "u1", "i2", "u2", "i4", "u4")
+
+
+def typed_array(values) -> dict | None:
+    """A plotly.js typed array spec ("bdata") for a numeric column, or None if
+    `values` isn't numeric or is too small to be worth encoding."""
+    if values is None or isinstance(values, dict | str):
+        return None
+    try:
+        array = np.asarray(values)
+    except ValueError:  # Ragged nested lists.
+        return None
+    if array.dtype.kind not in "iuf" or array.ndim not in (1, 2):
+        return None
+    if array.size < _MIN_TYPED_ARRAY_SIZE:
+        return None
+    if array.dtype.kind == "f":
+        dtype = "f4" if array.dtype == np.float32 else "f8"
+    else:
+        low, high = (array.min(), array.max()) if array.size else (0, 0)
+        dtype = next(
+            (
+                code
+                for code in _INTEGER_DTYPES
+                if np.iinfo(code).min <= low and high <= np.iinfo(code).max
+            ),
+            "f8",
+        )
+    encoded = {
+        "dtype": dtype,
+        "bdata": base64.b64encode(
+            np.ascontiguousarray(array, dtype=dtype).tobytes()
+        ).decode("ascii"),
+    }
+    if array.ndim == 2:
+        encoded["shape"] = f"{array.shape[0]}, {array.shape[1]}"
+    return encoded
+
+
+def encode_typed_arrays(figure: dict) -> dict:
+    """Replace the numeric data columns of every trace in a plotly figure dict with
+    base64 typed arrays, in place, rather than decimal text."""
+    for trace in figure.get("data", ()):
+        for key in _DATA_ARRAY_KEYS:
+            encoded = typed_array(trace.get(key))
+            if encoded is not None:
+                trace[key] = encoded
+    return figure
+
+
+def decode_typed_arrays(figure: dict) -> dict:
+    """Replace the typed arrays in the data columns of every trace in a plotly
+    figure dict with plain lists, in place, for readers older than plotly 6."""
+    for trace in figure.get("data", ()):
+        for key in _DATA_ARRAY_KEYS:
+            value = trace.get(key)
+            if isinstance(value, dict) and "bdata" in value:
+                array = np.frombuffer(base64.b64decode(value["bdata"]), value["dtype"])
+                if "shape" in value:
+                    array = array.reshape([int(n) for n in value["shape"].split(",")])
+                trace[key] = array.tolist()
+    return figure
+
+
+def figure_to_json(figure: go.Figure, binary: bool = True) -> str:
+    """Serialise a figure with typed arrays for its data columns, or plain lists
+    unless `binary`."""
+    data = figure.to_plotly_json()
+    data = encode_typed_arrays(data) if binary else decode_typed_arrays(data)
+    return cast(str, to_json_plotly(data))
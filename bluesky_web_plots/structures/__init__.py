@@ -1,5 +1,7 @@
 from plotly import graph_objs as go
 
+from bluesky_web_plots.serialization import figure_to_json
+
 from .array import Array as Array
 from .base_structure import Base as Base
 from .sample_map import SampleMap as SampleMap
@@ -7,10 +9,19 @@ from .scalar import Scalar as Scalar
 
 
 def unpack_structures(
-    *structures: Base, static_figures: dict[str, go.Figure] | None = None
+    *structures: Base,
+    static_figures: dict[str, go.Figure] | None = None,
+    binary: bool = False,
 ):
+    """Run start hints plotting `structures` and `static_figures`.
+
+    `binary` encodes the static figures' data as base64 typed arrays, which are
+    smaller but can only be read by plotly 6 and later.
+    """
     static_figures = static_figures or {}
-    serialzed_static_figures = {n: v.to_json() for n, v in static_figures.items()}
+    serialzed_static_figures = {
+        n: figure_to_json(v, binary=binary) for n, v in static_figures.items()
+    }
     return {
         "BLUESKY_LIVE_PLOTS": {
             "STRUCTURES": structures,
@@ -1,4 +1,5 @@
 from enum import StrEnum
+from typing import NotRequired
 
 from .base_structure import Base
 
@@ -6,7 +7,25 @@ from .base_structure import Base
 class View(StrEnum):
     SURFACE = "SURFACE"
     SLICE = "SLICE"
+    IMAGE = "IMAGE"
+    """The latest frame as an image, frames with 2 or more dimensions always are."""
+
+
+class Downsample(StrEnum):
+    MEAN = "MEAN"
+    MAX = "MAX"
+    """Keeps hot pixels and sharp peaks visible when zoomed out."""
 
 
 class Array(Base):
     view: View
+    max_history: NotRequired[int]
+    """How many of the most recent frames a SURFACE view holds."""
+    webgl_points: NotRequired[int]
+    """Points drawn past which the plot switches to WebGL, 10000 by default."""
+    max_fps: NotRequired[float]
+    """Most times a second browsers are sent the plot as it changes, 10 by default."""
+    image_size: NotRequired[int]
+    """Most pixels along each side of an IMAGE sent to the browser, 512 by default."""
+    downsample: NotRequired[Downsample]
+    """How an IMAGE is downsampled to fit `image_size`, MEAN by default."""
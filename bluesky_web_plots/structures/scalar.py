@@ -1,4 +1,5 @@
 from enum import StrEnum
+from typing import NotRequired
 
 from .base_structure import Base
 
@@ -8,5 +9,15 @@ class PlotAgainst(StrEnum):
     SEQ_NUM = "SEQ_NUM"
 
 
+class Decimation(StrEnum):
+    """How long traces are thinned out before being sent to the browser."""
+
+    MIN_MAX = "MIN_MAX"
+    LTTB = "LTTB"
+
+
 class Scalar(Base):
     plot_against: PlotAgainst
+    decimation: NotRequired[Decimation]
+    webgl_points: NotRequired[int]
+    """Points drawn past which the plot switches to WebGL, 10000 by default."""
@@ -1,3 +1,6 @@
+from datetime import datetime
+
+import numpy as np
 from event_model import EventDescriptor
 
 
@@ -29,3 +32,17 @@ def hinted_fields(descriptor: EventDescriptor):
         fields = fields or descriptor.get("object_keys", {}).get(obj_name, [])
         columns.extend(fields)
     return columns
+
+
+def to_local_datetime64(timestamps: np.ndarray) -> np.ndarray:
+    """Convert unix timestamps to naive local `datetime64[us]`.
+
+    Equivalent to calling `datetime.fromtimestamp` on every element, but the local
+    UTC offset is only looked up once (for the first timestamp).
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if not len(timestamps):
+        return np.empty(0, dtype="datetime64[us]")
+    offset = datetime.fromtimestamp(timestamps[0]).astimezone().utcoffset()
+    offset_seconds = offset.total_seconds() if offset else 0.0
+    return ((timestamps + offset_seconds) * 1e6).astype("datetime64[us]")
@@ -1,2 +1,38 @@
-from .callback import WebPlotCallback as WebPlotCallback
-from .server import PlotServer as PlotServer
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+_LAZY = {
+    "MultiSourceWebPlotService": ".multi_source",
+    "PlotServer": ".server",
+    "ShardedWebPlotCallback": ".sharded_callback",
+    "SubprocessWebPlotCallback": ".subprocess_callback",
+    "ViewerPool": ".viewers",
+    "WebPlotCallback": ".callback",
+}
+
+__all__ = [
+    "MultiSourceWebPlotService",
+    "PlotServer",
+    "ShardedWebPlotCallback",
+    "SubprocessWebPlotCallback",
+    "ViewerPool",
+    "WebPlotCallback",
+]
+
+if TYPE_CHECKING:
+    from .callback import WebPlotCallback as WebPlotCallback
+    from .multi_source import MultiSourceWebPlotService as MultiSourceWebPlotService
+    from .server import PlotServer as PlotServer
+    from .sharded_callback import ShardedWebPlotCallback as ShardedWebPlotCallback
+    from .subprocess_callback import (
+        SubprocessWebPlotCallback as SubprocessWebPlotCallback,
+    )
+    from .viewers import ViewerPool as ViewerPool
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,4 +1,8 @@
+import atexit
 import multiprocessing
+import threading
+import time
+from pathlib import Path
 from pprint import pformat
 from queue import Queue
 from typing import cast
@@ -15,18 +19,28 @@ from event_model.documents import (
 )
 from plotly.io import from_json
 
-from bluesky_web_plots.figures.array import ArrayFigureCallback
 from bluesky_web_plots.figures.base_figure import BaseFigureCallback
-from bluesky_web_plots.figures.sample_map import SampleMapFigureCallback
-from bluesky_web_plots.figures.scalar import ScalarFigureCallback
+from bluesky_web_plots.figures.registry import FIGURES, FigureRegistry
+from bluesky_web_plots.figures.static import StaticFigureCallback
+from bluesky_web_plots.journal import DocumentJournal
 from bluesky_web_plots.logger import logger
-from bluesky_web_plots.structures import Array, Base, Scalar
-from bluesky_web_plots.structures.array import View
-from bluesky_web_plots.structures.sample_map import SampleMap
-from bluesky_web_plots.structures.scalar import PlotAgainst
+from bluesky_web_plots.metrics import (
+    DOCUMENTS,
+    FIGURE_EVENT_SECONDS,
+    BoundCounter,
+    BoundHistogram,
+)
+from bluesky_web_plots.retention import RetentionPolicy
+from bluesky_web_plots.structures import Base
 from bluesky_web_plots.utils import hinted_fields
 
-from .server import PlotServer
+from .server import PlotNamespace, PlotServer, Recaller
+
+# Name of the process spawned by `SubprocessWebPlotCallback`.
+SUBPROCESS_NAME = "bluesky-web-plots"
+
+Route = tuple[tuple[str, ...], BaseFigureCallback, BoundHistogram]
+"""A figure plotting the events of a descriptor, its names and its metric label."""
 
 
 class WebPlotCallback:
@@ -38,6 +52,14 @@ class WebPlotCallback:
         columns=3,
         local_window_mode: bool = False,
         ignore_streams: tuple[str, ...] = (),
+        fast_serialization: bool = False,
+        retention: RetentionPolicy | None = None,
+        journal: str | Path | None = None,
+        journal_runs: int = 10,
+        figures: FigureRegistry = FIGURES,
+        serve: bool = True,
+        server: PlotServer | PlotNamespace | None = None,
+        viewers: int = 0,
     ):
         """A callback for plotting event document output through the web, with either simple,
         or complicated structures.
@@ -59,37 +81,74 @@ class WebPlotCallback:
                 Spawn a local Qt5 editor.
             ignore_streams (tuple[str, ...]):
                 Stream names to ignore and not plot, e.g ("baseline",)
+            fast_serialization (bool):
+                Send figure data to the browser as base64 typed arrays, and encode
+                responses with orjson if it's installed.
+            retention (RetentionPolicy | None):
+                Limits on the past runs kept in each figure, if not provided every
+                run is kept for as long as the figure is.
+            journal (str | Path | None):
+                File to journal the documents of recent runs to. If it already exists
+                the plots are rebuilt from it, so they survive the service restarting.
+                It keeps the retention policy's `max_runs` runs, or `journal_runs`.
+            journal_runs (int):
+                Most runs kept in the journal without a retention policy `max_runs`.
+            figures (FigureRegistry):
+                Which figure plots each structure and data key dtype.
+            serve (bool):
+                Serve the web interface. If not, updated figures are only published
+                to the server's `update_bus`.
+            server (PlotServer | PlotNamespace | None):
+                A server shared with other callbacks to plot on, rather than starting
+                one. `plot_host`, `plot_port` and `columns` are then unused.
+            viewers (int):
+                Serve the web interface from this many processes sharing
+                `plot_port`, sent snapshots of the figures, rather than from this
+                one. For when many people are watching.
         """
 
         self.PLOT_PORT = plot_port
-        plot_host = plot_host.lstrip(
-            "http://"
-        )  # will fail if you try e.g "http://0.0.0.0"
-        if zmq_uri is None:
-            logger.warning(
-                "Creating a callback without a ZMQ stream... The plotter will slow down your run engine substantially for very large seq-num plans."
-            )
-        else:
+        plot_host = plot_host.removeprefix("http://")
+        if zmq_uri is None and server is None:
+            if not multiprocessing.current_process().name.startswith(SUBPROCESS_NAME):
+                logger.warning(
+                    "Creating a callback without a ZMQ stream... The plotter will slow down your run engine substantially for very large seq-num plans. "
+                    "Use SubprocessWebPlotCallback to plot in a separate process instead."
+                )
+        elif zmq_uri is not None:
             # Ensure no "tcp://" prefix, this is added in the RemoteDispatcher
-            zmq_uri = zmq_uri.lstrip("tcp://")
+            zmq_uri = zmq_uri.removeprefix("tcp://")
 
         self.ZMQ_URI = zmq_uri
 
-        self._server = PlotServer(
-            host=plot_host,
-            port=plot_port,
-            columns=columns,
-        )
+        if server is None:
+            server = PlotServer(
+                host=plot_host,
+                port=plot_port,
+                columns=columns,
+                fast_serialization=fast_serialization,
+            )
+        else:
+            serve = False
+        self._server = server
 
         self._current_run_start: RunStart | None = None
         self.document_queue: Queue[Document] = Queue()
         self._figures: dict[tuple[str, ...], BaseFigureCallback] = {}
+        self._retention = retention
 
         # User defined structures. Cleared on each new run.
         self._structures: dict[frozenset, Base] = {}
 
         self._IGNORE_STREAMS = ignore_streams  # Streams to ignore.
         self._ignore_descriptors = set()  # Desscriptor uids to ignore.
+        # Data keys of each descriptor this run, and the figures their events go to.
+        # Routes are compiled on a descriptor's first event, and dropped whenever
+        # `_figures` changes.
+        self._descriptor_keys: dict[str, frozenset[str]] = {}
+        self._routes: dict[str, list[Route]] = {}
+        # Counts of each type of document, with their labels resolved once.
+        self._document_counters: dict[str, BoundCounter] = {}
 
         # local_window_mode creates a local window pyqt window in a subprocess to view your plot.
         # A new one is made for each run whenever it's closed, mimicking best effort callback
@@ -104,12 +163,61 @@ class WebPlotCallback:
             self._local_window_mode = local_window_mode
             self._local_window_process = None
 
-        self._multi_data_key_structures: dict[
-            frozenset[str], type[BaseFigureCallback]
-        ] = {frozenset(SampleMap.__annotations__.keys()): SampleMapFigureCallback}
+        self._figure_registry = figures
+
+        # Held while a document is plotted, so runs can be recalled from the server's
+        # threads without racing the figures.
+        self._lock = threading.Lock()
+        if retention is not None and retention.store is not None:
+            self._server.recaller = Recaller(self.spilled_runs, self.recall_run)
+
+        self._journal = None
+        if journal is not None:
+            if retention is not None and retention.max_runs is not None:
+                journal_runs = retention.max_runs
+            self._journal = DocumentJournal(journal, max_runs=journal_runs)
+            self._restore_from_journal(self._journal)
+            atexit.register(self._journal.close)
+
+        self._viewers = None
+        if serve:
+            logger.info(f"Starting gui at http://{plot_host}:{plot_port}")
+            if viewers > 0:
+                from .viewers import ViewerPool
+
+                self._viewers = ViewerPool(self.server, viewers)
+            else:
+                self.server.run()
+
+    @property
+    def server(self) -> PlotServer:
+        """The server the figures are plotted on, shared with other sources if the
+        callback was given a namespace of it."""
+        if isinstance(self._server, PlotNamespace):
+            return self._server.server
+        return self._server
+
+    def _owns(self, names: tuple[str, ...]) -> bool:
+        """Whether this callback plots `names`, all plots by default."""
+        return True
 
-        logger.info(f"Starting gui at http://{plot_host}:{plot_port}")
-        self._server.run()
+    def _restore_from_journal(self, journal: DocumentJournal):
+        start = time.perf_counter()
+        count = failed = 0
+        for name, document in journal.documents():
+            try:
+                self._dispatch(name, document)
+            except Exception:  # noqa: BLE001 - one bad document mustn't stop the rest
+                logger.exception(f"Failed to restore {name} document from journal")
+                failed += 1
+            count += 1
+        if failed:
+            logger.warning(f"{failed} of {count} journalled documents weren't restored")
+        if count:
+            logger.info(
+                f"Restored {len(self._figures)} plots from {count} journalled documents "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
 
     def _can_use_local_window(self) -> bool:
         try:
@@ -170,20 +278,33 @@ class WebPlotCallback:
         ):
             self._local_window_process.start()
 
+        counter = self._document_counters.get(name)
+        if counter is None:
+            counter = self._document_counters[name] = DOCUMENTS.labels(type=name)
+        counter.inc()
+        if self._journal is not None:
+            self._journal.append(name, document)
+        with self._lock:
+            self._dispatch(name, document)
+
+    def _dispatch(self, name: str, document: Document):
         if name == "start":
             self.run_start(cast(RunStart, document))
         if name == "descriptor":
             self.descriptor(cast(EventDescriptor, document))
         if name == "event":
             self.event(cast(Event, document))
+        if name == "event_page":
+            self.event_page(cast(EventPage, document))
+        if name == "stop":
+            self.run_stop(cast(RunStop, document))
 
     def run_start(self, run_start: RunStart):
         # The figures are all on the other thread. We can dereference here.
         self._structures.clear()
         self._ignore_descriptors.clear()
-
-        while not self._server.deleted_plot_queue.empty():
-            del self._figures[self._server.deleted_plot_queue.get()]
+        self._descriptor_keys.clear()
+        self._forget_deleted_plots()
 
         info = run_start.get("hints", {}).get("BLUESKY_LIVE_PLOTS", {})
 
@@ -194,17 +315,17 @@ class WebPlotCallback:
             logger.info(f"New plot structures {pformat(self._structures)}")
 
         for structure in structures:
-            if frozenset(structure.keys()) in self._multi_data_key_structures:
-                figure_class = self._multi_data_key_structures[
-                    frozenset(structure.keys())
-                ]
-                names = (structure["names"],)
-                if names not in self._figures:
-                    new_figure = figure_class(structure)
-                    new_figure.run_start(run_start)
-                    # These figures aren't persistent we use the scan ID
-                    # and future runs will create new figures from them.
-                    self._figures[structure["names"]] = new_figure
+            figure_class = self._figure_registry.for_structure(structure)
+            # Names are lists rather than tuples once journalled or replayed.
+            names = tuple(structure["names"])
+            if (
+                figure_class is not None
+                and self._owns(names)
+                and names not in self._figures
+            ):
+                # These figures aren't persistent we use the scan ID
+                # and future runs will create new figures from them.
+                self._figures[names] = figure_class(structure)
 
         # Cache this now for
         self._current_run_start = run_start
@@ -212,48 +333,39 @@ class WebPlotCallback:
         # Non-interactive serialised plots from run_start
         non_interactive_plots = info.get("SERIALISED_PLOT", {})
         for name, plot in non_interactive_plots.items():
+            if not self._owns((name,)):
+                continue
             figure = from_json(plot)  # Validate it's a figure.
             logger.info(f"New serialised plot {name}")
-            self._server.updated_plot_queue.put(((name,), figure))
+            self._server.update_bus.publish((name,), StaticFigureCallback(figure))
 
+        self._routes.clear()
         for figure in self._figures.values():
             figure.run_start(run_start)
 
     def _new_figure_from_datakey(
         self, name: str, data_key: DataKey
     ) -> BaseFigureCallback | None:
-        names = frozenset((name,))
-        if data_key["dtype"] in ("number", "integer"):
-            return ScalarFigureCallback(
-                cast(
-                    Scalar,
-                    self._structures.get(
-                        names, Scalar(names=(name,), plot_against=PlotAgainst.SEQ_NUM)
-                    ),
-                )
-            )
-        if data_key["dtype"] == "array":
-            return ArrayFigureCallback(
-                cast(
-                    Array,
-                    self._structures.get(names, Array(names=(name,), view=View.SLICE)),
-                )
-            )
-
-        logger.warning(
-            f"No figure available for data key {name} with dtype {data_key['dtype']}"
+        figure = self._figure_registry.for_data_key(
+            name, data_key, self._structures.get(frozenset((name,)))
         )
+        if figure is None:
+            logger.warning(
+                f"No figure available for data key {name} with dtype {data_key['dtype']}"
+            )
+        return figure
 
     def descriptor(self, descriptor: EventDescriptor):
         if descriptor.get("name") in self._IGNORE_STREAMS:
             self._ignore_descriptors.add(descriptor["uid"])
+        self._descriptor_keys[descriptor["uid"]] = frozenset(descriptor["data_keys"])
 
         plotted_fields = hinted_fields(descriptor) + [
             field for field in "data_keys" if field in self._structures
         ]
         for name in plotted_fields:
             names = (name,)
-            if names not in self._figures:
+            if names not in self._figures and self._owns(names):
                 new_figure = self._new_figure_from_datakey(
                     name, descriptor["data_keys"][name]
                 )
@@ -264,29 +376,95 @@ class WebPlotCallback:
                 if self._current_run_start:
                     new_figure.run_start(self._current_run_start)
                 self._figures[names] = new_figure
+                self._routes.clear()
 
         for figure in self._figures.values():
             figure.descriptor(descriptor)
+        self._enforce_retention()
+
+    def _route(self, descriptor: str, data: dict) -> list[Route]:
+        """The figures plotting events of `descriptor`, compiled on its first event.
+
+        Falls back to the event's own data keys if the descriptor wasn't seen, e.g
+        when the service started mid run.
+        """
+        routes = self._routes.get(descriptor)
+        if routes is None:
+            keys = self._descriptor_keys.get(descriptor) or frozenset(data)
+            routes = self._routes[descriptor] = [
+                (names, figure, FIGURE_EVENT_SECONDS.labels(plot=", ".join(names)))
+                for names, figure in self._figures.items()
+                if keys.issuperset(names)
+            ]
+        return routes
+
+    def _forget_deleted_plots(self):
+        while not self._server.deleted_plot_queue.empty():
+            self._figures.pop(self._server.deleted_plot_queue.get(), None)
+            self._routes.clear()
 
     def event(self, event: Event):
         if event["descriptor"] in self._ignore_descriptors:
             return
 
-        datakeys = frozenset((event["data"].keys()))
-        for names, figure in self._figures.items():
-            if set(names) <= datakeys:
-                figure.event(event)
-                self._server.updated_plot_queue.put((names, figure.figure))
+        for names, figure, seconds in self._route(event["descriptor"], event["data"]):
+            start = time.perf_counter()
+            figure.event(event)
+            seconds.observe(time.perf_counter() - start)
+            figure.last_event_time = event["time"]
+            self._publish(names, figure)
 
     def event_page(self, event_page: EventPage):
         if event_page["descriptor"] in self._ignore_descriptors:
             return
-        datakeys = frozenset(event_page["data"].keys())
-        for names, figure in self._figures.items():
-            if set(names) <= datakeys:
-                figure.event_page(event_page)
-                self._server.updated_plot_queue.put((names, figure.figure))
+        last_event_time = max(event_page["time"], default=None)
+        routes = self._route(event_page["descriptor"], event_page["data"])
+        for names, figure, seconds in routes:
+            start = time.perf_counter()
+            figure.event_page(event_page)
+            seconds.observe(time.perf_counter() - start)
+            figure.last_event_time = last_event_time
+            self._publish(names, figure)
 
     def run_stop(self, run_stop: RunStop):
-        while not self._server.deleted_plot_queue.empty():
-            del self._figures[self._server.deleted_plot_queue.get()]
+        self._forget_deleted_plots()
+        self._enforce_retention()
+
+    def _publish(self, names: tuple[str, ...], figure: BaseFigureCallback):
+        self._server.update_bus.publish(names, figure)
+        if self._retention is not None:
+            self._retention.touch(names)
+
+    def _enforce_retention(self):
+        if self._retention is None:
+            return
+        with self._server.lock:
+            evictions = self._retention.enforce(self._figures)
+        # Writing to disk is slow, the browsers don't need to wait for it.
+        self._retention.spill(evictions)
+        for names, _, _ in evictions:
+            self._server.update_bus.publish(names, self._figures[names])
+
+    def spilled_runs(self, names: tuple[str, ...]) -> list[str]:
+        """Names of the runs evicted from the figure plotting `names` which can be
+        recalled, oldest first."""
+        if self._retention is None or self._retention.store is None:
+            return []
+        return self._retention.store.spilled(names)
+
+    def recall_run(self, names: tuple[str, ...], trace_name: str):
+        """Bring a run evicted from the figure plotting `names` back from the spill
+        directory, e.g `recall_run(("det",), "plan 3")`.
+
+        Also served on `/recall/<plot>`, see `PlotServer.recall`.
+        """
+        if self._retention is None or self._retention.store is None:
+            raise ValueError("Evicted runs are only kept with a spill directory.")
+        with self._lock:
+            figure = self._figures.get(names)
+            if figure is None:
+                raise KeyError(f"No plot of {names} to recall {trace_name} into.")
+            columns = self._retention.store.load(names, trace_name)
+            with self._server.lock:
+                figure.restore_trace(trace_name, columns)
+            self._publish(names, figure)
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+from bluesky_web_plots.figures.base_figure import AxisRanges
+
+K = TypeVar("K", bound=Hashable)
+
+Frame = tuple[dict, list]
+"""A whole figure as emitted for browsers, and the cursor of a browser holding it."""
+
+
+class FrameLimiter(Generic[K]):
+    """Caps how often each figure is emitted whole, keeping the latest frame.
+
+    A figure emitted less than its interval ago isn't emitted again, browsers with the
+    same view which don't hold that frame yet are sent it instead, so the cost of
+    emitting doesn't grow with the number of browsers. Changes in between are dropped in favour of the latest
+    once the interval has passed.
+
+    The interval is the longer of `1 / max_fps` and the time the figure takes to emit
+    divided by `budget`, so a figure can't spend more than that fraction of the server's
+    time being emitted however fast its data arrives.
+
+    Browsers held off a figure are only sent its latest frame when they next ask, so
+    `wake` is called once a held frame is due, as no new data may come to prompt them.
+    """
+
+    def __init__(
+        self,
+        budget: float = 0.25,
+        smoothing: float = 0.2,
+        wake: Callable[[], object] | None = None,
+    ):
+        self._budget = budget
+        self._smoothing = smoothing
+        self._wake = wake
+        self._lock = threading.Lock()
+        # The single pending wake, at the earliest time a held frame is due.
+        self._timer: threading.Timer | None = None
+        self._due: float | None = None
+        # Latest frame of each figure, when and with which view it was emitted.
+        self._frames: dict[K, tuple[float, AxisRanges | None, Frame]] = {}
+        # Moving average of the seconds each figure takes to emit.
+        self._costs: dict[K, float] = {}
+
+    def interval(self, key: K, max_fps: float | None) -> float:
+        """Least seconds between emitting the figure at `key`."""
+        cost = self._costs.get(key, 0.0) / self._budget
+        return max(1 / max_fps if max_fps else 0.0, cost)
+
+    def held(
+        self, key: K, max_fps: float | None
+    ) -> tuple[AxisRanges | None, Frame] | None:
+        """The figure's last frame and the view it was emitted with, if that was too
+        recently for it to be emitted again."""
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                return None
+            emitted_at, view, emitted = frame
+            due = emitted_at + self.interval(key, max_fps)
+            if time.monotonic() >= due:
+                # Not held any longer than needed, figures can be large.
+                del self._frames[key]
+                return None
+            self._schedule(due)
+        return view, emitted
+
+    def _schedule(self, due: float):
+        """Call `wake` at `due`, unless it's already going to be called sooner and
+        whatever is still held then schedules it again. Must be called with `_lock`
+        held."""
+        if self._wake is None or (self._due is not None and self._due <= due):
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._due = due
+        self._timer = threading.Timer(max(due - time.monotonic(), 0.0), self._due_now)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _due_now(self):
+        with self._lock:
+            self._timer = self._due = None
+        if self._wake is not None:
+            self._wake()
+
+    def record(self, key: K, view: AxisRanges | None, frame: Frame, seconds: float):
+        """Hold the frame just emitted, which took `seconds` to emit."""
+        with self._lock:
+            cost = self._costs.get(key)
+            self._costs[key] = (
+                seconds if cost is None else cost + self._smoothing * (seconds - cost)
+            )
+            self._frames[key] = (time.monotonic(), view, frame)
+
+    def discard(self, key: K):
+        with self._lock:
+            self._frames.pop(key, None)
+            self._costs.pop(key, None)
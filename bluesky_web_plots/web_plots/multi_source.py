@@ -0,0 +1,110 @@
+import asyncio
+import pickle
+
+import zmq
+import zmq.asyncio
+
+from bluesky_web_plots.logger import logger
+from bluesky_web_plots.retention import RetentionPolicy
+
+from .callback import WebPlotCallback
+from .server import PlotServer
+
+
+def _address(uri: str) -> str:
+    return uri if "://" in uri else f"tcp://{uri}"
+
+
+class MultiSourceWebPlotService:
+    def __init__(
+        self,
+        sources: dict[str, str],
+        plot_host: str = "0.0.0.0",
+        plot_port=12354,
+        columns=3,
+        ignore_streams: tuple[str, ...] = (),
+        fast_serialization: bool = False,
+        retention: RetentionPolicy | None = None,
+        burst: int = 64,
+    ):
+        """One web interface for several ZMQ document sources (e.g one per RunEngine),
+        each plotted on its own tab.
+
+        Every source is read on the same asyncio event loop. A source yields to the
+        others after `burst` documents, so a bursty source can't starve the rest,
+        and a document which fails to plot only affects its own source.
+
+        Args:
+            sources (dict[str, str]):
+                ZMQ proxy out addresses by namespace, e.g {"i22": "0.0.0.0:5578"}.
+            burst (int):
+                Most documents handled from one source before the others get a turn.
+
+        The remaining args are the same as `WebPlotCallback`.
+        """
+        self._sources = {
+            namespace: _address(uri.removeprefix("tcp://"))
+            for namespace, uri in sources.items()
+        }
+        self._burst = burst
+        self._server = PlotServer(
+            host=plot_host.removeprefix("http://"),
+            port=plot_port,
+            columns=columns,
+            fast_serialization=fast_serialization,
+        )
+        self.callbacks = {
+            namespace: WebPlotCallback(
+                ignore_streams=ignore_streams,
+                fast_serialization=fast_serialization,
+                retention=retention,
+                server=self._server.namespace(namespace),
+            )
+            for namespace in sources
+        }
+        logger.info(f"Starting gui at http://{plot_host}:{plot_port}")
+        self._server.run()
+
+    @property
+    def server(self) -> PlotServer:
+        """The server the figures are plotted on."""
+        return self._server
+
+    async def _listen(self, context: zmq.asyncio.Context, namespace: str):
+        socket = context.socket(zmq.SUB)
+        socket.connect(self._sources[namespace])
+        socket.setsockopt_string(zmq.SUBSCRIBE, "")
+        callback = self.callbacks[namespace]
+        logger.info(f"Connected {namespace} to {self._sources[namespace]}")
+        try:
+            while True:
+                for _ in range(self._burst):
+                    message = await socket.recv()
+                    try:
+                        # Published by `bluesky.callbacks.zmq.Publisher`.
+                        _, name, document = message.split(b" ", 2)
+                        callback(name.decode(), pickle.loads(document))
+                    except Exception:  # noqa: BLE001 - nor stop the source
+                        logger.exception(f"Failed to plot a document from {namespace}")
+                # Let the other sources have a turn.
+                await asyncio.sleep(0)
+        finally:
+            socket.close(linger=0)
+
+    async def serve(self):
+        """Plot documents from every source until cancelled."""
+        context = zmq.asyncio.Context()
+        try:
+            await asyncio.gather(
+                *(self._listen(context, namespace) for namespace in self._sources)
+            )
+        finally:
+            context.term()
+
+    def run(self):
+        """Runs the service until interrupted."""
+        logger.info(f"Plotting {len(self._sources)} sources, Ctrl + C to Exit")
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("Exiting...")
@@ -1,32 +1,299 @@
 import itertools
 import logging
+import socket
 import threading
+import time
+from collections.abc import Callable
 from queue import Queue
 
 import dash_bootstrap_components as dbc
-import plotly.graph_objects as go
+import plotly.io as pio
 from dash import Dash, Input, Output, State, callback_context, dcc, html, no_update
-from dash.dependencies import ALL
-from flask import Flask
+from dash.dependencies import ALL, MATCH
+from flask import Flask, Response, g, jsonify, request
+from werkzeug.serving import make_server
+from werkzeug.utils import secure_filename
 
 from bluesky_web_plots import __version__
+from bluesky_web_plots.export import arrow_chunks, npz_chunks
+from bluesky_web_plots.figures.base_figure import AxisRanges, BaseFigureCallback
 from bluesky_web_plots.logger import logger
+from bluesky_web_plots.metrics import (
+    DELETED_PLOTS,
+    LAG_SECONDS,
+    PENDING_UPDATES,
+    PUSH_CONNECTIONS,
+    REGISTRY,
+    RENDER_SECONDS,
+    RESPONSE_BYTES,
+    RESPONSE_SECONDS,
+    TRACE_POINTS,
+)
+from bluesky_web_plots.serialization import encode_typed_arrays
+
+from .frame_limiter import FrameLimiter
+from .update_bus import UpdateBus
+
+# Most seconds between pushes to a browser, bursts of events in between are sent
+# together.
+PUSH_INTERVAL = 0.05
+# Seconds between comments on an idle push stream, so proxies don't close it.
+PUSH_KEEPALIVE = 15.0
+# Polls the server only while the browser can't connect to the push stream.
+PUSH_CLIENT = """
+function(id) {
+    if (window.EventSource && !window.blueskyWebPlotsPush) {
+        const source = new EventSource("updates");
+        window.blueskyWebPlotsPush = source;
+        source.onopen = () => dash_clientside.set_props("interval", {disabled: true});
+        source.onerror = () => dash_clientside.set_props("interval", {disabled: false});
+        source.onmessage = (message) => dash_clientside.set_props(
+            "push", {data: Number(message.data)}
+        );
+    }
+    return dash_clientside.no_update;
+}
+"""
+# Reports which plot slots are on screen, and makes graphs in those which are empty.
+# Slots of hidden cards aren't displayed so never count as on screen.
+VIEWPORT_CLIENT = """
+function(layoutState, visible, ids, children, mounted) {
+    if (!window.IntersectionObserver) {
+        visible = null;
+    } else {
+        if (!window.blueskyWebPlotsViewport) {
+            const shown = new Set();
+            window.blueskyWebPlotsViewport = new IntersectionObserver((entries) => {
+                for (const entry of entries) {
+                    const name = JSON.parse(entry.target.id).index;
+                    if (entry.isIntersecting) {
+                        shown.add(name);
+                    } else {
+                        shown.delete(name);
+                    }
+                }
+                dash_clientside.set_props(
+                    "visible-plots", {data: Array.from(shown).sort()}
+                );
+            }, {rootMargin: "200px"});
+        }
+        for (const slot of document.querySelectorAll(".plot-slot")) {
+            if (!slot.dataset.observed) {
+                slot.dataset.observed = "true";
+                window.blueskyWebPlotsViewport.observe(slot);
+            }
+        }
+    }
+    const shown = visible === null ? null : new Set(visible);
+    const nowMounted = [];
+    const graphs = ids.map((id, index) => {
+        if (children[index]) {
+            nowMounted.push(id.index);
+            return dash_clientside.no_update;
+        }
+        if (shown !== null && !shown.has(id.index)) {
+            return dash_clientside.no_update;
+        }
+        nowMounted.push(id.index);
+        return {
+            namespace: "dash_core_components",
+            type: "Graph",
+            props: {id: {type: "plot", index: id.index}, figure: {}},
+        };
+    });
+    if (JSON.stringify(nowMounted) === JSON.stringify(mounted)) {
+        return [graphs, dash_clientside.no_update];
+    }
+    return [graphs, nowMounted];
+}
+"""
+TOGGLE_CLIENT = """
+function(n, isOpen) {
+    return [!isOpen, isOpen ? "Show" : "Hide"];
+}
+"""
+
+
+def _make_card(name: str, title: str | None = None) -> dbc.Card:
+    """A card with an empty slot, which a graph is put in once it's first visible."""
+    return dbc.Card(
+        [
+            dbc.CardHeader(
+                dbc.Row(
+                    [
+                        dbc.Col(html.H5(title or name)),
+                        dbc.Col(
+                            dbc.Button(
+                                "Hide",
+                                id={"type": "collapse-btn", "index": name},
+                                color="secondary",
+                                outline=True,
+                                size="sm",
+                                n_clicks=0,
+                            ),
+                            width="auto",
+                        ),
+                        dbc.Col(
+                            dbc.Button(
+                                "Delete",
+                                id={"type": "delete-btn", "index": name},
+                                color="danger",
+                                size="sm",
+                                n_clicks=0,
+                            ),
+                            width="auto",
+                        ),
+                    ],
+                    justify="between",
+                ),
+            ),
+            dbc.Collapse(
+                html.Div(
+                    id={"type": "slot", "index": name},
+                    className="plot-slot",
+                    # The height of a graph, so the page doesn't jump as they're made.
+                    style={"minHeight": "450px"},
+                ),
+                id={"type": "collapse", "index": name},
+                is_open=True,
+            ),
+        ],
+        style={"margin": "10px"},
+    )
+
+
+def _axis_ranges(relayout_data: dict, previous: AxisRanges | None) -> AxisRanges:
+    """Merge a plotly `relayoutData` event into the ranges a plot is zoomed to."""
+    ranges = dict(previous or {})
+    for axis in ("x", "y"):
+        key = f"{axis}axis"
+        if relayout_data.get(f"{key}.autorange"):
+            ranges.pop(axis, None)
+        elif f"{key}.range[0]" in relayout_data:
+            ranges[axis] = [
+                relayout_data[f"{key}.range[0]"],
+                relayout_data[f"{key}.range[1]"],
+            ]
+        elif f"{key}.range" in relayout_data:
+            ranges[axis] = list(relayout_data[f"{key}.range"])
+    return ranges
+
+
+class Recaller:
+    """Lists and recalls the runs spilled from plots, set on a server by the callback
+    plotting on it."""
+
+    def __init__(
+        self,
+        spilled: Callable[[tuple[str, ...]], list[str]],
+        recall: Callable[[tuple[str, ...], str], None],
+    ):
+        self.spilled = spilled
+        self.recall = recall
+
+
+class _PrefixedBus:
+    """Publishes to another bus with every key prefixed by a namespace."""
+
+    def __init__(self, bus: UpdateBus, namespace: str):
+        self._bus = bus
+        self._namespace = namespace
+
+    def publish(self, names: tuple[str, ...], figure: BaseFigureCallback):
+        self._bus.publish((self._namespace, *names), figure)
+
+    def discard(self, names: tuple[str, ...]):
+        self._bus.discard((self._namespace, *names))
+
+
+class PlotNamespace:
+    """The plots of one document source on a `PlotServer` shared with others.
+
+    Can be given to a `WebPlotCallback` in place of its own server, its plots are
+    published as `(namespace, *names)` and shown on their own tab.
+    """
+
+    def __init__(self, server: "PlotServer", namespace: str):
+        self.namespace = namespace
+        self.update_bus = _PrefixedBus(server.update_bus, namespace)
+        self.deleted_plot_queue: Queue[tuple[str, ...]] = Queue()
+        self.recaller: Recaller | None = None
+        self.server = server
+
+    @property
+    def lock(self) -> threading.Lock:
+        return self.server.lock
 
 
 class PlotServer:
-    def __init__(self, host: str = "0.0.0.0", port=8080, columns=2) -> None:
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port=8080,
+        columns=2,
+        fast_serialization: bool = False,
+        reuse_port: bool = False,
+    ) -> None:
         self.HOST = host
         self.PORT = port
         self._columns = columns
-        self.updated_plot_queue: Queue[tuple[tuple[str, ...], go.Figure]] = Queue()
-        self._plots: dict[tuple[str, ...], go.Figure] = {}
+        self._fast_serialization = fast_serialization
+        # Several processes serving on the same port, the kernel balances browsers'
+        # connections between them.
+        self._reuse_port = reuse_port
+        self.update_bus: UpdateBus[tuple[str, ...], BaseFigureCallback] = UpdateBus()
+        self._plots: dict[tuple[str, ...], BaseFigureCallback] = {}
+        self._frames: FrameLimiter[tuple[str, ...]] = FrameLimiter(
+            wake=self.update_bus.notify
+        )
         self._lock = threading.Lock()
         self.deleted_plot_queue = Queue()
+        self.recaller: Recaller | None = None
+        self._namespaces: dict[str, PlotNamespace] = {}
+
+        # Bumped whenever the set of cards changes, browsers holding an older
+        # version rebuild their cards from scratch.
+        self._layout_version = 0
+
+    def namespace(self, namespace: str) -> PlotNamespace:
+        """Plots of one of several document sources, shown on a tab of their own."""
+        with self._lock:
+            if namespace not in self._namespaces:
+                self._namespaces[namespace] = PlotNamespace(self, namespace)
+                self._layout_version += 1
+                self.update_bus.notify()
+            return self._namespaces[namespace]
+
+    def _namespace_of(self, names: tuple[str, ...]) -> PlotNamespace | None:
+        if len(names) > 1:
+            return self._namespaces.get(names[0])
+        return None
+
+    @property
+    def lock(self) -> threading.Lock:
+        """Held while figures are emitted, hold it to change a figure's traces."""
+        return self._lock
+
+    @property
+    def columns(self) -> int:
+        return self._columns
+
+    @property
+    def fast_serialization(self) -> bool:
+        return self._fast_serialization
 
     def run(self) -> None:
         log = logging.getLogger("werkzeug")
         log.setLevel(logging.ERROR)
+        if self._fast_serialization:
+            self._use_fast_json()
         server = Flask(__name__)
+        self._setup_metrics(server)
+        server.add_url_rule("/updates", "updates", self.updates)
+        server.add_url_rule("/export/<path:plot>", "export", self.export)
+        server.add_url_rule(
+            "/recall/<path:plot>", "recall", self.recall, methods=["GET", "POST"]
+        )
         self._app = Dash(
             title="Bluesky Web Plots",
             server=server,
@@ -34,54 +301,391 @@ class PlotServer:
             update_title=None,  # type: ignore
         )
         self._setup_layout()
-        app_thread = threading.Thread(
-            target=lambda: self._app.run(
+        app_thread = threading.Thread(target=self._serve, daemon=True)
+
+        app_thread.start()
+
+    def _serve(self):
+        if not self._reuse_port:
+            self._app.run(
                 host=self.HOST,
                 port=self.PORT,
                 debug=False,
                 use_reloader=False,
-            ),
-            daemon=True,
+            )
+            return
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        listener.bind((self.HOST, self.PORT))
+        listener.listen(128)
+        make_server(
+            self.HOST,
+            self.PORT,
+            self._app.server,
+            threaded=True,
+            fd=listener.fileno(),
+        ).serve_forever()
+
+    def _setup_metrics(self, server: Flask):
+        server.add_url_rule("/metrics", "metrics", self.metrics)
+
+        @server.before_request
+        def start_timer():
+            g.start = time.perf_counter()
+
+        @server.after_request
+        def record_response(response):
+            if request.path.endswith("_dash-update-component"):
+                RESPONSE_SECONDS.observe(time.perf_counter() - g.start)
+                RESPONSE_BYTES.observe(response.calculate_content_length() or 0)
+            return response
+
+    def metrics(self) -> Response:
+        """Metrics in the Prometheus text format."""
+        PENDING_UPDATES.set(len(self.update_bus))
+        DELETED_PLOTS.set(self.deleted_plot_queue.qsize())
+        TRACE_POINTS.clear()
+        with self._lock:
+            for names, figure in self._plots.items():
+                for trace, points in zip(
+                    figure.figure.data, figure.trace_points(), strict=False
+                ):
+                    TRACE_POINTS.set(
+                        points,
+                        plot=", ".join(names),
+                        trace=str(trace.name),  # type: ignore
+                    )
+        return Response(
+            REGISTRY.exposition(), mimetype="text/plain; version=0.0.4; charset=utf-8"
         )
 
-        app_thread.start()
+    def updates(self) -> Response:
+        """Server sent events telling a browser to fetch its updates, sent as soon as
+        a figure changes rather than when the browser next polls."""
+
+        def stream():
+            PUSH_CONNECTIONS.inc()
+            try:
+                # Sent straight away, so the browser catches up on connecting.
+                seen = -1
+                while True:
+                    changes = self.update_bus.wait(seen, timeout=PUSH_KEEPALIVE)
+                    if changes == seen:
+                        yield ": keepalive\n\n"
+                        continue
+                    seen = changes
+                    yield f"data: {changes}\n\n"
+                    time.sleep(PUSH_INTERVAL)
+            finally:
+                PUSH_CONNECTIONS.inc(-1)
 
-    def add_widget(self, names: tuple[str, ...], figure: go.Figure):
+        return Response(
+            stream(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    def export(self, plot: str) -> Response:
+        """The data behind a plot's traces, e.g `/export/det?format=arrow&trace=plan 1`.
+
+        `format` is `npz` (the default) or `arrow`, `trace` picks a single trace.
+        Columns are streamed from the figure's buffers without being serialized to
+        JSON.
+        """
+        with self._lock:
+            self._drain_updated_plots()
+            figure = self._plots.get(tuple(plot.split(", ")))
+            traces = figure.columns() if figure is not None else {}
+        if "trace" in request.args:
+            traces = {
+                name: columns
+                for name, columns in traces.items()
+                if name == request.args["trace"]
+            }
+        if not traces:
+            return Response(f"No data for {plot}.", status=404, mimetype="text/plain")
+
+        filename = secure_filename(plot) or "plot"
+        export_format = request.args.get("format", "npz")
+        if export_format == "npz":
+            chunks = npz_chunks(traces)
+            mimetype = "application/octet-stream"
+        elif export_format == "arrow":
+            try:
+                chunks = arrow_chunks(traces)
+            except ImportError as exception:
+                logger.warning(
+                    f"\033[93mArrow export requires the 'export' optional dependencies. {exception} "
+                    "Install with: pip install .[export].\033[0m"
+                )
+                return Response(
+                    "Arrow export isn't installed, use format=npz.",
+                    status=501,
+                    mimetype="text/plain",
+                )
+            except ValueError as exception:
+                return Response(str(exception), status=400, mimetype="text/plain")
+            mimetype = "application/vnd.apache.arrow.stream"
+        else:
+            return Response(
+                f"Unknown format {export_format}, use npz or arrow.",
+                status=400,
+                mimetype="text/plain",
+            )
+        return Response(
+            chunks,
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+            },
+        )
+
+    def recall(self, plot: str) -> Response:
+        """Runs spilled from a plot by its retention policy, e.g `/recall/det` lists
+        them, and `POST /recall/det?trace=plan 3` brings one back into the plot."""
+        names = tuple(plot.split(", "))
+        namespace = self._namespace_of(names)
+        recaller = self.recaller if namespace is None else namespace.recaller
+        if namespace is not None:
+            names = names[1:]
+        if recaller is None:
+            return Response(
+                f"No runs of {plot} can be recalled here.",
+                status=404,
+                mimetype="text/plain",
+            )
+        spilled = recaller.spilled(names)
+        if request.method == "GET":
+            return jsonify(spilled)
+        trace = request.args.get("trace")
+        if trace not in spilled:
+            return Response(
+                f"{trace} isn't spilled from {plot}.", status=404, mimetype="text/plain"
+            )
+        recaller.recall(names, trace)
+        return jsonify(recaller.spilled(names))
+
+    def _use_fast_json(self):
+        try:
+            import orjson  # noqa: F401 # pyright: ignore
+        except ImportError as exception:
+            logger.warning(
+                f"\033[93mFast serialization is faster with the 'fast' optional dependencies. {exception} "
+                "Install with: pip install .[fast].\033[0m"
+            )
+            return
+        # Dash serialises every callback response through plotly's JSON encoder.
+        pio.json.config.default_engine = "orjson"
+
+    def add_widget(self, names: tuple[str, ...], figure: BaseFigureCallback):
         with self._lock:
             self._plots[names] = figure
+            self._layout_version += 1
+        self.update_bus.notify()
 
-    def _setup_layout(self):
-        app = self._app
+    def delete_plot(self, names: tuple[str, ...]):
+        """Stop showing a plot, as its delete button does. The callback plotting it
+        forgets it when its run stops."""
+        with self._lock:
+            self._plots.pop(names, None)
+            self._frames.discard(names)
+            self.update_bus.discard(names)
+            namespace = self._namespace_of(names)
+            if namespace is None:
+                self.deleted_plot_queue.put(names)
+            else:
+                namespace.deleted_plot_queue.put(names[1:])
+            self._layout_version += 1
+        # Other browsers drop the card on their next update.
+        self.update_bus.notify()
 
-        def make_card(name, figure):
-            return dbc.Card(
-                [
-                    dbc.CardHeader(
-                        dbc.Row(
-                            [
-                                dbc.Col(html.H5(name)),
-                                dbc.Col(
-                                    dbc.Button(
-                                        "Delete",
-                                        id={"type": "delete-btn", "index": name},
-                                        color="danger",
-                                        size="sm",
-                                        n_clicks=0,
-                                    ),
-                                    width="auto",
-                                ),
-                            ],
-                            justify="between",
-                        ),
-                    ),
-                    dbc.Collapse(
-                        dcc.Graph(id={"type": "plot", "index": name}, figure=figure),
-                        id={"type": "collapse", "index": name},
-                        is_open=True,
-                    ),
-                ],
-                style={"margin": "10px"},
+    def forget_plot(self, names: tuple[str, ...]):
+        """Stop showing a plot without telling the callback plotting it, e.g one
+        already deleted in another process serving the same plots."""
+        with self._lock:
+            self._frames.discard(names)
+            self.update_bus.discard(names)
+            if self._plots.pop(names, None) is not None:
+                self._layout_version += 1
+        self.update_bus.notify()
+
+    def plot_names(self) -> list[tuple[str, ...]]:
+        """Names of every plot shown, including those published since last asked."""
+        with self._lock:
+            self._drain_updated_plots()
+            return list(self._plots)
+
+    def layout(self):
+        """The cards of every plot, as a browser loading the page is sent them."""
+        with self._lock:
+            self._drain_updated_plots()
+            return self._render_layout()[0]
+
+    def figure(self, names: tuple[str, ...]) -> dict | None:
+        """A plot's whole figure, as a browser is first sent it."""
+        with self._lock:
+            self._drain_updated_plots()
+            figure = self._plots.get(names)
+            return None if figure is None else self._full_figure(figure, None)[0]
+
+    def _drain_updated_plots(self):
+        """Move published figures into `_plots`. Must be called with `_lock` held."""
+        for names, figure in self.update_bus.drain().items():
+            if self._plots.get(names) is not figure:
+                self._layout_version += 1
+                self._frames.discard(names)
+            self._plots[names] = figure
+
+    def _full_figure(
+        self, figure: BaseFigureCallback, view: AxisRanges | None
+    ) -> tuple[dict, list]:
+        """The whole figure, and the cursor the browser will be at once it's received.
+        Must be called with `_lock` held.
+
+        The figure is copied to a dict here, since the same figure object is emitted
+        with different views for different browsers.
+        """
+        generation = figure.generation
+        emitted = figure.emit_dict(view)
+        if self._fast_serialization:
+            encode_typed_arrays(emitted)
+        return emitted, [generation, figure.cursor(), view]
+
+    def _cards(self, plots: list[tuple[str, ...]], prefix: int = 0) -> dbc.Row:
+        """Cards for `plots` packed into columns, titled without the first `prefix`
+        names."""
+        columns = [[] for _ in range(self._columns)]
+        columns_iter = itertools.cycle(columns)
+        for names in plots:
+            next(columns_iter).append(
+                _make_card(", ".join(names), title=", ".join(names[prefix:]))
+            )
+        return dbc.Row(
+            [dbc.Col(column, width=12 // self._columns) for column in columns]
+        )
+
+    def _render_layout(self) -> tuple:
+        """Cards for every plot, the layout state, and the empty cursor state of a
+        browser holding none of their figures yet. Must be called with `_lock` held.
+
+        Figures are only sent once their card is on screen, so that pages with many
+        plots stay responsive. Plots of each namespace are put on their own tab, if
+        there are any."""
+        if not self._namespaces:
+            children = self._cards(list(self._plots))
+        else:
+            groups: dict[str | None, list] = {
+                namespace: [] for namespace in self._namespaces
+            }
+            for names in self._plots:
+                namespace = self._namespace_of(names)
+                groups.setdefault(namespace and namespace.namespace, []).append(names)
+            tabs = [
+                dbc.Tab(
+                    self._cards(plots, prefix=int(bool(namespace))),
+                    label=namespace or "Other",
+                    tab_id=namespace or "other",
+                )
+                for namespace, plots in groups.items()
+            ]
+            children = dbc.Tabs(
+                tabs,
+                id="namespace-tabs",
+                active_tab=tabs[0].tab_id,  # type: ignore
+                persistence=True,
             )
+        return (
+            children,
+            {"version": self._layout_version},
+            {"layout": self._layout_version, "plots": {}},
+        )
+
+    def render_updates(
+        self,
+        names: list[tuple[str, ...]],
+        cursor_state: dict,
+        views: dict[str, AxisRanges] | None = None,
+    ) -> tuple[list, list, dict]:
+        """The figures and `extendData` needed to bring a browser at `cursor_state` up
+        to date, along with the browser's new cursor state.
+
+        A figure is only sent whole if the browser hasn't seen it yet, if its
+        generation has changed (new trace, layout change) or if the browser has zoomed
+        somewhere else, otherwise only the points added since the browser's cursor are
+        sent. Generation changes are capped to the figure's `max_fps` by `_frames`.
+        """
+        views = views or {}
+        figures, extensions = [], []
+        cursors = {}
+        start = time.perf_counter()
+        with self._lock:
+            for plot_names in names:
+                name = ", ".join(plot_names)
+                figure = self._plots.get(plot_names)
+                cursor = cursor_state.get(name)
+                view = views.get(name)
+                if figure is None:
+                    figures.append(no_update)
+                    extensions.append(no_update)
+                    continue
+                figure.sync_traces()
+                if (
+                    cursor is None
+                    or cursor[0] != figure.generation
+                    or cursor[2] != view
+                    or figure.needs_refresh(cursor[1], view)
+                ):
+                    held = None
+                    if cursor is not None and cursor[2] == view:
+                        # Changed data rather than a new browser or zoom.
+                        held = self._frames.held(plot_names, figure.max_fps)
+                    if held is None:
+                        emit_start = time.perf_counter()
+                        emitted, cursors[name] = self._full_figure(figure, view)
+                        self._frames.record(
+                            plot_names,
+                            view,
+                            (emitted, cursors[name]),
+                            time.perf_counter() - emit_start,
+                        )
+                    elif (
+                        cursor is not None
+                        and held[0] == view
+                        and held[1][1][0] != cursor[0]
+                    ):
+                        emitted, cursors[name] = held[1]
+                    else:
+                        # Caught up to the latest frame once the interval has passed.
+                        figures.append(no_update)
+                        extensions.append(no_update)
+                        cursors[name] = cursor
+                        continue
+                    figures.append(emitted)
+                    extensions.append(no_update)
+                    if cursor is not None and cursor[2] == view:
+                        self._observe_lag(figure)
+                else:
+                    figures.append(no_update)
+                    extension = figure.extend_data(cursor[1])
+                    if extension is None:
+                        extensions.append(no_update)
+                        cursors[name] = cursor
+                    else:
+                        data, indices, lengths = extension
+                        extensions.append((data, indices))
+                        cursors[name] = [cursor[0], lengths, view]
+                        self._observe_lag(figure)
+        RENDER_SECONDS.observe(time.perf_counter() - start)
+        return figures, extensions, cursors
+
+    @staticmethod
+    def _observe_lag(figure: BaseFigureCallback):
+        """Record how long ago the newest event being sent to a browser was made."""
+        if figure.last_event_time is not None:
+            LAG_SECONDS.observe(max(time.time() - figure.last_event_time, 0.0))
+
+    def _setup_layout(self):
+        app = self._app
 
         app.layout = html.Div(
             [
@@ -102,52 +706,146 @@ class PlotServer:
                     },
                 ),
                 dcc.Interval(id="interval", interval=250, n_intervals=0),
+                # Bumped by the push stream, see `updates`.
+                dcc.Store(id="push"),
+                # What this browser currently holds, so only changes are sent to it.
+                dcc.Store(id="layout-state"),
+                dcc.Store(id="cursor-state"),
+                dcc.Store(id="view-state", data={}),
+                # Plots on screen, or `None` if the browser can't tell, and those
+                # with a graph made.
+                dcc.Store(id="visible-plots", data=[]),
+                dcc.Store(id="mounted-plots", data=[]),
                 html.Div(id="plots-container"),
             ]
         )
 
+        app.clientside_callback(
+            PUSH_CLIENT, Output("push", "data"), Input("push", "id")
+        )
+        app.clientside_callback(
+            VIEWPORT_CLIENT,
+            Output({"type": "slot", "index": ALL}, "children"),
+            Output("mounted-plots", "data"),
+            Input("layout-state", "data"),
+            Input("visible-plots", "data"),
+            State({"type": "slot", "index": ALL}, "id"),
+            State({"type": "slot", "index": ALL}, "children"),
+            State("mounted-plots", "data"),
+        )
+        app.clientside_callback(
+            TOGGLE_CLIENT,
+            Output({"type": "collapse", "index": MATCH}, "is_open"),
+            Output({"type": "collapse-btn", "index": MATCH}, "children"),
+            Input({"type": "collapse-btn", "index": MATCH}, "n_clicks"),
+            State({"type": "collapse", "index": MATCH}, "is_open"),
+            prevent_initial_call=True,
+        )
+
         @app.callback(
             Output("plots-container", "children"),
+            Output("layout-state", "data"),
+            Output("cursor-state", "data"),
             Input("interval", "n_intervals"),
-            State("plots-container", "children"),
+            Input("push", "data"),
+            State("layout-state", "data"),
             prevent_initial_call=True,
         )
-        def update_plots(n, children):
-            logger.debug(f"Updated plots for the {n}th time.")
+        def update_layout(n, pushed, layout_state):
+            logger.debug(f"Updated plots for the {n}th time, {pushed} pushed.")
             with self._lock:
-                while not self.updated_plot_queue.empty():
-                    names, figure = self.updated_plot_queue.get()
-                    self._plots[names] = figure
-
-                columns = [[] for _ in range(self._columns)]
-                columns_iter = itertools.cycle(columns)
-                for names, fig in self._plots.items():
-                    next(columns_iter).append(make_card(", ".join(names), fig))
-                return dbc.Row(
-                    [dbc.Col(column, width=12 // self._columns) for column in columns]
+                self._drain_updated_plots()
+                if layout_state and layout_state["version"] == self._layout_version:
+                    # Always written so that `update_plots` runs on every tick.
+                    return (
+                        no_update,
+                        {"version": self._layout_version, "tick": [n, pushed]},
+                        no_update,
+                    )
+                return self._render_layout()
+
+        @app.callback(
+            Output({"type": "plot", "index": ALL}, "figure"),
+            Output({"type": "plot", "index": ALL}, "extendData"),
+            Output("cursor-state", "data", allow_duplicate=True),
+            Input("layout-state", "data"),
+            Input("view-state", "data"),
+            Input("visible-plots", "data"),
+            Input("mounted-plots", "data"),
+            State("cursor-state", "data"),
+            State({"type": "plot", "index": ALL}, "id"),
+            prevent_initial_call=True,
+        )
+        def update_plots(
+            layout_state, view_state, visible_plots, mounted, cursor_state, ids
+        ):
+            if not layout_state:
+                return no_update, no_update, no_update
+            if not cursor_state or cursor_state["layout"] != layout_state["version"]:
+                cursor_state = {"layout": layout_state["version"], "plots": {}}
+            with self.update_bus.hold():
+                with self._lock:
+                    # The request may have reached a different viewer than the layout.
+                    self._drain_updated_plots()
+                # Plots off screen are left as they are, and caught up from their
+                # cursor once they're back on screen.
+                names = [plot_id["index"] for plot_id in ids]
+                visible = set(names if visible_plots is None else visible_plots)
+                shown = [name for name in names if name in visible]
+                figures, extensions, cursors = self.render_updates(
+                    [tuple(name.split(", ")) for name in shown],
+                    cursor_state["plots"],
+                    view_state,
                 )
+            updates = dict(
+                zip(shown, zip(figures, extensions, strict=True), strict=True)
+            )
+            for name in names:
+                if name not in updates and name in cursor_state["plots"]:
+                    cursors[name] = cursor_state["plots"][name]
+            return (
+                [updates.get(name, (no_update, no_update))[0] for name in names],
+                [updates.get(name, (no_update, no_update))[1] for name in names],
+                {"layout": cursor_state["layout"], "plots": cursors},
+            )
+
+        @app.callback(
+            Output("view-state", "data"),
+            Input({"type": "plot", "index": ALL}, "relayoutData"),
+            State("view-state", "data"),
+            prevent_initial_call=True,
+        )
+        def update_view(relayouts, view_state):
+            # Zooming re-decimates plots server side, at full resolution in the
+            # zoomed region.
+            views = dict(view_state or {})
+            for item in callback_context.inputs_list[0]:
+                if item["id"] != callback_context.triggered_id or not item.get("value"):
+                    continue
+                name = item["id"]["index"]
+                view = _axis_ranges(item["value"], views.get(name))
+                if view:
+                    views[name] = view
+                else:
+                    views.pop(name, None)
+            if views == (view_state or {}):
+                return no_update
+            return views
 
         @app.callback(
             Output("plots-container", "children", allow_duplicate=True),
+            Output("layout-state", "data", allow_duplicate=True),
+            Output("cursor-state", "data", allow_duplicate=True),
             Input({"type": "delete-btn", "index": ALL}, "n_clicks"),
-            State("plots-container", "children"),
             prevent_initial_call=True,
         )
-        def delete_plot(n_clicks_list, children):
+        def delete_plot(n_clicks_list):
             ctx = callback_context
             if not ctx.triggered or all(n is None or n == 0 for n in n_clicks_list):
-                return no_update
+                return no_update, no_update, no_update
             triggered_id = ctx.triggered[0]["prop_id"].split(".")[0]
             triggered_index = eval(triggered_id)["index"]
+            self.delete_plot(tuple(triggered_index.split(", ")))
             with self._lock:
-                plot_name = tuple(triggered_index.split(", "))
-                self._plots.pop(plot_name, None)
-                self.deleted_plot_queue.put(plot_name)
-            # Rebuild the cards after deletion
-            columns = [[] for _ in range(self._columns)]
-            columns_iter = itertools.cycle(columns)
-            for names, fig in self._plots.items():
-                next(columns_iter).append(make_card(", ".join(names), fig))
-            return dbc.Row(
-                [dbc.Col(column, width=12 // self._columns) for column in columns]
-            )
+                # Rebuild the cards after deletion
+                return self._render_layout()
@@ -0,0 +1,382 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import cast
+
+import numpy as np
+from bluesky.callbacks.zmq import RemoteDispatcher
+from event_model import pack_event_page
+from event_model.documents import Document, Event, EventPage
+
+from bluesky_web_plots.figures.snapshot import SnapshotFigureCallback
+from bluesky_web_plots.logger import logger
+from bluesky_web_plots.retention import RetentionPolicy
+from bluesky_web_plots.serialization import encode_typed_arrays
+
+from .callback import SUBPROCESS_NAME, WebPlotCallback
+from .server import PlotServer
+
+Layout = dict[str, tuple[int, str, tuple[int, ...]]]
+"""Where each column of a page is in a shared memory block, as (offset, dtype, shape)."""
+
+
+def _shard(names: tuple[str, ...], shards: int) -> int:
+    return zlib.crc32(", ".join(names).encode()) % shards
+
+
+def _columns(page: EventPage) -> dict:
+    columns = {"time": page["time"], "seq_num": page["seq_num"]}
+    for key, values in page["data"].items():
+        columns[f"data/{key}"] = values
+    for key, values in page["timestamps"].items():
+        columns[f"timestamps/{key}"] = values
+    return columns
+
+
+def _share(columns: dict) -> tuple[SharedMemory | None, Layout, dict]:
+    """Copy the numeric columns into one shared memory block, the rest are returned
+    to be pickled as they are."""
+    arrays, inline = {}, {}
+    for name, values in columns.items():
+        try:
+            array = np.asarray(values)
+        except ValueError:  # Ragged.
+            array = None
+        if array is not None and array.dtype.kind in "biuf" and array.nbytes:
+            arrays[name] = array
+        else:
+            inline[name] = values
+    if not arrays:
+        return None, {}, inline
+    memory = SharedMemory(create=True, size=sum(a.nbytes for a in arrays.values()))
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        np.ndarray(array.shape, array.dtype, memory.buf, offset)[...] = array
+        layout[name] = (offset, array.dtype.str, array.shape)
+        offset += array.nbytes
+    return memory, layout, inline
+
+
+def _page(
+    descriptor: str, memory_name: str | None, layout: Layout, inline: dict
+) -> EventPage:
+    """Rebuild an event page from `_share`, copying the columns out of shared memory."""
+    columns = dict(inline)
+    if memory_name is not None:
+        memory = SharedMemory(name=memory_name)
+        try:
+            for name, (offset, dtype, shape) in layout.items():
+                columns[name] = np.ndarray(shape, dtype, memory.buf, offset).copy()
+        finally:
+            memory.close()
+    page = {"descriptor": descriptor, "uid": [], "filled": {}, "data": {}}
+    page["timestamps"] = {}
+    for name, values in columns.items():
+        group, _, key = name.partition("/")
+        if key:
+            page[group][key] = values
+        else:
+            page[name] = values
+    return cast(EventPage, page)
+
+
+class _ShardCallback(WebPlotCallback):
+    """A headless `WebPlotCallback` only plotting the figures hashed to its shard."""
+
+    def __init__(self, shard: int, shards: int, **kwargs):
+        self._shard_index = shard
+        self._shards = shards
+        super().__init__(serve=False, **kwargs)
+
+    def _owns(self, names: tuple[str, ...]) -> bool:
+        return _shard(names, self._shards) == self._shard_index
+
+
+def _send_snapshots(callback: WebPlotCallback, results, fast_serialization: bool):
+    snapshots = {}
+    with callback.server.lock:
+        for names, figure in callback.server.update_bus.drain().items():
+            snapshot = figure.emit_dict()
+            if fast_serialization:
+                encode_typed_arrays(snapshot)
+            snapshots[names] = snapshot
+    if snapshots:
+        results.put(("snapshots", snapshots))
+
+
+def _work(
+    shard: int,
+    shards: int,
+    commands: Connection,
+    results,
+    callback_kwargs: dict,
+    snapshot_interval: float,
+):
+    """Entrypoint of a worker process, owns the figures of one shard."""
+    callback = _ShardCallback(shard, shards, **callback_kwargs)
+    fast_serialization = callback_kwargs.get("fast_serialization", False)
+    next_snapshot = time.monotonic() + snapshot_interval
+    while True:
+        if commands.poll(max(next_snapshot - time.monotonic(), 0)):
+            message = commands.recv()
+            if message is None:
+                break
+            kind, *args = message
+            try:
+                if kind == "page":
+                    try:
+                        page = _page(*args)
+                    finally:
+                        if args[1] is not None:
+                            results.put(("done", args[1]))
+                    callback("event_page", page)
+                elif kind == "delete":
+                    callback.server.deleted_plot_queue.put(args[0])
+                else:
+                    callback(*args)
+            except Exception:  # noqa: BLE001 - nor stop the shard
+                logger.exception(f"Shard {shard} failed to plot {kind}")
+        if time.monotonic() >= next_snapshot:
+            _send_snapshots(callback, results, fast_serialization)
+            next_snapshot = time.monotonic() + snapshot_interval
+    _send_snapshots(callback, results, fast_serialization)
+    results.put(("stopped", shard))
+
+
+class ShardedWebPlotCallback:
+    def __init__(
+        self,
+        zmq_uri: str | None = None,
+        plot_host: str = "0.0.0.0",
+        plot_port=12354,
+        columns=3,
+        ignore_streams: tuple[str, ...] = (),
+        fast_serialization: bool = False,
+        retention: RetentionPolicy | None = None,
+        workers: int | None = None,
+        page_size: int = 256,
+        flush_interval: float = 0.05,
+        snapshot_interval: float = 0.25,
+    ):
+        """A `WebPlotCallback` with its figures sharded over worker processes, for runs
+        with many plotted fields.
+
+        Events are packed into pages whose numeric columns are written once into
+        shared memory for every worker to read. Each worker updates and serializes its
+        own figures, sending snapshots of the updated ones to the web interface.
+        Browsers are sent whole figures whenever a snapshot arrives.
+
+        So compared to a `WebPlotCallback`, plots served from snapshots can't be
+        exported or have runs recalled, aren't extended point by point, and aren't
+        re-decimated when zoomed. Every worker reads every page, since which fields a
+        worker's figures need is only known to the worker, only the figures are
+        split between them.
+
+        Args are the same as `WebPlotCallback`, and:
+            workers (int | None):
+                Number of worker processes, the number of CPUs by default.
+            page_size (int):
+                Most events packed into a page before it's sent to the workers.
+            flush_interval (float):
+                Most seconds an event waits to be packed into a page.
+            snapshot_interval (float):
+                Seconds between each worker's snapshots of its updated figures.
+        """
+        if zmq_uri is not None:
+            # Ensure no "tcp://" prefix, this is added in the RemoteDispatcher
+            zmq_uri = zmq_uri.removeprefix("tcp://")
+        self.ZMQ_URI = zmq_uri
+        self._server = PlotServer(
+            host=plot_host.removeprefix("http://"),
+            port=plot_port,
+            columns=columns,
+            fast_serialization=fast_serialization,
+        )
+        self._page_size = page_size
+        self._flush_interval = flush_interval
+
+        context = multiprocessing.get_context("spawn")
+        self._results = context.Queue()
+        self._connections: list[Connection] = []
+        self._processes = []
+        workers = workers or os.cpu_count() or 1
+        for shard in range(workers):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_work,
+                args=(
+                    shard,
+                    workers,
+                    receiver,
+                    self._results,
+                    dict(
+                        ignore_streams=ignore_streams,
+                        fast_serialization=fast_serialization,
+                        retention=retention,
+                    ),
+                    snapshot_interval,
+                ),
+                name=f"{SUBPROCESS_NAME}-shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            receiver.close()
+            self._connections.append(sender)
+            self._processes.append(process)
+
+        # Guards the pending events and the pipes to the workers.
+        self._lock = threading.Lock()
+        self._pending: list[Event] = []
+        self._pending_since = 0.0
+        # Shared memory blocks, and how many workers are yet to read them.
+        self._shared: dict[str, tuple[SharedMemory, int]] = {}
+        self._shared_lock = threading.Lock()
+        self._snapshots: dict[tuple[str, ...], SnapshotFigureCallback] = {}
+        self._closed = threading.Event()
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+        atexit.register(self.close)
+
+        logger.info(f"Starting gui at http://{plot_host}:{plot_port}")
+        self._server.run()
+
+    @property
+    def server(self) -> PlotServer:
+        """The server the figures are plotted on."""
+        return self._server
+
+    def run(self):
+        """Runs the callback as a service listening to ZMQ for event documents."""
+        if self.ZMQ_URI is None:
+            raise ValueError(
+                "Cannot run as a service as the ZMQ host or port was not provided on init."
+            )
+        remote_dispatcher = RemoteDispatcher(self.ZMQ_URI)
+        remote_dispatcher.subscribe(self)
+        logger.info(f"Connected to {self.ZMQ_URI} Ready to Plot, Ctrl + C to Exit")
+        try:
+            remote_dispatcher.start()
+        except KeyboardInterrupt:
+            print("Exiting...")
+            remote_dispatcher.stop()
+        self.close()
+
+    def __call__(self, name: str, document: Document):
+        with self._lock:
+            if name == "event":
+                event = cast(Event, document)
+                if self._pending and (
+                    self._pending[-1]["descriptor"] != event["descriptor"]
+                ):
+                    self._flush()
+                if not self._pending:
+                    self._pending_since = time.monotonic()
+                self._pending.append(event)
+                if len(self._pending) >= self._page_size:
+                    self._flush()
+                return
+
+            self._flush()
+            if name == "event_page":
+                self._send_page(document)  # type: ignore
+                return
+            if name == "start":
+                while not self._server.deleted_plot_queue.empty():
+                    names = self._server.deleted_plot_queue.get()
+                    self._snapshots.pop(names, None)
+                    self._broadcast(("delete", names))
+            self._broadcast(("document", name, document))
+
+    def _broadcast(self, message):
+        """Must be called with `_lock` held."""
+        for connection in self._connections:
+            connection.send(message)
+
+    def _send_page(self, page: EventPage):
+        """Must be called with `_lock` held."""
+        memory, layout, inline = _share(_columns(page))
+        if memory is not None:
+            with self._shared_lock:
+                self._shared[memory.name] = (memory, len(self._connections))
+        self._broadcast(
+            (
+                "page",
+                page["descriptor"],
+                memory.name if memory is not None else None,
+                layout,
+                inline,
+            )
+        )
+
+    def _flush(self):
+        """Send pending events as a page. Must be called with `_lock` held."""
+        if self._pending:
+            self._send_page(pack_event_page(*self._pending))
+            self._pending = []
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self._flush_interval):
+            with self._lock:
+                if time.monotonic() - self._pending_since >= self._flush_interval:
+                    self._flush()
+
+    def _collect(self):
+        """Take snapshots and shared memory receipts from the workers."""
+        stopped = 0
+        while stopped < len(self._processes):
+            kind, payload = self._results.get()
+            if kind == "stopped":
+                stopped += 1
+            elif kind == "done":
+                with self._shared_lock:
+                    memory, readers = self._shared[payload]
+                    if readers > 1:
+                        self._shared[payload] = (memory, readers - 1)
+                        continue
+                    del self._shared[payload]
+                memory.close()
+                memory.unlink()
+            elif kind == "snapshots":
+                for names, snapshot in payload.items():
+                    with self._server.lock:
+                        figure = self._snapshots.get(names)
+                        if figure is None:
+                            figure = SnapshotFigureCallback(snapshot)
+                            self._snapshots[names] = figure
+                        else:
+                            figure.update(snapshot)
+                    self._server.update_bus.publish(names, figure)
+
+    def close(self, timeout: float = 5.0):
+        """Send any pending events and stop the workers, the plots they last sent are
+        still served."""
+        atexit.unregister(self.close)
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._lock:
+            self._flush()
+            for connection in self._connections:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+                connection.close()
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._collector.join(timeout=timeout)
+        with self._shared_lock:
+            for memory, _ in self._shared.values():
+                memory.close()
+                memory.unlink()
+            self._shared.clear()
@@ -0,0 +1,102 @@
+import atexit
+import multiprocessing
+import threading
+from multiprocessing.connection import Connection
+from queue import Queue
+
+from event_model.documents import Document
+
+from bluesky_web_plots.logger import logger
+from bluesky_web_plots.retention import RetentionPolicy
+
+from .callback import SUBPROCESS_NAME, WebPlotCallback
+
+
+def _serve(connection: Connection, callback_kwargs: dict):
+    """Entrypoint of the child process, owns the figures and the `PlotServer`."""
+    callback = WebPlotCallback(**callback_kwargs)
+
+    # Documents are pulled off the pipe as soon as they arrive so that a slow figure
+    # never fills the pipe and blocks the run engine on `send`.
+    documents: Queue[tuple[str, Document] | None] = Queue()
+
+    def receive():
+        while True:
+            try:
+                item = connection.recv()
+            except EOFError:
+                item = None
+            documents.put(item)
+            if item is None:
+                return
+
+    threading.Thread(target=receive, daemon=True).start()
+    while (item := documents.get()) is not None:
+        name, document = item
+        try:
+            callback(name, document)
+        except Exception:  # noqa: BLE001 - nor stop the child process
+            logger.exception(f"Failed to plot {name} document")
+
+
+class SubprocessWebPlotCallback:
+    def __init__(
+        self,
+        plot_host: str = "0.0.0.0",
+        plot_port=12354,
+        columns=3,
+        local_window_mode: bool = False,
+        ignore_streams: tuple[str, ...] = (),
+        fast_serialization: bool = False,
+        retention: RetentionPolicy | None = None,
+        journal: str | None = None,
+    ):
+        """A `WebPlotCallback` in a child process, to be used with `RE.subscribe`.
+
+        The run engine thread only pickles each document onto a pipe, the figures and
+        the web interface live in the child process so they don't contend with the plan
+        for the GIL.
+
+        Args are the same as `WebPlotCallback`, without `zmq_uri`.
+        """
+        receiver, self._connection = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=_serve,
+            args=(
+                receiver,
+                dict(
+                    plot_host=plot_host,
+                    plot_port=plot_port,
+                    columns=columns,
+                    local_window_mode=local_window_mode,
+                    ignore_streams=ignore_streams,
+                    fast_serialization=fast_serialization,
+                    retention=retention,
+                    journal=journal,
+                ),
+            ),
+            name=SUBPROCESS_NAME,
+        )
+        self._process.start()
+        receiver.close()
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def __call__(self, name: str, document: Document):
+        with self._lock:
+            self._connection.send((name, document))
+
+    def close(self, timeout: float = 1.0):
+        """Stop the child process, the plots will no longer be served."""
+        atexit.unregister(self.close)
+        with self._lock:
+            if not self._connection.closed:
+                try:
+                    self._connection.send(None)
+                except OSError:
+                    pass
+                self._connection.close()
+        self._process.join(timeout=timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
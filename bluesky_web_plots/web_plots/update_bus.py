@@ -0,0 +1,82 @@
+import threading
+from collections.abc import Hashable, Iterator
+from contextlib import contextmanager
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class UpdateBus(Generic[K, V]):
+    """Coalesces updates between two UI ticks, last writer wins.
+
+    Each key holds at most one pending value and a version which is bumped on every
+    publish, so the bus is bounded by the number of keys rather than the event rate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self._dirty: dict[K, V] = {}
+        self._versions: dict[K, int] = {}
+        self._changes = 0
+        self._holds = 0
+
+    def publish(self, key: K, value: V):
+        with self._lock:
+            # Waiters are only woken when the bus goes from clean to dirty, they pick
+            # up everything published until the next drain anyway.
+            wake = not self._dirty and not self._holds
+            self._dirty[key] = value
+            self._versions[key] = self._versions.get(key, 0) + 1
+            if wake:
+                self._wake()
+
+    def notify(self):
+        """Wake anything waiting on the bus without publishing a value."""
+        with self._lock:
+            self._wake()
+
+    def _wake(self):
+        """Must be called with `_lock` held."""
+        self._changes += 1
+        self._published.notify_all()
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Don't wake waiters while a drained batch is being handled, then wake them
+        once if anything was published meanwhile."""
+        with self._lock:
+            self._holds += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holds -= 1
+                if not self._holds and self._dirty:
+                    self._wake()
+
+    def wait(self, seen: int, timeout: float | None = None) -> int:
+        """Block until there's been a change since `seen` changes or `timeout`
+        passes, returning the number of changes so far."""
+        with self._lock:
+            self._published.wait_for(lambda: self._changes != seen, timeout)
+            return self._changes
+
+    def drain(self) -> dict[K, V]:
+        """Everything published since the last drain, one value per key."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        return dirty
+
+    def version(self, key: K) -> int:
+        return self._versions.get(key, 0)
+
+    def discard(self, key: K):
+        with self._lock:
+            self._dirty.pop(key, None)
+            self._versions.pop(key, None)
+
+    def __len__(self) -> int:
+        """Number of keys with a pending update."""
+        return len(self._dirty)
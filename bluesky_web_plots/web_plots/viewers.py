@@ -0,0 +1,143 @@
+import atexit
+import itertools
+import multiprocessing
+import pickle
+import threading
+from multiprocessing.connection import Connection
+
+from bluesky_web_plots.figures.snapshot import SnapshotFigureCallback
+from bluesky_web_plots.logger import logger
+
+from .callback import SUBPROCESS_NAME
+from .server import PlotServer
+
+
+def _view(
+    host: str,
+    port: int,
+    columns: int,
+    fast_serialization: bool,
+    snapshots: Connection,
+    deletions,
+):
+    """Entrypoint of a viewer process, serves browsers the figures it's sent."""
+    server = PlotServer(
+        host=host,
+        port=port,
+        columns=columns,
+        fast_serialization=fast_serialization,
+        reuse_port=True,
+    )
+    # Plots deleted in a browser are forgotten by the plotting process, which tells
+    # every viewer to drop them.
+    server.deleted_plot_queue = deletions
+    server.run()
+    figures: dict[tuple[str, ...], SnapshotFigureCallback] = {}
+    while True:
+        try:
+            kind, payload = pickle.loads(snapshots.recv_bytes())
+        except EOFError:
+            break
+        if kind == "snapshots":
+            for names, (generation, snapshot) in payload.items():
+                figure = figures.get(names)
+                if figure is None:
+                    figure = figures[names] = SnapshotFigureCallback(snapshot)
+                figure.update(snapshot, generation)
+                server.update_bus.publish(names, figure)
+        elif kind == "delete":
+            figures.pop(payload, None)
+            server.forget_plot(payload)
+        elif kind == "stop":
+            break
+
+
+class ViewerPool:
+    def __init__(
+        self, server: PlotServer, viewers: int, snapshot_interval: float = 0.25
+    ):
+        """Serve the plots published to `server` from `viewers` processes sharing its
+        port, so browsers don't compete with plotting for the GIL.
+
+        Updated figures are emitted once per `snapshot_interval`, however many
+        browsers are watching, and sent to every viewer. Browsers are sent whole
+        figures whenever a snapshot arrives. `/metrics` on a viewer only covers the
+        browsers it served.
+        """
+        self._server = server
+        self._snapshot_interval = snapshot_interval
+        self._generations = itertools.count(1)
+
+        context = multiprocessing.get_context("spawn")
+        self._deletions = context.Queue()
+        self._connections: list[Connection] = []
+        self._processes = []
+        for index in range(viewers):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_view,
+                args=(
+                    server.HOST,
+                    server.PORT,
+                    server.columns,
+                    server.fast_serialization,
+                    receiver,
+                    self._deletions,
+                ),
+                name=f"{SUBPROCESS_NAME}-viewer-{index}",
+                daemon=True,
+            )
+            process.start()
+            receiver.close()
+            self._connections.append(sender)
+            self._processes.append(process)
+
+        # Guards the pipes to the viewers.
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._forwarder = threading.Thread(target=self._forward_deletions, daemon=True)
+        self._forwarder.start()
+        threading.Thread(target=self._send_snapshots, daemon=True).start()
+        atexit.register(self.close)
+
+    def _broadcast(self, message):
+        data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            for connection in self._connections:
+                try:
+                    connection.send_bytes(data)
+                except OSError:
+                    logger.warning("Lost a viewer process")
+
+    def _send_snapshots(self):
+        while not self._closed.wait(self._snapshot_interval):
+            snapshots = {}
+            with self._server.lock:
+                for names, figure in self._server.update_bus.drain().items():
+                    snapshots[names] = (next(self._generations), figure.emit_dict())
+            if snapshots:
+                self._broadcast(("snapshots", snapshots))
+
+    def _forward_deletions(self):
+        while (names := self._deletions.get()) is not None:
+            self._server.update_bus.discard(names)
+            self._server.deleted_plot_queue.put(names)
+            self._broadcast(("delete", names))
+
+    def close(self, timeout: float = 5.0):
+        """Stop the viewer processes."""
+        atexit.unregister(self.close)
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._broadcast(("stop", None))
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._deletions.put(None)
+        self._forwarder.join(timeout=timeout)
@@ -8,7 +8,7 @@ import zmq
 from bluesky.callbacks.zmq import Proxy, Publisher
 from bluesky.run_engine import RunEngine
 
-from bluesky_web_plots import WebPlotCallback
+from bluesky_web_plots import SubprocessWebPlotCallback, WebPlotCallback
 
 EXAMPLE_MODE = os.getenv("BLUESKY_WEB_PLOTS_EXAMPLE_MODE", "0") == "1"
 
@@ -58,6 +58,17 @@ def threaded_callback_run_engine():
     return RE
 
 
+@pytest.fixture(scope="function")
+def subprocess_callback_run_engine():
+    RE = RunEngine()
+    callback = SubprocessWebPlotCallback(plot_port=12355)
+    RE.subscribe(callback)
+    try:
+        yield RE, callback
+    finally:
+        callback.close()
+
+
 @pytest.fixture(scope="function")
 def plot_subprocess():
     exception_queue = Queue()
@@ -0,0 +1,94 @@
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+
+from bluesky_web_plots.structures import unpack_structures
+from bluesky_web_plots.structures.sample_map import ColorScale, SampleMap
+
+
+def scalar(num: int, fields: int = 1, runs: int = 1) -> Iterator[tuple[str, Any]]:
+    """Documents of a `count` of `fields` hinted scalar detectors, one event at a
+    time."""
+    names = [f"det{index}" for index in range(fields)]
+    generator = np.random.default_rng(0)
+    for scan_id in range(1, runs + 1):
+        start, descriptor = f"start-{scan_id}", f"descriptor-{scan_id}"
+        yield "start", {"uid": start, "time": time.time(), "scan_id": scan_id}
+        yield (
+            "descriptor",
+            {
+                "uid": descriptor,
+                "run_start": start,
+                "name": "primary",
+                "time": time.time(),
+                "data_keys": {
+                    name: {"dtype": "number", "shape": [], "source": f"sim://{name}"}
+                    for name in names
+                },
+                "object_keys": {name: [name] for name in names},
+            },
+        )
+        for seq_num, row in enumerate(generator.normal(size=(num, fields)), start=1):
+            now = time.time()
+            data = dict(zip(names, row.tolist(), strict=True))
+            yield (
+                "event",
+                {
+                    "uid": f"event-{scan_id}-{seq_num}",
+                    "descriptor": descriptor,
+                    "time": now,
+                    "seq_num": seq_num,
+                    "data": data,
+                    "timestamps": dict.fromkeys(data, now),
+                    "filled": {},
+                },
+            )
+        yield "stop", {"uid": f"stop-{scan_id}", "run_start": start}
+
+
+def sample_map(num: int) -> Iterator[tuple[str, Any]]:
+    """Documents of a run mapping `i` over `x` and `y`, hinted as a sample map."""
+    structure = SampleMap(
+        names=("x", "y", "i"), intensity_data_key="i", color_scale=ColorScale.JET
+    )
+    yield (
+        "start",
+        {
+            "uid": "start-1",
+            "time": time.time(),
+            "scan_id": 1,
+            "hints": unpack_structures(structure),
+        },
+    )
+    yield (
+        "descriptor",
+        {
+            "uid": "descriptor-1",
+            "run_start": "start-1",
+            "name": "primary",
+            "time": time.time(),
+            "data_keys": {
+                name: {"dtype": "number", "shape": [], "source": f"sim://{name}"}
+                for name in structure["names"]
+            },
+            "object_keys": {name: [name] for name in structure["names"]},
+        },
+    )
+    for seq_num in range(1, num + 1):
+        now = time.time()
+        data = {"x": float(seq_num % 10), "y": float(seq_num // 10), "i": 1.0}
+        yield (
+            "event",
+            {
+                "uid": f"event-1-{seq_num}",
+                "descriptor": "descriptor-1",
+                "time": now,
+                "seq_num": seq_num,
+                "data": data,
+                "timestamps": dict.fromkeys(data, now),
+                "filled": {},
+            },
+        )
+    yield "stop", {"uid": "stop-1", "run_start": "start-1"}
@@ -0,0 +1,259 @@
+import asyncio
+import base64
+import json
+import pickle
+import threading
+import time
+import urllib.request
+
+import numpy as np
+import orjson
+import zmq
+from bluesky.plans import count
+from flask import Flask
+from ophyd_async import plan_stubs as oaps
+
+from bluesky_web_plots import (
+    MultiSourceWebPlotService,
+    ShardedWebPlotCallback,
+    WebPlotCallback,
+)
+from bluesky_web_plots.journal import DocumentJournal
+from bluesky_web_plots.replay import read_documents, replay
+from bluesky_web_plots.retention import RetentionPolicy
+
+from .documents import sample_map, scalar
+from .mock_devices import SomeActuator
+
+
+def test_subprocess_callback(subprocess_callback_run_engine):
+    RE, callback = subprocess_callback_run_engine
+    motor = SomeActuator(name="motor")
+    RE(oaps.ensure_connected(motor, mock=True))
+    RE(count([motor], num=100))
+    assert callback._process.is_alive()
+
+
+def test_sharded_callback_plots_every_field_across_workers():
+    callback = ShardedWebPlotCallback(plot_port=12356, workers=2, page_size=64)
+    for name, document in scalar(500, fields=6):
+        callback(name, document)
+    callback.close()
+
+    names = callback.server.plot_names()
+    assert set(names) == {(f"det{index}",) for index in range(6)}
+    for figure in map(callback.server.figure, names):
+        assert figure is not None
+        (trace,) = figure["data"]
+        y = trace["y"]
+        assert len(np.frombuffer(base64.b64decode(y["bdata"]), y["dtype"])) == 500
+    assert not callback._shared
+
+
+def test_multi_source_service_plots_each_source_in_its_namespace():
+    context = zmq.Context()
+    publishers = {namespace: context.socket(zmq.PUB) for namespace in ("a", "b")}
+    ports = {
+        namespace: socket.bind_to_random_port("tcp://127.0.0.1")
+        for namespace, socket in publishers.items()
+    }
+    service = MultiSourceWebPlotService(
+        {namespace: f"127.0.0.1:{port}" for namespace, port in ports.items()},
+        plot_port=12357,
+    )
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    serving = asyncio.run_coroutine_threadsafe(service.serve(), loop)
+    try:
+        time.sleep(0.5)  # Let the subscribers connect.
+        for socket in publishers.values():
+            for name, document in scalar(10, runs=1):
+                socket.send(b" ".join((b"", name.encode(), pickle.dumps(document))))
+        deadline = time.monotonic() + 10
+        while len(service.server.plot_names()) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert set(service.server.plot_names()) == {("a", "det0"), ("b", "det0")}
+        tabs = service.server.layout()
+        assert [tab.label for tab in tabs.children] == ["a", "b"]
+        _, cursors = service.server.render_updates([("a", "det0"), ("b", "det0")], {})[
+            1:
+        ]
+        assert set(cursors) == {"a, det0", "b, det0"}
+    finally:
+        serving.cancel()
+        time.sleep(0.1)
+        loop.call_soon_threadsafe(loop.stop)
+        for socket in publishers.values():
+            socket.close(linger=0)
+        context.term()
+
+
+def _dash_update(
+    port: int, output: str, outputs: list, inputs: list, state: list
+) -> dict:
+    """Call the Dash callback whose outputs start with `output`, as a browser would."""
+    with urllib.request.urlopen(
+        f"http://127.0.0.1:{port}/_dash-dependencies", timeout=5
+    ) as response:
+        (output,) = (
+            dependency["output"]
+            for dependency in json.load(response)
+            if dependency["output"].startswith(f"..{output}...")
+        )
+    body = {"output": output, "outputs": outputs, "inputs": inputs, "state": state}
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/_dash-update-component",
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.load(response)["response"]
+
+
+def _fetch_plots(port: int, names: list[str]) -> dict:
+    """The cursors a new browser with `names` on screen gets from `update_plots`."""
+    ids = [{"type": "plot", "index": name} for name in names]
+    layout = _dash_update(
+        port,
+        "plots-container.children",
+        [
+            {"id": "plots-container", "property": "children"},
+            {"id": "layout-state", "property": "data"},
+            {"id": "cursor-state", "property": "data"},
+        ],
+        [
+            {"id": "interval", "property": "n_intervals", "value": 1},
+            {"id": "push", "property": "data", "value": None},
+        ],
+        [{"id": "layout-state", "property": "data", "value": None}],
+    )
+    plots = _dash_update(
+        port,
+        '{"index":["ALL"],"type":"plot"}.figure',
+        [
+            [{"id": plot_id, "property": "figure"} for plot_id in ids],
+            [{"id": plot_id, "property": "extendData"} for plot_id in ids],
+            {"id": "cursor-state", "property": "data"},
+        ],
+        [
+            {
+                "id": "layout-state",
+                "property": "data",
+                "value": layout["layout-state"]["data"],
+            },
+            {"id": "view-state", "property": "data", "value": {}},
+            {"id": "visible-plots", "property": "data", "value": names},
+            {"id": "mounted-plots", "property": "data", "value": names},
+        ],
+        [
+            {"id": "cursor-state", "property": "data", "value": None},
+            [{"id": plot_id, "property": "id", "value": plot_id} for plot_id in ids],
+        ],
+    )
+    return plots["cursor-state"]["data"]["plots"]
+
+
+def test_viewer_processes_serve_the_same_plots():
+    callback = WebPlotCallback(plot_host="127.0.0.1", plot_port=12358, viewers=2)
+    assert callback._viewers is not None
+    try:
+        for name, document in scalar(200, fields=2):
+            callback(name, document)
+        deadline = time.monotonic() + 20
+        cursors = {}
+        while len(cursors) < 2 and time.monotonic() < deadline:
+            time.sleep(0.25)
+            try:
+                cursors = _fetch_plots(12358, ["det0", "det1"])
+            except OSError:  # Not serving yet.
+                pass
+
+        assert set(cursors) == {"det0", "det1"}
+        # Whichever viewer a browser reaches, it holds the same generations.
+        for _ in range(4):
+            assert _fetch_plots(12358, ["det0", "det1"]) == cursors
+    finally:
+        callback._viewers.close()
+
+
+def test_events_are_routed_to_the_figures_of_their_descriptor():
+    callback = WebPlotCallback(serve=False)
+    documents = list(scalar(10, fields=2))
+    for name, document in documents:
+        callback(name, document)
+    assert callback.server.plot_names() == [("det0",), ("det1",)]
+
+    # Deleted in the browser, forgotten when the run stops.
+    callback.server.delete_plot(("det1",))
+    callback(*documents[-1])
+    callback(*documents[-2])
+    assert callback.server.plot_names() == [("det0",)]
+
+
+def test_journal_restores_runs_hinting_structures(tmp_path):
+    journal = DocumentJournal(tmp_path / "journal")
+    for name, document in sample_map(20):
+        if name != "stop":
+            journal.append(name, document)
+    journal.close()
+
+    callback = WebPlotCallback(serve=False, journal=journal.path)
+    assert callback._current_run_start is not None
+    assert callback._current_run_start["uid"] == "start-1"
+    figure = callback._figures[("x", "y", "i")]
+    assert [trace.name for trace in figure.figure.data] == ["plan 1"]  # type: ignore
+    assert figure.trace_points() == [20]
+
+
+def test_replay_pages_events_from_a_file(tmp_path):
+    path = tmp_path / "run.jsonl"
+    path.write_bytes(
+        b"".join(orjson.dumps(list(item)) + b"\n" for item in scalar(250, fields=2))
+    )
+    callback = WebPlotCallback(serve=False)
+    names = []
+
+    def record(name, document):
+        names.append(name)
+        callback(name, document)
+
+    stats = replay(read_documents(path), record, page_size=100)
+    assert stats["events"] == 250
+    assert names == ["start", "descriptor"] + ["event_page"] * 3 + ["stop"]
+    assert len(next(iter(callback._figures[("det0",)].columns().values()))["y"]) == 250
+
+
+def test_replay_plots_runs_hinting_structures(tmp_path):
+    path = tmp_path / "run.jsonl"
+    path.write_bytes(
+        b"".join(orjson.dumps(list(item)) + b"\n" for item in sample_map(20))
+    )
+    callback = WebPlotCallback(serve=False)
+
+    replay(read_documents(path), callback, page_size=8)
+    assert callback._figures[("x", "y", "i")].trace_points() == [20]
+
+
+def test_spilled_runs_are_recalled_through_the_server(tmp_path):
+    callback = WebPlotCallback(
+        serve=False, retention=RetentionPolicy(max_runs=1, spill_directory=tmp_path)
+    )
+    for name, document in scalar(10, runs=3):
+        callback(name, document)
+    app = Flask(__name__)
+    app.add_url_rule(
+        "/recall/<path:plot>",
+        "recall",
+        callback.server.recall,
+        methods=["GET", "POST"],
+    )
+    client = app.test_client()
+
+    assert client.get("/recall/det0").json == ["plan 1", "plan 2"]
+    assert client.post("/recall/det0?trace=plan 9").status_code == 404
+    assert client.post("/recall/det0?trace=plan 1").json == ["plan 2"]
+    assert [trace.name for trace in callback._figures[("det0",)].figure.data] == [  # type: ignore
+        "plan 1",
+        "plan 3",
+    ]
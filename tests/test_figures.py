@@ -0,0 +1,540 @@
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from dash import no_update
+from event_model import pack_event_page
+from plotly import graph_objs as go
+
+from bluesky_web_plots.figures.array import ArrayFigureCallback
+from bluesky_web_plots.figures.columns import ColumnBuffer, FrameRing
+from bluesky_web_plots.figures.decimate import block_reduce, lttb, min_max
+from bluesky_web_plots.figures.grid import BinningGrid
+from bluesky_web_plots.figures.registry import FigureRegistry
+from bluesky_web_plots.figures.sample_map import SampleMapFigureCallback
+from bluesky_web_plots.figures.scalar import ScalarFigureCallback
+from bluesky_web_plots.journal import DocumentJournal
+from bluesky_web_plots.retention import RetentionPolicy
+from bluesky_web_plots.structures.array import Array, Downsample, View
+from bluesky_web_plots.structures.sample_map import ColorScale, SampleMap
+from bluesky_web_plots.structures.scalar import PlotAgainst, Scalar
+from bluesky_web_plots.web_plots.server import PlotServer
+
+
+def _run_start(scan_id=1):
+    return {"uid": f"run-start-{scan_id}", "time": time.time(), "scan_id": scan_id}
+
+
+def _descriptor(name="det"):
+    return {
+        "uid": "descriptor",
+        "run_start": "run-start-1",
+        "name": "primary",
+        "time": time.time(),
+        "data_keys": {name: {"dtype": "number", "shape": [], "source": "sim"}},
+        "object_keys": {name: [name]},
+    }
+
+
+def _event(seq_num, value, name="det"):
+    return {
+        "uid": f"event-{seq_num}",
+        "descriptor": "descriptor",
+        "time": 1_700_000_000.0 + seq_num,
+        "seq_num": seq_num,
+        "data": {name: value},
+        "timestamps": {name: 1_700_000_000.0 + seq_num},
+    }
+
+
+def test_column_buffer_grows_and_keeps_rows():
+    buffer = ColumnBuffer({"a": np.int64, "b": np.float64}, capacity=2)
+    for i in range(100):
+        buffer.append(a=i, b=i / 2)
+    assert len(buffer) == 100
+    np.testing.assert_array_equal(buffer.column("a"), np.arange(100))
+    np.testing.assert_array_equal(buffer.column("b", 10, 12), [5.0, 5.5])
+
+
+def test_scalar_figure_buffers_until_emit():
+    figure = ScalarFigureCallback(
+        Scalar(names=("det",), plot_against=PlotAgainst.SEQ_NUM)
+    )
+    figure.run_start(_run_start())  # type: ignore
+    figure.descriptor(_descriptor())  # type: ignore
+    for seq_num in range(1, 11):
+        figure.event(_event(seq_num, seq_num * 2.0))  # type: ignore
+
+    assert len(figure.figure.data[-1].x) == 0  # type: ignore
+    trace = figure.emit().data[-1]
+    np.testing.assert_array_equal(trace.x, np.arange(1, 11))  # type: ignore
+    np.testing.assert_array_equal(trace.y, np.arange(1, 11) * 2.0)  # type: ignore
+
+
+def test_plot_server_sends_only_new_points():
+    figure = ScalarFigureCallback(
+        Scalar(names=("det",), plot_against=PlotAgainst.SEQ_NUM)
+    )
+    figure.run_start(_run_start())  # type: ignore
+    figure.descriptor(_descriptor())  # type: ignore
+    server = PlotServer()
+    server.add_widget(("det",), figure)
+
+    figure.event(_event(1, 1.0))  # type: ignore
+    figures, extensions, cursors = server.render_updates([("det",)], {})
+    assert figures[0]["data"][0]["name"] == "plan 1"
+    assert cursors == {"det": [figure.generation, [1], None]}
+
+    figure.event(_event(2, 2.0))  # type: ignore
+    figure.event(_event(3, 3.0))  # type: ignore
+    figures, extensions, cursors = server.render_updates([("det",)], cursors)
+    assert figures[0] is no_update
+    data, indices = extensions[0]
+    assert indices == [0]
+    np.testing.assert_array_equal(data["x"][0], [2, 3])
+    np.testing.assert_array_equal(data["y"][0], [2.0, 3.0])
+    assert cursors == {"det": [figure.generation, [3], None]}
+
+    figures, extensions, _ = server.render_updates([("det",)], cursors)
+    assert figures[0] is no_update and extensions[0] is no_update
+
+
+def test_scalar_event_page_matches_events():
+    events = [_event(seq_num, seq_num * 0.5) for seq_num in range(1, 101)]
+    by_event, by_page = (
+        ScalarFigureCallback(Scalar(names=("det",), plot_against=PlotAgainst.TIME))
+        for _ in range(2)
+    )
+    for figure in (by_event, by_page):
+        figure.run_start(_run_start())  # type: ignore
+        figure.descriptor(_descriptor())  # type: ignore
+    for event in events:
+        by_event.event(event)  # type: ignore
+    by_page.event_page(pack_event_page(*events))  # type: ignore
+
+    event_trace, page_trace = by_event.emit().data[-1], by_page.emit().data[-1]
+    np.testing.assert_array_equal(event_trace.x, page_trace.x)  # type: ignore
+    np.testing.assert_array_equal(event_trace.y, page_trace.y)  # type: ignore
+    assert page_trace.x[0] == np.datetime64(datetime.fromtimestamp(events[0]["time"]))  # type: ignore
+
+
+def test_min_max_keeps_spikes():
+    y = np.zeros(100_000)
+    y[12_345] = 10.0
+    y[54_321] = -10.0
+    keep = min_max(y, 1000)
+    assert len(keep) <= 1002
+    assert 12_345 in keep and 54_321 in keep
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+
+
+def test_lttb_returns_requested_points():
+    x = np.arange(10_000, dtype=float)
+    keep = lttb(x, np.sin(x / 100), 500)
+    assert len(keep) == 500
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_scalar_figure_decimates_long_traces_until_zoomed():
+    figure = ScalarFigureCallback(
+        Scalar(names=("det",), plot_against=PlotAgainst.SEQ_NUM), max_points=100
+    )
+    figure.run_start(_run_start())  # type: ignore
+    figure.descriptor(_descriptor())  # type: ignore
+    figure.event_page(
+        pack_event_page(
+            *(_event(seq_num, float(seq_num)) for seq_num in range(1, 10_001))  # type: ignore
+        )  # type: ignore
+    )
+
+    assert len(figure.emit().data[-1].x) <= 102  # type: ignore
+    assert figure.needs_refresh([10_000], None) is False
+
+    zoomed = figure.emit({"x": [4_000, 4_050]}).data[-1]
+    np.testing.assert_array_equal(zoomed.x, np.arange(3_999, 4_052))  # type: ignore
+
+    figure.event(_event(10_001, 0.0))  # type: ignore
+    assert figure.needs_refresh([10_000], None) is True
+
+
+def _sample_map_events(xs, ys):
+    return [
+        {
+            "uid": f"event-{i}",
+            "descriptor": "descriptor",
+            "time": 1_700_000_000.0 + i,
+            "seq_num": i + 1,
+            "data": {"motor1": x, "motor2": y, "intensity": x * 10 + y},
+            "timestamps": {},
+        }
+        for i, (x, y) in enumerate(zip(xs, ys, strict=True))
+    ]
+
+
+def test_sample_map_fills_grid_from_plan_shape():
+    figure = SampleMapFigureCallback(
+        SampleMap(
+            names=("motor1", "motor2", "intensity"),
+            intensity_data_key="intensity",
+            color_scale=ColorScale.VIRIDIS,
+        )
+    )
+    run_start = {
+        **_run_start(),
+        "shape": (3, 4),
+        "extents": ([0, 2], [0, 30]),
+        "hints": {"dimensions": [(["motor1"], "primary"), (["motor2"], "primary")]},
+    }
+    figure.run_start(run_start)  # type: ignore
+    xs, ys = np.meshgrid([0.0, 1.0, 2.0], [0.0, 10.0, 20.0, 30.0], indexing="ij")
+    events = _sample_map_events(xs.ravel() + 0.01, ys.ravel() - 0.01)
+    for event in events[:6]:
+        figure.event(event)  # type: ignore
+    figure.event_page(pack_event_page(*events[6:]))  # type: ignore
+
+    trace = figure.emit().data[-1]
+    np.testing.assert_array_equal(trace.x, [0.0, 1.0, 2.0])  # type: ignore
+    np.testing.assert_array_equal(trace.y, [0.0, 10.0, 20.0, 30.0])  # type: ignore
+    np.testing.assert_allclose(trace.z, (xs * 10 + ys).T, atol=0.2)  # type: ignore
+    assert list(figure.figure.layout.xaxis.range) == [-0.5, 2.5]  # type: ignore
+
+
+def test_sample_map_bins_points_without_plan_shape():
+    figure = SampleMapFigureCallback(
+        SampleMap(
+            names=("motor1", "motor2", "intensity"),
+            intensity_data_key="intensity",
+            color_scale=ColorScale.VIRIDIS,
+        )
+    )
+    figure.run_start(_run_start())  # type: ignore
+    figure.event_page(pack_event_page(*_sample_map_events([2, 1, 2, 1], [5, 5, 3, 3])))  # type: ignore
+
+    trace = figure.emit().data[-1]
+    np.testing.assert_array_equal(trace.x, [1, 2])  # type: ignore
+    np.testing.assert_array_equal(trace.y, [3, 5])  # type: ignore
+    np.testing.assert_array_equal(trace.z, [[13, 23], [15, 25]])  # type: ignore
+
+
+def test_sample_map_bins_jittered_points_into_a_bounded_grid():
+    figure = SampleMapFigureCallback(
+        SampleMap(
+            names=("motor1", "motor2", "intensity"),
+            intensity_data_key="intensity",
+            color_scale=ColorScale.VIRIDIS,
+        )
+    )
+    figure.run_start(_run_start())  # type: ignore
+    generator = np.random.default_rng(0)
+    xs, ys = np.meshgrid(np.linspace(0, 4, 40), np.linspace(0, 10, 100))
+    xs = xs.ravel() + generator.normal(scale=1e-3, size=xs.size)
+    ys = ys.ravel() + generator.normal(scale=1e-3, size=ys.size)
+    figure.event_page(pack_event_page(*_sample_map_events(xs, ys)))  # type: ignore
+
+    trace = figure.emit().data[-1]
+    assert np.shape(trace.z) == (100, 40)  # type: ignore
+    np.testing.assert_allclose(trace.x, np.linspace(0, 4, 40), atol=1e-3)  # type: ignore
+
+    # Binned a few points at a time as they arrive, into the same grid.
+    grid = BinningGrid()
+    for start in range(0, xs.size, 7):
+        x, y = xs[start : start + 7], ys[start : start + 7]
+        grid.add(x, y, x * 10 + y)
+        grid.axes()
+    x, y, z = grid.axes()
+    np.testing.assert_allclose(x, trace.x)  # type: ignore
+    np.testing.assert_allclose(y, trace.y)  # type: ignore
+    np.testing.assert_array_equal(z, trace.z)  # type: ignore
+    assert grid.points == xs.size
+
+    # Points which would only fill a sparse grid, e.g a spiral, stay scattered.
+    figure.run_start(_run_start(2))  # type: ignore
+    angles = np.linspace(0, 20 * np.pi, 2000)
+    figure.event_page(  # type: ignore
+        pack_event_page(
+            *_sample_map_events(angles * np.cos(angles), angles * np.sin(angles))  # type: ignore
+        )
+    )
+    trace = figure.emit().data[-1]
+    assert np.shape(trace.z) == (2000,)  # type: ignore
+
+
+def test_frame_ring_keeps_most_recent_frames_in_order():
+    ring = FrameRing(capacity=4, width=3)
+    ring.push(np.arange(6 * 3).reshape(6, 3), np.arange(6.0))
+    ring.push(np.full((1, 3), -1), np.array([6.0]))
+    times, frames = ring.ordered()
+    np.testing.assert_array_equal(times, [3.0, 4.0, 5.0, 6.0])
+    np.testing.assert_array_equal(frames[0], [9, 10, 11])
+    np.testing.assert_array_equal(frames[-1], [-1, -1, -1])
+
+
+def test_array_surface_is_bounded_by_max_history():
+    figure = ArrayFigureCallback(
+        Array(names=("mca",), view=View.SURFACE, max_history=10)
+    )
+    figure.run_start(_run_start())  # type: ignore
+    figure.descriptor(
+        {"data_keys": {"mca": {"dtype": "array", "shape": [64], "source": "sim"}}}  # type: ignore
+    )
+    events = [
+        {
+            "uid": f"event-{i}",
+            "descriptor": "descriptor",
+            "time": 1_700_000_000.0 + i,
+            "seq_num": i + 1,
+            "data": {"mca": np.full(64, float(i))},
+            "timestamps": {},
+        }
+        for i in range(25)
+    ]
+    for event in events[:20]:
+        figure.event(event)  # type: ignore
+    figure.event_page(pack_event_page(*events[20:]))  # type: ignore
+
+    trace = figure.emit().data[-1]
+    assert np.shape(trace.z) == (10, 64)  # type: ignore
+    np.testing.assert_array_equal(np.asarray(trace.z)[:, 0], np.arange(15, 25))  # type: ignore
+
+
+def test_array_slice_only_keeps_the_latest_frame_and_caps_its_frame_rate():
+    figure = ArrayFigureCallback(Array(names=("mca",), view=View.SLICE, max_fps=5))
+    figure.run_start(_run_start())  # type: ignore
+    figure.descriptor(
+        {"data_keys": {"mca": {"dtype": "array", "shape": [64], "source": "sim"}}}  # type: ignore
+    )
+    server = PlotServer()
+    server.add_widget(("mca",), figure)
+    figure.event({"time": 0.0, "data": {"mca": np.zeros(64)}})  # type: ignore
+    _, _, cursors = server.render_updates([("mca",)], {})
+    _, _, other_cursors = server.render_updates([("mca",)], {})
+
+    for i in range(1, 50):
+        figure.event({"time": float(i), "data": {"mca": np.full(64, float(i))}})  # type: ignore
+    # Frames in between are dropped, not handed to the trace.
+    assert figure.figure.data[0].y[0] == 0.0  # type: ignore
+    figures, _, capped = server.render_updates([("mca",)], cursors)
+    assert figures[0] is no_update and capped == cursors
+
+    # With no more events browsers are still woken once the held frame is due.
+    seen = server.update_bus.wait(-1, timeout=0)
+    assert server.update_bus.wait(seen, timeout=1) != seen
+    latest, _, cursors = server.render_updates([("mca",)], cursors)
+    assert latest[0] is not no_update
+    assert figure.figure.data[0].y[0] == 49.0  # type: ignore
+    # Other browsers are sent the same frame rather than emitting it again.
+    figure.event({"time": 50.0, "data": {"mca": np.full(64, 50.0)}})  # type: ignore
+    figures, _, other_cursors = server.render_updates([("mca",)], other_cursors)
+    assert figures[0] is latest[0] and other_cursors == cursors
+
+
+def test_array_images_send_a_screen_sized_level_until_zoomed():
+    np.testing.assert_array_equal(
+        block_reduce(np.arange(9.0).reshape(3, 3), 2), [[2.0, 3.5], [6.5, 8.0]]
+    )
+    figure = ArrayFigureCallback(
+        Array(
+            names=("cam",),
+            view=View.SLICE,
+            image_size=256,
+            downsample=Downsample.MAX,
+        )
+    )
+    figure.run_start(_run_start())  # type: ignore
+    figure.descriptor(
+        {
+            "data_keys": {
+                "cam": {"dtype": "array", "shape": [1, 1000, 600], "source": "sim"}
+            }
+        }  # type: ignore
+    )
+    frame = np.zeros((1, 1000, 600), dtype=np.uint16)
+    frame[0, 501, 301] = 7
+    figure.event({"time": 0.0, "data": {"cam": np.ones_like(frame)}})  # type: ignore
+    figure.event({"time": 1.0, "data": {"cam": frame}})  # type: ignore
+
+    # 2D frames are images whatever the view, downsampled to fit 256 pixels a side.
+    trace = figure.emit().data[0]
+    assert isinstance(trace, go.Heatmap)
+    assert np.shape(trace.z) == (250, 150) and (trace.dx, trace.dy) == (4, 4)  # type: ignore
+    assert np.asarray(trace.z)[125, 75] == 7 and np.asarray(trace.z).sum() == 7  # type: ignore
+    assert (trace.x0, trace.y0) == (1.5, 1.5)
+
+    # Zoomed in, the tiles around the region are sent at full resolution.
+    trace = figure.emit({"x": [290.0, 310.0], "y": [520.0, 480.0]}).data[0]
+    assert (trace.dx, trace.x0, trace.y0) == (1, 256, 448)  # type: ignore
+    z = np.asarray(trace.z)  # type: ignore
+    assert z.shape == (128, 64) and z[501 - 448, 301 - 256] == 7
+    assert figure.columns()["plan 1"]["image"].shape == (1000, 600)
+
+
+def test_figures_switch_to_webgl_past_their_point_limit():
+    figure = ScalarFigureCallback(
+        Scalar(names=("det",), plot_against=PlotAgainst.SEQ_NUM, webgl_points=250),
+        max_points=100,
+    )
+    for scan_id in (1, 2, 3):
+        figure.run_start(_run_start(scan_id))  # type: ignore
+        figure.descriptor(_descriptor())  # type: ignore
+        figure.event_page(  # type: ignore
+            pack_event_page(*(_event(i, float(i)) for i in range(1, 1001)))  # type: ignore
+        )
+        # Only switched once the server next emits the figure, under its lock.
+        generation = figure.generation
+        traces = {trace["type"] for trace in figure.emit_dict()["data"]}
+        # Decimated traces draw `max_points` each, SVG is fine for two of them.
+        assert traces == ({"scattergl"} if scan_id == 3 else {"scatter"})
+        assert figure.generation == generation + (scan_id == 3)
+    generation = figure.generation
+    figure.run_start(_run_start(4))  # type: ignore
+    figure.descriptor(_descriptor())  # type: ignore
+    figure.event(_event(1, 1.0))  # type: ignore
+
+    emitted = figure.emit_dict()
+    assert [trace["type"] for trace in emitted["data"]] == ["scattergl"] * 4
+    assert emitted["layout"]["uirevision"] == "constant"
+    assert figure.generation == generation + 1  # Only for the new trace.
+    assert figure.extend_data([100, 100, 100, 0]) is not None
+
+    spectrum = ArrayFigureCallback(
+        Array(names=("mca",), view=View.SLICE, webgl_points=1000)
+    )
+    spectrum.run_start(_run_start())  # type: ignore
+    spectrum.descriptor(
+        {"data_keys": {"mca": {"dtype": "array", "shape": [4096], "source": "sim"}}}  # type: ignore
+    )
+    spectrum.event(  # type: ignore
+        {"seq_num": 1, "time": 0.0, "data": {"mca": np.arange(4096.0)}}  # type: ignore
+    )
+    assert spectrum.emit_dict()["data"][0]["type"] == "scattergl"
+
+
+def test_retention_evicts_oldest_runs_and_recalls_them(tmp_path):
+    figure = ScalarFigureCallback(
+        Scalar(names=("det",), plot_against=PlotAgainst.SEQ_NUM)
+    )
+    retention = RetentionPolicy(max_runs=2, spill_directory=tmp_path)
+    for scan_id in range(1, 5):
+        figure.run_start(_run_start(scan_id))  # type: ignore
+        figure.descriptor(_descriptor())  # type: ignore
+        for seq_num in range(1, 11):
+            figure.event(_event(seq_num, scan_id * 100.0 + seq_num))  # type: ignore
+        retention.spill(retention.enforce({("det",): figure}))
+
+    assert [trace.name for trace in figure.emit().data] == ["plan 3", "plan 4"]  # type: ignore
+    assert retention.store is not None
+    assert retention.store.spilled(("det",)) == ["plan 1", "plan 2"]
+
+    generation = figure.generation
+    figure.restore_trace("plan 1", retention.store.load(("det",), "plan 1"))
+    assert figure.generation > generation
+    traces = figure.emit().data
+    assert [trace.name for trace in traces] == ["plan 3", "plan 1", "plan 4"]  # type: ignore
+    np.testing.assert_array_equal(traces[1].y, 100.0 + np.arange(1, 11))  # type: ignore
+    assert retention.store.spilled(("det",)) == ["plan 2"]
+
+    # New events still go to the run in progress.
+    figure.event(_event(11, 0.0))  # type: ignore
+    assert len(figure.emit().data[-1].y) == 11  # type: ignore
+
+
+def test_retention_total_budget_evicts_least_recently_updated_figure_first():
+    figures = {}
+    for name in ("a", "b"):
+        figure = ScalarFigureCallback(
+            Scalar(names=(name,), plot_against=PlotAgainst.SEQ_NUM)
+        )
+        for scan_id in range(1, 4):
+            figure.run_start(_run_start(scan_id))  # type: ignore
+            figure.descriptor(_descriptor(name))  # type: ignore
+            figure.event(_event(1, 1.0, name))  # type: ignore
+        figures[(name,)] = figure
+    per_figure = sum(figures[("a",)].trace_nbytes())
+    retention = RetentionPolicy(max_total_bytes=2 * per_figure - 1)
+    retention.touch(("a",))
+    retention.touch(("b",))
+
+    evictions = retention.enforce(figures)
+
+    assert [(names, name) for names, name, _ in evictions] == [(("a",), "plan 1")]
+    assert len(figures[("a",)].figure.data) == 2
+    assert len(figures[("b",)].figure.data) == 3
+
+
+def test_journal_restores_events_as_pages_and_drops_torn_tail(tmp_path):
+    journal = DocumentJournal(tmp_path / "journal", batch_size=4)
+    journal.append("start", _run_start())  # type: ignore
+    journal.append("descriptor", _descriptor())  # type: ignore
+    for seq_num in range(1, 11):
+        journal.append("event", _event(seq_num, np.float64(seq_num)))  # type: ignore
+    journal.flush()
+    with open(journal.path, "ab") as file:
+        file.write(b"\x10\x00\x00\x00torn")
+
+    reopened = DocumentJournal(journal.path)
+    documents = list(reopened.documents())
+    assert [name for name, _ in documents] == [
+        "start",
+        "descriptor",
+        "event_page",
+        "event_page",
+        "event_page",
+    ]
+    assert [n for _, page in documents[2:] for n in page["seq_num"]] == list(  # type: ignore
+        range(1, 11)
+    )
+    assert len(list(reopened.documents())) == 5
+
+    figure = ScalarFigureCallback(
+        Scalar(names=("det",), plot_against=PlotAgainst.SEQ_NUM)
+    )
+    for name, document in documents:
+        getattr(figure, {"start": "run_start"}.get(name, name))(document)
+    np.testing.assert_array_equal(figure.emit().data[-1].y, np.arange(1, 11))  # type: ignore
+
+
+def test_journal_keeps_recent_runs_and_flushes_on_a_timer(tmp_path):
+    journal = DocumentJournal(tmp_path / "journal", flush_interval=0.05, max_runs=2)
+    for scan_id in (1, 2, 3):
+        journal.append("start", _run_start(scan_id))  # type: ignore
+        journal.append("stop", {"uid": f"stop-{scan_id}"})  # type: ignore
+    journal.append("event", _event(1, 1.0))  # type: ignore
+
+    # Written once the interval passes, without another document arriving.
+    time.sleep(0.3)
+    assert [path.name for path in journal.segments()] == ["journal.2", "journal"]
+    documents = list(DocumentJournal(journal.path).documents())
+    assert [document["scan_id"] for name, document in documents if name == "start"] == [  # type: ignore
+        2,
+        3,
+    ]
+    assert documents[-1][0] == "event_page"
+    journal.close()
+
+
+def test_figure_registry_resolves_figures_on_first_use():
+    registry = FigureRegistry()
+    registry.register_dtype(
+        "number",
+        "bluesky_web_plots.figures.scalar:ScalarFigureCallback",
+        Scalar(names=(), plot_against=PlotAgainst.TIME),
+    )
+    registry.register_structure(SampleMap, SampleMapFigureCallback)
+
+    figure = registry.for_data_key("det", _descriptor()["data_keys"]["det"])  # type: ignore
+    assert isinstance(figure, ScalarFigureCallback)
+    assert figure.structure == {"names": ("det",), "plot_against": PlotAgainst.TIME}
+    assert registry.for_data_key("det", {"dtype": "string"}) is None  # type: ignore
+
+    sample_map = SampleMap(
+        names=("x", "y", "i"), intensity_data_key="i", color_scale=ColorScale.JET
+    )
+    assert registry.for_structure(sample_map) is SampleMapFigureCallback
+    assert registry.for_structure(Array(names=("det",), view=View.SLICE)) is None
+
+
+def test_package_import_does_not_import_dash():
+    code = "import sys, bluesky_web_plots; assert 'dash' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,230 @@
+import base64
+import io
+import json
+import threading
+import time
+
+import numpy as np
+import plotly.io as pio
+import pytest
+from flask import Flask
+from plotly import graph_objects as go
+
+from bluesky_web_plots.figures.scalar import ScalarFigureCallback
+from bluesky_web_plots.metrics import Counter, Histogram
+from bluesky_web_plots.serialization import figure_to_json, typed_array
+from bluesky_web_plots.structures.scalar import PlotAgainst, Scalar
+from bluesky_web_plots.web_plots.server import PlotServer
+from bluesky_web_plots.web_plots.update_bus import UpdateBus
+
+
+def test_update_bus_coalesces_between_drains():
+    bus: UpdateBus[tuple[str, ...], int] = UpdateBus()
+    for value in range(10_000):
+        bus.publish(("det",), value)
+        bus.publish(("other",), -value)
+    assert len(bus) == 2
+    assert bus.version(("det",)) == 10_000
+
+    assert bus.drain() == {("det",): 9_999, ("other",): -9_999}
+    assert len(bus) == 0
+    assert bus.drain() == {}
+
+    bus.publish(("det",), 1)
+    bus.discard(("det",))
+    assert bus.drain() == {} and bus.version(("det",)) == 0
+
+
+def test_typed_arrays_round_trip_through_plotly():
+    figure = go.Figure(
+        [
+            go.Scatter(x=list(range(100)), y=[i / 3 for i in range(100)]),
+            go.Heatmap(z=np.arange(20.0).reshape(4, 5), x=[0, 1]),
+        ]
+    )
+    encoded = json.loads(figure_to_json(figure))
+    assert encoded["data"][0]["x"]["dtype"] == "i1"
+    assert encoded["data"][0]["y"]["dtype"] == "f8"
+    assert encoded["data"][1]["z"]["shape"] == "4, 5"
+    assert encoded["data"][1]["x"] == [0, 1]  # Too small to be worth encoding.
+    assert typed_array(["a"] * 100) is None
+
+    decoded = pio.from_json(json.dumps(encoded))
+    np.testing.assert_array_equal(
+        np.frombuffer(
+            base64.b64decode(decoded.data[0].y["bdata"]),  # type: ignore
+            dtype=np.float64,
+        ),
+        [i / 3 for i in range(100)],
+    )
+    plain = json.loads(figure_to_json(figure, binary=False))
+    assert plain["data"][0]["y"] == [i / 3 for i in range(100)]
+    assert plain["data"][1]["z"] == np.arange(20.0).reshape(4, 5).tolist()
+
+
+def test_metrics_route_reports_plots_and_lag():
+    figure = ScalarFigureCallback(
+        Scalar(names=("det",), plot_against=PlotAgainst.SEQ_NUM)
+    )
+    figure.run_start({"uid": "run-start-1", "time": time.time(), "scan_id": 1})  # type: ignore
+    figure.descriptor(
+        {"data_keys": {"det": {"dtype": "number", "shape": [], "source": "sim"}}}  # type: ignore
+    )
+    server = PlotServer()
+    server.add_widget(("det",), figure)
+    _, _, cursors = server.render_updates([("det",)], {})
+    for seq_num in range(1, 4):
+        figure.event(
+            {"seq_num": seq_num, "time": time.time(), "data": {"det": 1.0}}  # type: ignore
+        )
+    figure.last_event_time = time.time()
+    server.render_updates([("det",)], cursors)
+
+    app = Flask(__name__)
+    server._setup_metrics(app)
+    response = app.test_client().get("/metrics")
+
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'bluesky_web_plots_trace_points{plot="det",trace="plan 1"} 3' in text
+    assert "bluesky_web_plots_pending_updates 0" in text
+    assert "# TYPE bluesky_web_plots_lag_seconds histogram" in text
+    assert 'bluesky_web_plots_lag_seconds_bucket{le="+Inf"}' in text
+
+
+def test_metrics_recorded_on_many_threads_are_combined_when_scraped():
+    counter = Counter("documents_total", "Documents.")
+    histogram = Histogram("event_seconds", "Seconds.", buckets=(0.1,))
+    events = counter.labels(type="event")
+    seconds = histogram.labels(plot="det")
+
+    def record():
+        for _ in range(1000):
+            events.inc()
+            seconds.observe(0.05)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    record()  # Alongside those of the threads which have finished.
+
+    assert 'documents_total{type="event"} 5000' in counter.exposition()
+    text = histogram.exposition()
+    assert 'event_seconds_bucket{plot="det",le="0.1"} 5000' in text
+    assert 'event_seconds_count{plot="det"} 5000' in text
+
+
+def test_updates_are_pushed_as_figures_change():
+    server = PlotServer()
+    app = Flask(__name__)
+    app.add_url_rule("/updates", "updates", server.updates)
+    response = app.test_client().get("/updates", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    stream = iter(response.response)
+
+    # Straight away on connecting, then once per burst of changes.
+    assert next(stream) == b"data: 0\n\n"
+    start = time.monotonic()
+    for value in range(100):
+        server.update_bus.publish(("det",), value)  # type: ignore
+    assert next(stream) == b"data: 1\n\n"
+    assert time.monotonic() - start < 1
+
+    # Not woken again until the burst is drained, nor while it's being handled.
+    with server.update_bus.hold():
+        server.update_bus.drain()
+        server.update_bus.publish(("det",), 100)  # type: ignore
+        assert server.update_bus.wait(1, timeout=0) == 1
+    assert next(stream) == b"data: 2\n\n"
+    response.close()
+
+
+def test_forgotten_plots_are_not_deleted_from_their_callback():
+    server = PlotServer()
+    server.add_widget(("det",), _exported_figure())
+    server.add_widget(("other",), _exported_figure())
+    server.forget_plot(("det",))
+    assert server.plot_names() == [("other",)]
+    assert server.deleted_plot_queue.empty()
+
+
+def _exported_figure() -> ScalarFigureCallback:
+    figure = ScalarFigureCallback(
+        Scalar(names=("det",), plot_against=PlotAgainst.SEQ_NUM)
+    )
+    for scan_id, points in ((1, 300_000), (2, 10)):
+        figure.run_start({"uid": f"run-start-{scan_id}", "scan_id": scan_id})  # type: ignore
+        figure.descriptor(
+            {"data_keys": {"det": {"dtype": "number", "shape": [], "source": "sim"}}}  # type: ignore
+        )
+        figure.event_page(
+            {
+                "time": np.zeros(points),
+                "seq_num": np.arange(1, points + 1),
+                "data": {"det": np.arange(points, dtype=float)},
+            }  # type: ignore
+        )
+    return figure
+
+
+def _export_client():
+    server = PlotServer()
+    server.add_widget(("det",), _exported_figure())
+    app = Flask(__name__)
+    app.add_url_rule("/export/<path:plot>", "export", server.export)
+    return app.test_client()
+
+
+def test_export_streams_plot_columns_as_npz():
+    client = _export_client()
+    response = client.get("/export/det")
+    assert response.headers["Content-Disposition"] == 'attachment; filename="det.npz"'
+    assert len(list(response.response)) > 2  # Streamed in chunks.
+
+    with np.load(io.BytesIO(client.get("/export/det").data)) as archive:
+        assert set(archive.files) == {
+            f"plan {scan_id}/{column}"
+            for scan_id in (1, 2)
+            for column in ("time", "seq_num", "y")
+        }
+        np.testing.assert_array_equal(archive["plan 1/y"], np.arange(300_000.0))
+    with np.load(io.BytesIO(client.get("/export/det?trace=plan 2").data)) as archive:
+        assert archive["plan 2/seq_num"].tolist() == list(range(1, 11))
+    assert client.get("/export/other").status_code == 404
+    assert client.get("/export/det?format=csv").status_code == 400
+
+
+def test_export_streams_plot_columns_as_arrow():
+    pa = pytest.importorskip("pyarrow")
+    response = _export_client().get("/export/det?format=arrow")
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.data).read_all()
+    assert table.num_rows == 300_010
+    assert table.column("trace").unique().to_pylist() == ["plan 1", "plan 2"]
+    np.testing.assert_array_equal(table.column("y").to_numpy()[:5], np.arange(5.0))
+
+
+def test_export_streams_mixed_traces_as_one_arrow_schema():
+    pa = pytest.importorskip("pyarrow")
+    figure = _exported_figure()
+    traces = {
+        "counts": {"x": np.arange(3), "y": np.arange(3)},
+        "means": {"x": np.arange(3), "y": np.arange(3) / 2},
+    }
+    figure.columns = lambda: traces  # type: ignore
+    server = PlotServer()
+    server.add_widget(("det",), figure)
+    app = Flask(__name__)
+    app.add_url_rule("/export/<path:plot>", "export", server.export)
+    client = app.test_client()
+
+    table = pa.ipc.open_stream(client.get("/export/det?format=arrow").data).read_all()
+    assert table.schema.field("y").type == pa.float64()
+    assert table.column("y").to_pylist() == [0, 1, 2, 0, 0.5, 1]
+
+    traces["means"] = {"x": np.arange(3), "mean": np.arange(3) / 2}
+    response = client.get("/export/det?format=arrow")
+    assert response.status_code == 400
+    assert "means has columns x, mean" in response.get_data(as_text=True)